@@ -1,32 +1,52 @@
+import time
+IMPORT_STARTED = time.perf_counter()
+
 import sqlite3
 import sys
 import os
+import importlib
 from datetime import datetime
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                            QHBoxLayout, QLabel, QPushButton, QStackedWidget,
                            QLineEdit, QComboBox, QTableWidget, QProgressBar,
                            QMessageBox, QFrame, QButtonGroup)
-from PyQt6.QtCore import Qt, QTimer, QDate
+from PyQt6.QtCore import Qt, QTimer, QDate, QThreadPool
 from PyQt6.QtGui import QIcon, QColor, QFont
-import pandas as pd
 from pathlib import Path
 import json
 from qt_material import apply_stylesheet
-from src.dashboard import DashboardPage
-from src.income_page import IncomePage
-from src.expense_page import ExpensePage
-from src.budget_page import BudgetPage
-from src.savings_page import SavingsPage
-from src.reports_page import ReportsPage
+from src.db.backup import BackupManager
+from src.db.connections import configure_writer, close_read_pools
+from src.db.data_version import data_version
+from src.db.indexes import rebuild_suspended_indexes
+from src.db.query_worker import database_path
+from src.db.rollups import run_rollup_command
+from src.db.migrations import migrate
+from src.db.emergency import DEFAULT_HORIZON_MONTHS
+from src.utils.money import to_paise, format_rupees
+from src.utils.startup_timer import StartupTimer
+
+# Pages are imported and built on first navigation: (module, class)
+PAGES = {
+    "dashboard": ("src.dashboard", "DashboardPage"),
+    "expenses": ("src.expense_page", "ExpensePage"),
+    "income": ("src.income_page", "IncomePage"),
+    "budget": ("src.budget_page", "BudgetPage"),
+    "savings": ("src.savings_page", "SavingsPage"),
+    "reports": ("src.reports_page", "ReportsPage"),
+}
 
 class BudgetTracker(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup_timer=None):
         super().__init__()
+        self.startup_timer = startup_timer or StartupTimer()
         self.setWindowTitle("Personal Budget Tracker")
         self.setMinimumSize(1000, 700)
         
-        # Connect to application quit signal
-        QApplication.instance().aboutToQuit.connect(self.backup_database)
+        # Back up and close the database once, whichever of closeEvent
+        # and aboutToQuit comes first
+        self.is_shut_down = False
+        QApplication.instance().aboutToQuit.connect(self.shutdown)
         
         try:
             self.init_db()
@@ -34,6 +54,7 @@ class BudgetTracker(QMainWindow):
             QMessageBox.critical(self, "Database Error", 
                                f"Failed to initialize database: {str(e)}\nPlease ensure you have write permissions.")
             sys.exit(1)
+        self.startup_timer.mark("Database")
         
         try:
             self.load_preferences()
@@ -46,13 +67,28 @@ class BudgetTracker(QMainWindow):
             self.apply_theme()
         except Exception as e:
             print(f"Failed to apply theme: {e}")
+        self.startup_timer.mark("Preferences and theme")
         
         self.init_ui()
+        self.startup_timer.mark("Main window")
+        
+        # Build the first page once the window is on screen
+        QTimer.singleShot(0, self.show_start_page)
         
         self.notification_timer = QTimer()
         self.notification_timer.timeout.connect(self.check_budget_alerts)
         self.notification_timer.start(3600000)  # Check every hour
         
+        # Online backups run in the background while the app is in use
+        self.backups = BackupManager(database_path(self.conn), parent=self)
+        self.backups.progress.connect(self.on_backup_progress)
+        self.backups.finished.connect(self.on_backup_finished)
+        self.backups.skipped.connect(self.backup_progress.hide)
+        self.backups.failed.connect(self.on_backup_failed)
+        self.backup_timer = QTimer()
+        self.backup_timer.timeout.connect(self.backup_database)
+        self.backup_timer.start(3600000)  # Back up every hour
+        
         current_date = QDate.currentDate().toString("MMMM d, yyyy")
         self.statusBar().showMessage(f"Welcome to Budget Tracker! Today is {current_date}")
         
@@ -65,22 +101,72 @@ class BudgetTracker(QMainWindow):
             apply_stylesheet(self, theme='light_blue.xml')
     
     def backup_database(self):
-        """Create a backup of the database before closing"""
+        """Start an online backup in the background, if backups are enabled"""
+        if self.preferences.get('backup_enabled', True):
+            self.backups.start(data_version(self.conn))
+
+    def on_backup_progress(self, copied, total):
+        self.backup_progress.setMaximum(max(total, 1))
+        self.backup_progress.setValue(copied)
+        self.backup_progress.show()
+
+    def on_backup_finished(self, path):
+        self.backup_progress.hide()
+        self.statusBar().showMessage(f"Database backed up to {path}", 3000)
+
+    def on_backup_failed(self, message):
+        self.backup_progress.hide()
+        print(f"Failed to create backup: {message}")
+        self.statusBar().showMessage("Database backup failed", 3000)
+
+    def show_backups(self):
+        """Open the backup browser"""
+        from src.backup_dialog import BackupDialog
+        
+        dialog = BackupDialog(database_path(self.conn), self.backups, self)
+        dialog.restored.connect(self.on_restored)
+        dialog.exec()
+
+    def on_restored(self, safety_backup):
+        """Bring the schema up to date and rebuild pages on the restored data"""
+        from src.db.restore import prepare_restored
         try:
-            import shutil
-            from datetime import datetime
-            
-            backup_dir = Path("backups")
-            backup_dir.mkdir(exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = backup_dir / f"budget_backup_{timestamp}.db"
-            
+            prepare_restored(self.conn)
+            self.create_tables()
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Database Error", f"Failed to update restored database: {e}")
+        
+        current = next((page for page, widget in self.page_widgets.items()
+                        if widget is self.pages.currentWidget()), "dashboard")
+        for widget in self.page_widgets.values():
+            self.pages.removeWidget(widget)
+            widget.deleteLater()
+        self.page_widgets = {}
+        self.pages.setCurrentWidget(self.get_page(current))
+        
+        if safety_backup:
+            self.statusBar().showMessage(f"Backup restored. Previous data saved to {safety_backup}", 5000)
+        else:
+            self.statusBar().showMessage("Backup restored", 5000)
+
+    def shutdown(self):
+        """Take the exit backup and close the database (runs only once)"""
+        if self.is_shut_down:
+            return
+        self.is_shut_down = True
+        self.backup_timer.stop()
+        
+        try:
+            # A backup already in progress covers everything committed
+            # before it completes, so it doubles as the exit backup
+            if not self.backups.is_running():
+                self.backup_database()
+            self.backups.wait()
+            QThreadPool.globalInstance().waitForDone()  # dashboard loads
+            close_read_pools()
             self.conn.close()
-            
-            shutil.copy2("budget.db", backup_path)
         except Exception as e:
-            print(f"Failed to create backup: {e}")
+            print(f"Error during shutdown: {e}")
     
     def get_default_preferences(self):
         """Return default preferences"""
@@ -90,7 +176,8 @@ class BudgetTracker(QMainWindow):
             'start_page': 'dashboard',
             'notifications_enabled': True,
             'backup_enabled': True,
-            'budget_alert_threshold': 80
+            'budget_alert_threshold': 80,
+            'emergency_fund_months': DEFAULT_HORIZON_MONTHS
         }
 
     def load_preferences(self):
@@ -110,75 +197,16 @@ class BudgetTracker(QMainWindow):
         db_path = Path("budget.db")
         self.conn = sqlite3.connect(db_path)
         
-        self.conn.execute("PRAGMA foreign_keys = ON")
-        
-        cursor = self.conn.cursor()
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL UNIQUE,
-                type TEXT CHECK(type IN ('expense', 'income')) NOT NULL,
-                budget REAL DEFAULT 0,
-                alert_threshold INTEGER DEFAULT 80,
-                need_type INTEGER DEFAULT 0,  -- 1 for needs, 0 for wants
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS transactions (
-                id INTEGER PRIMARY KEY,
-                date TEXT NOT NULL,
-                category_id INTEGER,
-                amount REAL NOT NULL CHECK (amount > 0),
-                description TEXT,
-                type TEXT CHECK(type IN ('expense', 'income')) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (category_id) REFERENCES categories (id)
-                    ON DELETE SET NULL
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS savings_goals (
-                id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL UNIQUE,
-                target_amount REAL NOT NULL CHECK (target_amount > 0),
-                current_amount REAL DEFAULT 0 CHECK (current_amount >= 0),
-                target_date TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                monthly_contribution REAL DEFAULT 0 CHECK (monthly_contribution >= 0)
-            )
-        """)
+        # WAL lets the read pool query while this connection writes
+        configure_writer(self.conn)
+        self.create_tables()
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS emergency_fund (
-                id INTEGER PRIMARY KEY CHECK (id = 1),
-                target_amount REAL NOT NULL CHECK (target_amount > 0),
-                current_amount REAL DEFAULT 0 CHECK (current_amount >= 0),
-                monthly_contribution REAL DEFAULT 0 CHECK (monthly_contribution >= 0),
-                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS income (
-                id INTEGER PRIMARY KEY,
-                date TEXT NOT NULL,
-                amount REAL NOT NULL CHECK (amount > 0),
-                source TEXT NOT NULL,
-                is_recurring BOOLEAN DEFAULT 0,
-                frequency TEXT CHECK(frequency IN ('monthly', 'quarterly', 'yearly')),
-                next_date TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+    def create_tables(self):
+        """Bring the schema up to date and add the default data"""
+        migrate(self.conn)
+        rebuild_suspended_indexes(self.conn)  # left out if an import was cut short
+        cursor = self.conn.cursor()
 
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_income_date ON income(date)")
-        
         # Add default categories if none exist
         cursor.execute("SELECT COUNT(*) FROM categories")
         if cursor.fetchone()[0] == 0:
@@ -208,14 +236,15 @@ class BudgetTracker(QMainWindow):
             
             cursor.executemany(
                 "INSERT INTO categories (name, type, budget, need_type) VALUES (?, ?, ?, ?)",
-                default_categories
+                ((name, cat_type, to_paise(budget), need_type)
+                 for name, cat_type, budget, need_type in default_categories)
             )
             
             # Initialize emergency fund
             cursor.execute("""
                 INSERT INTO emergency_fund (id, target_amount, current_amount, monthly_contribution)
-                VALUES (1, 100000, 0, 5000)
-            """)
+                VALUES (1, ?, 0, ?)
+            """, (to_paise(100000), to_paise(5000)))
             
             self.conn.commit()
 
@@ -293,6 +322,10 @@ class BudgetTracker(QMainWindow):
         
         nav_layout.addStretch()
         
+        backups_btn = QPushButton("Backups")
+        backups_btn.clicked.connect(self.show_backups)
+        nav_layout.addWidget(backups_btn)
+        
         # Add version info
         version_label = QLabel("v1.0.0")
         version_label.setStyleSheet("""
@@ -313,18 +346,18 @@ class BudgetTracker(QMainWindow):
             }
         """)
         
-        # Add pages
-        self.pages.addWidget(DashboardPage(self.conn))
-        self.pages.addWidget(ExpensePage(self.conn))
-        self.pages.addWidget(IncomePage(self.conn))
-        self.pages.addWidget(BudgetPage(self.conn))
-        self.pages.addWidget(SavingsPage(self.conn))
-        self.pages.addWidget(ReportsPage(self.conn))
+        # Pages are created on first use by get_page()
+        self.page_widgets = {}
         
         layout.addWidget(self.pages)
         
         # Create status bar
         self.statusBar().showMessage("Ready")
+        self.backup_progress = QProgressBar()
+        self.backup_progress.setMaximumWidth(150)
+        self.backup_progress.setFormat("Backup %p%")
+        self.backup_progress.hide()
+        self.statusBar().addPermanentWidget(self.backup_progress)
         self.statusBar().setStyleSheet("""
             QStatusBar {
                 background-color: #2c3e50;
@@ -333,21 +366,32 @@ class BudgetTracker(QMainWindow):
             }
         """)
 
+    def get_page(self, page):
+        """Return the widget for a page, importing and building it on first use"""
+        if page not in self.page_widgets:
+            module_name, class_name = PAGES.get(page, PAGES["dashboard"])
+            page_class = getattr(importlib.import_module(module_name), class_name)
+            widget = page_class(self.conn)
+            if page == "dashboard":
+                widget.emergency_fund_months = self.preferences.get(
+                    'emergency_fund_months', DEFAULT_HORIZON_MONTHS)
+            self.pages.addWidget(widget)
+            self.page_widgets[page] = widget
+        return self.page_widgets[page]
+
+    def show_start_page(self):
+        """Show the dashboard after the main window has been painted"""
+        self.startup_timer.mark_visible()
+        self.pages.setCurrentWidget(self.get_page("dashboard"))
+        self.startup_timer.mark("Dashboard page")
+        self.startup_timer.report()
+
     def change_page(self):
         """Change the current page based on navigation selection"""
         button = self.sender()
         page = button.property("page")
         
-        page_index = {
-            "dashboard": 0,
-            "expenses": 1,
-            "income": 2,
-            "budget": 3,
-            "savings": 4,
-            "reports": 5
-        }.get(page, 0)
-        
-        self.pages.setCurrentIndex(page_index)
+        self.pages.setCurrentWidget(self.get_page(page))
     
     def on_expense_added(self, amount, category, description, expense_type):
         """Handle new expense added from dashboard"""
@@ -370,14 +414,14 @@ class BudgetTracker(QMainWindow):
         
         cursor.execute("""
             SELECT c.name, c.budget, c.alert_threshold,
-                   COALESCE(SUM(t.amount), 0) as spent
+                   COALESCE(m.total, 0) as spent
             FROM categories c
-            LEFT JOIN transactions t 
-                ON c.id = t.category_id 
-                AND strftime('%Y-%m', t.date) = ?
+            LEFT JOIN category_month_totals m
+                ON c.id = m.category_id 
+                AND m.month = ?
             WHERE c.type = 'expense'
-            GROUP BY c.id
-            HAVING spent >= (c.budget * c.alert_threshold / 100)
+            AND c.budget > 0
+            AND COALESCE(m.total, 0) * 100 >= c.budget * c.alert_threshold
         """, (current_month,))
         
         alerts = cursor.fetchall()
@@ -386,27 +430,41 @@ class BudgetTracker(QMainWindow):
             alert_msg = "Budget Alerts:\n\n"
             for name, budget, threshold, spent in alerts:
                 pct = (spent / budget) * 100
-                alert_msg += f"• {name}: {pct:.1f}% of budget spent (₹{spent:,.2f} / ₹{budget:,.2f})\n"
+                alert_msg += (f"• {name}: {pct:.1f}% of budget spent "
+                              f"({format_rupees(spent)} / {format_rupees(budget)})\n")
             
             QMessageBox.warning(self, "Budget Alerts", alert_msg)
 
     def closeEvent(self, event):
         """Handle application close event"""
-        try:
-            if self.preferences.get('backup_enabled', True):
-                self.backup_database()
-            self.conn.close()
-        except Exception as e:
-            print(f"Error during shutdown: {e}")
+        self.shutdown()
         event.accept()
 
 def main():
+    if '--verify-rollups' in sys.argv or '--rebuild-rollups' in sys.argv:
+        sys.exit(run_rollup_command(
+            Path("budget.db"), rebuild='--rebuild-rollups' in sys.argv
+        ))
+    
+    if '--archive-closed-years' in sys.argv:
+        from src.db.archive import run_archive_command
+        sys.exit(run_archive_command(Path("budget.db")))
+
+    if '--benchmark-restore' in sys.argv:
+        from src.db.restore import benchmark_restore
+        benchmark_restore()
+        sys.exit(0)
+
+    startup_timer = StartupTimer(IMPORT_STARTED, enabled='--startup-timing' in sys.argv)
+    startup_timer.mark("Imports")
+    
     app = QApplication(sys.argv)
     
     # Apply material design theme
     apply_stylesheet(app, theme='light_blue.xml')
+    startup_timer.mark("Application and theme")
     
-    window = BudgetTracker()
+    window = BudgetTracker(startup_timer)
     window.show()
     
     # Start the event loop
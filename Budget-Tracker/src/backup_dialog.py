@@ -0,0 +1,169 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                           QTableWidget, QTableWidgetItem, QHeaderView, QProgressBar,
+                           QMessageBox, QApplication, QAbstractItemView)
+from PyQt6.QtCore import Qt, QThreadPool, pyqtSignal
+from .db.restore import RestoreWorker, list_backup_info, verify_backup
+
+
+def format_size(size):
+    if size is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class BackupDialog(QDialog):
+    """Lists backups with a summary of each and restores the selected one"""
+
+    restored = pyqtSignal(str)  # path of the safety backup taken first
+
+    def __init__(self, db_path, backup_manager, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.backup_manager = backup_manager
+        self.worker = None
+        self.setWindowTitle("Backups")
+        self.setModal(True)
+        self.resize(900, 420)
+        self.setup_ui()
+        self.load_backups()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel("Restoring replaces all current data. A backup of the "
+                                "current data is taken first."))
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels([
+            "Created", "Size", "Unpacked", "Transactions", "Income", "Date Range"
+        ])
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        header.setStretchLastSection(True)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        self.progress = QProgressBar()
+        self.progress.setFormat("Restoring %p%")
+        self.progress.hide()
+        layout.addWidget(self.progress)
+
+        button_layout = QHBoxLayout()
+        self.verify_button = QPushButton("Verify")
+        self.verify_button.clicked.connect(self.verify_selected)
+        self.restore_button = QPushButton("Restore")
+        self.restore_button.clicked.connect(self.restore_selected)
+        self.close_button = QPushButton("Close")
+        self.close_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.verify_button)
+        button_layout.addWidget(self.restore_button)
+        button_layout.addStretch()
+        button_layout.addWidget(self.close_button)
+        layout.addLayout(button_layout)
+
+    def load_backups(self):
+        self.backups = list_backup_info()
+        self.table.setRowCount(len(self.backups))
+        for row, info in enumerate(self.backups):
+            if info.first_date:
+                date_range = f"{info.first_date} to {info.last_date}"
+            else:
+                date_range = "-"
+            values = [
+                info.created.strftime("%Y-%m-%d %H:%M:%S"),
+                format_size(info.size),
+                format_size(info.db_size),
+                "-" if info.transactions is None else f"{info.transactions:,}",
+                "-" if info.income is None else f"{info.income:,}",
+                date_range,
+            ]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        if self.backups:
+            self.table.selectRow(0)
+
+    def selected_backup(self):
+        row = self.table.currentRow()
+        if row < 0 or row >= len(self.backups):
+            QMessageBox.warning(self, "No Backup Selected", "Please select a backup first.")
+            return None
+        return self.backups[row]
+
+    def verify_selected(self):
+        info = self.selected_backup()
+        if info is None:
+            return
+
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            ok, message = verify_backup(info.path)
+        except Exception as e:
+            ok, message = False, str(e)
+        finally:
+            QApplication.restoreOverrideCursor()
+
+        if ok:
+            QMessageBox.information(self, "Backup OK", f"{info.path.name} passed the integrity check.")
+        else:
+            QMessageBox.warning(self, "Backup Damaged",
+                                f"{info.path.name} failed the integrity check:\n{message}")
+
+    def restore_selected(self):
+        info = self.selected_backup()
+        if info is None:
+            return
+
+        reply = QMessageBox.question(
+            self,
+            'Restore Backup',
+            f'Replace all current data with the backup from '
+            f'{info.created.strftime("%Y-%m-%d %H:%M:%S")}?',
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.No
+        )
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+
+        # Don't let a background backup prune files while restoring
+        self.backup_manager.wait()
+
+        self.set_busy(True)
+        self.worker = RestoreWorker(info.path, self.db_path)
+        self.worker.signals.progress.connect(self.on_progress)
+        self.worker.signals.finished.connect(self.on_restored)
+        self.worker.signals.failed.connect(self.on_failed)
+        QThreadPool.globalInstance().start(self.worker)
+
+    def set_busy(self, busy):
+        for button in (self.verify_button, self.restore_button, self.close_button):
+            button.setEnabled(not busy)
+        self.progress.setVisible(busy)
+
+    def on_progress(self, copied, total):
+        self.progress.setMaximum(max(total, 1))
+        self.progress.setValue(copied)
+
+    def on_restored(self, safety_backup):
+        self.set_busy(False)
+        self.worker = None
+        self.restored.emit(safety_backup)
+        QMessageBox.information(self, "Restore Complete", "The backup has been restored.")
+        self.accept()
+
+    def on_failed(self, message):
+        self.set_busy(False)
+        self.worker = None
+        QMessageBox.warning(self, "Restore Failed", f"Failed to restore backup: {message}")
+
+    def reject(self):
+        # Keep the dialog open until a running restore finishes
+        if self.worker is None:
+            super().reject()
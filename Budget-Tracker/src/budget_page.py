@@ -2,11 +2,15 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                            QPushButton, QFrame, QTableWidget, QTableWidgetItem,
                            QHeaderView, QSpinBox, QDialog, QLineEdit, QComboBox,
                            QFormLayout, QMessageBox)
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal, QDate
 from PyQt6.QtGui import QFont, QColor
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from .utils.action_delegate import ActionButtonDelegate, ROW_ID_ROLE
+from .db.data_version import notify_write
+from .utils.charts import GroupedBarChart
+from .utils.money import to_paise, to_rupees, format_rupees
 
 class CategoryDialog(QDialog):
     def __init__(self, parent=None, category_data=None):
@@ -37,7 +41,7 @@ class CategoryDialog(QDialog):
         self.budget_input.setRange(0, 1000000)
         self.budget_input.setSingleStep(100)
         if self.category_data:
-            self.budget_input.setValue(int(self.category_data['budget']))
+            self.budget_input.setValue(int(to_rupees(self.category_data['budget'])))
         layout.addRow("Monthly Budget (₹):", self.budget_input)
 
         # Buttons
@@ -54,7 +58,7 @@ class CategoryDialog(QDialog):
         return {
             'name': self.name_input.text(),
             'type': self.type_combo.currentText(),
-            'budget': self.budget_input.value()
+            'budget': to_paise(self.budget_input.value())
         }
 
 class BudgetPage(QWidget):
@@ -131,6 +135,11 @@ class BudgetPage(QWidget):
                 font-weight: bold;
             }
         """)
+
+        self.actions = ActionButtonDelegate(self.table)
+        self.actions.edit_clicked.connect(self.edit_category)
+        self.actions.delete_clicked.connect(self.delete_category)
+        self.table.setItemDelegateForColumn(4, self.actions)
         layout.addWidget(self.table)
 
         # Budget Distribution Chart
@@ -142,11 +151,14 @@ class BudgetPage(QWidget):
         self.figure = Figure(figsize=(6, 4))
         self.canvas = FigureCanvas(self.figure)
         chart_layout.addWidget(self.canvas)
+        self.chart = GroupedBarChart(self.canvas, 'Budget vs Spending by Category',
+                                     ['Budget', 'Spent'], ['#2196F3', '#4CAF50'])
         
         layout.addWidget(chart_frame)
 
     def load_data(self):
         cursor = self.conn.cursor()
+        current_month = QDate.currentDate().toString("yyyy-MM")
         
         # Get categories with their current month spending
         cursor.execute("""
@@ -155,13 +167,12 @@ class BudgetPage(QWidget):
                 c.name,
                 c.type,
                 c.budget,
-                COALESCE(SUM(t.amount), 0) as spent
+                COALESCE(m.total, 0) as spent
             FROM categories c
-            LEFT JOIN transactions t ON c.id = t.category_id
-            AND strftime('%Y-%m', t.date) = strftime('%Y-%m', 'now')
-            GROUP BY c.id
+            LEFT JOIN category_month_totals m ON c.id = m.category_id
+            AND m.month = ?
             ORDER BY c.type, c.name
-        """)
+        """, (current_month,))
         categories = cursor.fetchall()
         
         # Update table
@@ -181,82 +192,31 @@ class BudgetPage(QWidget):
             self.table.setItem(row, 1, type_item)
             
             # Budget
-            budget_item = QTableWidgetItem(f"₹{budget:,.2f}")
+            budget_item = QTableWidgetItem(format_rupees(budget))
             budget_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
             self.table.setItem(row, 2, budget_item)
             
             # Spent
-            spent_item = QTableWidgetItem(f"₹{spent:,.2f}")
+            spent_item = QTableWidgetItem(format_rupees(spent))
             spent_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
             if spent > budget and budget > 0:
                 spent_item.setForeground(QColor("#f44336"))
             self.table.setItem(row, 3, spent_item)
             
-            # Action Buttons
-            action_widget = QWidget()
-            action_layout = QHBoxLayout(action_widget)
-            action_layout.setContentsMargins(4, 4, 4, 4)
-            
-            edit_btn = QPushButton("Edit")
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #4CAF50;
-                    color: white;
-                    border-radius: 3px;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #388E3C;
-                }
-            """)
-            edit_btn.clicked.connect(lambda checked, cid=cat_id: self.edit_category(cid))
-            
-            delete_btn = QPushButton("Delete")
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #f44336;
-                    color: white;
-                    border-radius: 3px;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #d32f2f;
-                }
-            """)
-            delete_btn.clicked.connect(lambda checked, cid=cat_id: self.delete_category(cid))
-            
-            action_layout.addWidget(edit_btn)
-            action_layout.addWidget(delete_btn)
-            self.table.setCellWidget(row, 4, action_widget)
+            # Actions (painted by the delegate, which reads the row id)
+            action_item = QTableWidgetItem()
+            action_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+            action_item.setData(ROW_ID_ROLE, cat_id)
+            self.table.setItem(row, 4, action_item)
         
         # Update total budget display
-        self.total_budget.setText(f"Total Monthly Budget: ₹{total_budget:,.2f}")
+        self.total_budget.setText(f"Total Monthly Budget: {format_rupees(total_budget)}")
         
         # Update chart
         self.update_chart(categories)
 
     def update_chart(self, categories):
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        
-        names = [cat[1] for cat in categories]
-        budgets = [cat[3] for cat in categories]
-        spent = [cat[4] for cat in categories]
-        
-        x = range(len(names))
-        width = 0.35
-        
-        ax.bar([i - width/2 for i in x], budgets, width, label='Budget', color='#2196F3')
-        ax.bar([i + width/2 for i in x], spent, width, label='Spent', color='#4CAF50')
-        
-        ax.set_ylabel('Amount (₹)')
-        ax.set_title('Budget vs Spending by Category')
-        ax.set_xticks(x)
-        ax.set_xticklabels(names, rotation=45, ha='right')
-        ax.legend()
-        
-        self.figure.tight_layout()
-        self.canvas.draw()
+        self.chart.update((cat[1], to_rupees(cat[3]), to_rupees(cat[4])) for cat in categories)
 
     def add_category(self):
         dialog = CategoryDialog(self)
@@ -268,6 +228,7 @@ class BudgetPage(QWidget):
                 VALUES (?, ?, ?)
             """, (data['name'], data['type'], data['budget']))
             self.conn.commit()
+            notify_write()
             self.load_data()
             self.budget_updated.emit()
 
@@ -290,6 +251,7 @@ class BudgetPage(QWidget):
                 WHERE id = ?
             """, (data['name'], data['type'], data['budget'], category_id))
             self.conn.commit()
+            notify_write()
             self.load_data()
             self.budget_updated.emit()
 
@@ -306,5 +268,6 @@ class BudgetPage(QWidget):
             cursor = self.conn.cursor()
             cursor.execute("DELETE FROM categories WHERE id = ?", (category_id,))
             self.conn.commit()
+            notify_write()
             self.load_data()
             self.budget_updated.emit()
@@ -1,13 +1,34 @@
 from PyQt6.QtWidgets import QCalendarWidget, QToolTip
-from PyQt6.QtCore import Qt, QDate
+from PyQt6.QtCore import Qt, QDate, QTimer
 from PyQt6.QtGui import QTextCharFormat, QColor, QPalette
+import calendar
 import sqlite3
+from .db.connections import reader
+from .db.archive import attach_archives
+from .db.data_version import data_notifier
+from .utils.money import format_rupees
+
+PREFETCH_MONTHS = 1  # months loaded ahead on either side of the shown one
+
+
+def month_start(year, month):
+    return f"{year:04d}-{month:02d}-01"
+
+
+def month_end(year, month):
+    return f"{year:04d}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
+
 
 class BudgetCalendarWidget(QCalendarWidget):
     def __init__(self, db_connection):
         super().__init__()
         self.conn = db_connection
+        self.month_cache = {}  # (year, month) -> {date: (expenses, income, count)}
         self.setup_ui()
+        self.activated.connect(self.show_date_tooltip)
+        self.clicked.connect(self.show_date_tooltip)
+        self.currentPageChanged.connect(self.on_page_changed)
+        data_notifier().rows_written.connect(self.on_rows_written)
         self.load_transaction_dates()
 
     def setup_ui(self):
@@ -23,64 +44,141 @@ class BudgetCalendarWidget(QCalendarWidget):
         self.setWeekdayTextFormat(Qt.DayOfWeek.Sunday, weekend_format)
         
         # Set today's date format
-        today_format = QTextCharFormat()
-        today_format.setBackground(QColor("#E3F2FD"))
-        today_format.setForeground(QColor("#1976D2"))
-        self.setDateTextFormat(QDate.currentDate(), today_format)
-        
-        # Connect signals
-        self.activated.connect(self.show_date_tooltip)
-        self.clicked.connect(self.show_date_tooltip)
+        self.today_format = QTextCharFormat()
+        self.today_format.setBackground(QColor("#E3F2FD"))
+        self.today_format.setForeground(QColor("#1976D2"))
+        self.setDateTextFormat(QDate.currentDate(), self.today_format)
+
+    def on_page_changed(self, year, month):
+        """Show the new month right away and prefetch its neighbours after"""
+        self.load_months([(year, month)])
+        QTimer.singleShot(0, self.prefetch_neighbours)
+
+    def visible_months(self):
+        """The shown month and the PREFETCH_MONTHS months either side of it"""
+        index = self.yearShown() * 12 + self.monthShown() - 1
+        return [((i // 12), i % 12 + 1)
+                for i in range(index - PREFETCH_MONTHS, index + PREFETCH_MONTHS + 1)]
+
+    def prefetch_neighbours(self):
+        self.load_months(self.visible_months())
 
     def load_transaction_dates(self):
-        cursor = self.conn.cursor()
-        
-        # Get all dates with transactions and their total amounts
+        """Mark the days of the shown month and its neighbours"""
+        self.load_months(self.visible_months())
+
+    def load_months(self, months):
+        """Load and mark the days of the given (year, month)s not cached yet.
+
+        The missing months are read with one query over their date range,
+        reading the archive of a closed year if it has one.
+        """
+        missing = sorted(month for month in months if month not in self.month_cache)
+        if not missing:
+            return
+        start_date = month_start(*missing[0])
+        end_date = month_end(*missing[-1])
+
+        try:
+            with reader(self.conn) as conn:
+                attach_archives(conn, start_date, end_date)
+                totals = self.query_day_totals(conn, start_date, end_date)
+        except sqlite3.Error as e:
+            print(f"Error loading calendar: {e}")
+            return
+
+        for month in missing:
+            self.month_cache[month] = {}
+        for date_str, day in totals.items():
+            month = (int(date_str[:4]), int(date_str[5:7]))
+            if month in missing:  # the range may span months already cached
+                self.month_cache[month][date_str] = day
+                self.setDateTextFormat(QDate.fromString(date_str, Qt.DateFormat.ISODate),
+                                       self.day_format(date_str, *day))
+
+    def query_day_totals(self, conn, start_date, end_date):
+        """{date: (expenses, income, count)} for the days with transactions"""
+        cursor = conn.cursor()
         cursor.execute("""
-            SELECT 
-                date,
-                SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as total_expenses,
-                SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as total_income,
-                COUNT(*) as transaction_count
-            FROM transactions 
+            SELECT date, SUM(expense), SUM(income), SUM(count)
+            FROM all_daily_totals
+            WHERE date BETWEEN ? AND ?
             GROUP BY date
-        """)
+        """, (start_date, end_date))
+        return {date_str: (expenses, income, count)
+                for date_str, expenses, income, count in cursor.fetchall()}
+
+    def day_format(self, date_str, expenses, income, count):
+        """Colour and tooltip for a day with transactions"""
+        date = QDate.fromString(date_str, Qt.DateFormat.ISODate)
+        
+        # Create format based on transaction type
+        fmt = QTextCharFormat()
+        
+        # If there's both income and expenses
+        if income > 0 and expenses > 0:
+            fmt.setBackground(QColor("#E8F5E9"))  # Light green
+            fmt.setForeground(QColor("#2E7D32"))  # Dark green
+        # If there's only income
+        elif income > 0:
+            fmt.setBackground(QColor("#E3F2FD"))  # Light blue
+            fmt.setForeground(QColor("#1976D2"))  # Dark blue
+        # If there's only expenses
+        else:
+            fmt.setBackground(QColor("#FFEBEE"))  # Light red
+            fmt.setForeground(QColor("#C62828"))  # Dark red
         
-        transactions = cursor.fetchall()
+        # Add a border to make the date stand out
+        fmt.setFontWeight(600)  # Semi-bold
         
-        # Format dates with transactions
-        for date_str, expenses, income, count in transactions:
+        # Store transaction info for tooltip
+        fmt.setToolTip(f"""
+            Date: {date.toString("MMM d, yyyy")}
+            Transactions: {count}
+            Income: {format_rupees(income)}
+            Expenses: {format_rupees(expenses)}
+            Net: {format_rupees(income - expenses)}
+        """.strip())
+        return fmt
+
+    def plain_format(self, date):
+        """Format of a day without transactions"""
+        if date == QDate.currentDate():
+            return self.today_format
+        return QTextCharFormat()
+
+    def refresh_days(self, dates):
+        """Re-read just the given days; days of months not loaded yet are skipped"""
+        cached = [date_str for date_str in dates
+                  if (int(date_str[:4]), int(date_str[5:7])) in self.month_cache]
+        if not cached:
+            return
+        try:
+            with reader(self.conn) as conn:
+                attach_archives(conn, min(cached), max(cached))
+                totals = {}
+                for date_str in cached:
+                    totals.update(self.query_day_totals(conn, date_str, date_str))
+        except sqlite3.Error as e:
+            print(f"Error refreshing calendar: {e}")
+            return
+
+        for date_str in cached:
+            month_days = self.month_cache[(int(date_str[:4]), int(date_str[5:7]))]
             date = QDate.fromString(date_str, Qt.DateFormat.ISODate)
-            
-            # Create format based on transaction type
-            fmt = QTextCharFormat()
-            
-            # If there's both income and expenses
-            if income > 0 and expenses > 0:
-                fmt.setBackground(QColor("#E8F5E9"))  # Light green
-                fmt.setForeground(QColor("#2E7D32"))  # Dark green
-            # If there's only income
-            elif income > 0:
-                fmt.setBackground(QColor("#E3F2FD"))  # Light blue
-                fmt.setForeground(QColor("#1976D2"))  # Dark blue
-            # If there's only expenses
+            if date_str in totals:
+                month_days[date_str] = totals[date_str]
+                self.setDateTextFormat(date, self.day_format(date_str, *totals[date_str]))
             else:
-                fmt.setBackground(QColor("#FFEBEE"))  # Light red
-                fmt.setForeground(QColor("#C62828"))  # Dark red
-            
-            # Add a border to make the date stand out
-            fmt.setFontWeight(600)  # Semi-bold
-            
-            # Store transaction info for tooltip
-            fmt.setToolTip(f"""
-                Date: {date.toString("MMM d, yyyy")}
-                Transactions: {count}
-                Income: ₹{income:,.2f}
-                Expenses: ₹{expenses:,.2f}
-                Net: ₹{income - expenses:,.2f}
-            """.strip())
-            
-            self.setDateTextFormat(date, fmt)
+                month_days.pop(date_str, None)
+                self.setDateTextFormat(date, self.plain_format(date))
+
+    def on_rows_written(self, dates):
+        """Refresh the days a write touched, or everything if they aren't known"""
+        if dates:
+            self.refresh_days(dates)
+        else:
+            self.update_transactions()
 
     def show_date_tooltip(self, date):
         # Get the format for the date
@@ -94,8 +192,10 @@ class BudgetCalendarWidget(QCalendarWidget):
             QToolTip.hideText()
 
     def update_transactions(self):
-        """Refresh the calendar with latest transaction data"""
-        # Clear existing formats except for weekends
-        self.setup_ui()
-        # Reload transaction dates
-        self.load_transaction_dates()
+        """Drop the cached months and reload the shown month and its neighbours"""
+        marked = [date_str for days in self.month_cache.values() for date_str in days]
+        self.month_cache.clear()
+        for date_str in marked:
+            date = QDate.fromString(date_str, Qt.DateFormat.ISODate)
+            self.setDateTextFormat(date, self.plain_format(date))
+        self.load_months(self.visible_months())
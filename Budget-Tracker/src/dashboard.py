@@ -2,33 +2,43 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                            QPushButton, QFrame, QGridLayout, QLineEdit,
                            QComboBox, QSpacerItem, QSizePolicy, QMessageBox,
                            QProgressBar, QMainWindow)
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QThreadPool
 from PyQt6.QtGui import QFont
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-import matplotlib.dates as mdates
-from datetime import datetime
-import pandas as pd
+from datetime import datetime, date, timedelta
 import sqlite3
-import time
+from .db.query_worker import QueryWorker
+from .db.connections import read_pool
+from .db.archive import attach_archives
+from .db.emergency import DEFAULT_HORIZON_MONTHS, emergency_projection, save_emergency_target
+from .utils.money import to_rupees, format_rupees
+from .db.data_version import data_notifier, data_version
+from .utils.charts import LineChart, DonutChart
 
 class DashboardPage(QWidget):
     expense_added = pyqtSignal(float, str, str, str)  # amount, category, description, type
+    emergency_fund_months = DEFAULT_HORIZON_MONTHS  # months of need spending to cover
 
     def __init__(self, db_connection):
         super().__init__()
         self.conn = db_connection
         self.cached_data = {}
-        self.cache_timeout = 300  # 5 minutes
-        self.last_update = None
+        self.cache_key = None  # data version the cache was loaded at
+        self.loader = None  # background refresh in flight, if any
+        self.reload_pending = False
+        self.read_pool = read_pool(self.conn)
+        
+        # Reload as soon as another page saves something
+        data_notifier().changed.connect(self.on_data_changed)
         
         # Initialize UI first
         self.init_ui()
         
-        # Load initial data
+        # Load initial data once the page has been shown
         self.load_categories()  # Load categories immediately
-        self.load_data()
+        QTimer.singleShot(0, self.load_data)
         
         # Setup auto-refresh timer
         self.refresh_timer = QTimer()
@@ -180,6 +190,19 @@ class DashboardPage(QWidget):
         charts_layout.addWidget(category_frame)
 
         layout.addLayout(charts_layout)
+        
+        # Charts keep their artists and are updated in place on refresh
+        plt.style.use('bmh')  # Using a built-in style
+        for figure in (self.spending_figure, self.category_figure):
+            figure.patch.set_facecolor('white')
+        self.spending_chart = LineChart(
+            self.spending_canvas, '30-Day Spending Trend', '#2196F3',
+            'No recent transactions', facecolor='white')
+        self.spending_chart.ax.grid(True, linestyle='--', alpha=0.7, color='#cccccc')
+        self.category_chart = DonutChart(
+            self.category_canvas, 'Top 5 Expense Categories\n(Last 30 Days)',
+            ['#2196F3', '#4CAF50', '#FFC107', '#9C27B0', '#F44336'],
+            'No category data', label_color='black', facecolor='white')
 
     def create_overview_card(self, title, initial_value, progress_bar_name):
         """Create an overview card with title, value and progress bar"""
@@ -230,32 +253,84 @@ class DashboardPage(QWidget):
         
         return card
 
+    def current_cache_key(self):
+        """Key that changes when the data, or the current date, changes"""
+        return data_version(self.conn), date.today()
+
     def load_data(self):
-        """Load all dashboard data with caching"""
+        """Load all dashboard data, skipping the queries if nothing changed"""
         try:
-            current_time = time.time()
-            if (self.last_update is None or 
-                current_time - self.last_update > self.cache_timeout):
-                
-                self.load_budget_overview()
-                self.load_emergency_fund()
-                self.load_savings_goals()
-                self.load_recent_transactions()
-                self.load_monthly_income()
-                self.load_analysis_data()
-                self.update_charts()
-                
-                self.last_update = current_time
-                
-            self.update_ui_from_cache()
-            
-        except Exception as e:
-            QMessageBox.warning(self, "Data Load Error",
-                              f"Failed to load dashboard data: {str(e)}")
+            key = self.current_cache_key()
+        except sqlite3.Error as e:
+            print(f"Database error checking dashboard data: {e}")
+            return
+        if self.cache_key == key:
+            return
+        
+        # A refresh is already running; load again once it lands
+        if self.loader is not None:
+            self.reload_pending = True
+            return
+        
+        # Taken before querying, so writes made while loading still
+        # invalidate the result
+        self.loading_key = key
+        
+        if self.read_pool is None:
+            # In-memory databases can't be opened from another thread
+            try:
+                self.on_data_loaded(self.query_dashboard_data(self.conn))
+            except Exception as e:
+                self.on_data_failed(str(e))
+            return
+        
+        self.loader = QueryWorker(self.read_pool, self.query_dashboard_data)
+        self.loader.signals.finished.connect(self.on_data_loaded)
+        self.loader.signals.failed.connect(self.on_data_failed)
+        QThreadPool.globalInstance().start(self.loader)
+
+    def query_dashboard_data(self, conn):
+        """Run every dashboard query and return the results.
+
+        Called on a worker thread, so it must only touch the given
+        connection and never any widgets.
+        """
+        data = {}
+        # The six-month averages can reach back into an archived year
+        attach_archives(conn, (date.today() - timedelta(days=186)).isoformat())
+        self.load_budget_overview(conn, data)
+        self.load_emergency_fund(conn, data)
+        self.load_savings_goals(conn, data)
+        self.load_recent_transactions(conn, data)
+        self.load_monthly_income(conn, data)
+        self.load_analysis_data(conn, data)
+        self.load_chart_data(conn, data)
+        return data
+
+    def on_data_loaded(self, data):
+        """Store freshly loaded data and redraw (GUI thread)"""
+        self.loader = None
+        self.cached_data = data
+        self.save_emergency_target(data['emergency'])
+        
+        self.cache_key = self.loading_key
+        
+        self.update_charts()
+        self.update_ui_from_cache()
+        
+        if self.reload_pending:
+            self.reload_pending = False
+            self.load_data()
 
-    def load_budget_overview(self):
+    def on_data_failed(self, message):
+        self.loader = None
+        self.reload_pending = False
+        QMessageBox.warning(self, "Data Load Error",
+                          f"Failed to load dashboard data: {message}")
+
+    def load_budget_overview(self, conn, data):
         """Load budget overview data"""
-        cursor = self.conn.cursor()
+        cursor = conn.cursor()
         current_month = datetime.now().strftime('%Y-%m')
         
         try:
@@ -269,8 +344,8 @@ class DashboardPage(QWidget):
                 monthly_spending AS (
                     SELECT COALESCE(SUM(amount), 0) as total_spent
                     FROM transactions
-                    WHERE type = 'expense'
-                    AND strftime('%Y-%m', date) = ?
+                    WHERE month = ?
+                    AND type = 'expense'
                 )
                 SELECT total_budget, total_spent
                 FROM monthly_budget, monthly_spending
@@ -279,7 +354,7 @@ class DashboardPage(QWidget):
             result = cursor.fetchone()
             if result:
                 total_budget, total_spent = result
-                self.cached_data['budget'] = {
+                data['budget'] = {
                     'total': total_budget or 0,
                     'spent': total_spent or 0,
                     'remaining': (total_budget or 0) - (total_spent or 0)
@@ -287,86 +362,33 @@ class DashboardPage(QWidget):
             
         except sqlite3.Error as e:
             print(f"Database error in budget overview: {e}")
-            self.cached_data['budget'] = {'total': 0, 'spent': 0, 'remaining': 0}
+            data['budget'] = {'total': 0, 'spent': 0, 'remaining': 0}
 
-    def load_emergency_fund(self):
+    def load_emergency_fund(self, conn, data):
         """Load emergency fund data"""
         try:
-            cursor = self.conn.cursor()
-            
-            # Calculate 6-month expense projection for NEED categories only
-            cursor.execute("""
-                WITH monthly_expenses AS (
-                    -- Get average monthly expense for each NEED category
-                    SELECT 
-                        category_id,
-                        ROUND(AVG(monthly_total), 2) as avg_monthly_expense
-                    FROM (
-                        SELECT 
-                            t.category_id,
-                            strftime('%Y-%m', t.date) as month,
-                            SUM(t.amount) as monthly_total
-                        FROM transactions t
-                        JOIN categories c ON t.category_id = c.id
-                        WHERE t.type = 'expense'
-                        AND c.need_type = 1  -- Only NEED categories
-                        AND t.date >= date('now', '-6 months')
-                        GROUP BY t.category_id, month
-                    ) monthly_data
-                    GROUP BY category_id
-                ),
-                recurring_expenses AS (
-                    -- Get all budgeted amounts from NEED categories
-                    SELECT id as category_id, budget as monthly_budget
-                    FROM categories
-                    WHERE type = 'expense'
-                    AND need_type = 1  -- Only NEED categories
-                ),
-                projected_expenses AS (
-                    -- Combine historical averages with budgeted amounts
-                    SELECT 
-                        COALESCE(me.category_id, re.category_id) as category_id,
-                        CASE 
-                            WHEN me.avg_monthly_expense IS NOT NULL 
-                            THEN me.avg_monthly_expense
-                            ELSE re.monthly_budget
-                        END as monthly_projection
-                    FROM monthly_expenses me
-                    FULL OUTER JOIN recurring_expenses re 
-                    ON me.category_id = re.category_id
-                )
-                -- Calculate total 6-month projection
-                SELECT ROUND(SUM(monthly_projection) * 6, 2) as six_month_projection
-                FROM projected_expenses
-            """)
-            
-            target_amount = cursor.fetchone()[0] or 0
+            # Target: need-category spending over the configured horizon
+            target_amount = emergency_projection(conn, self.emergency_fund_months)
             
             # Get current emergency fund amount
+            cursor = conn.cursor()
             cursor.execute("""
-                SELECT current_amount, monthly_contribution
+                SELECT target_amount, current_amount, monthly_contribution
                 FROM emergency_fund
                 WHERE id = 1
             """)
             
             result = cursor.fetchone()
             if result:
-                current_amount, monthly_contribution = result
+                stored_target, current_amount, monthly_contribution = result
             else:
+                stored_target = None
                 current_amount = 0
                 monthly_contribution = 0
             
-            # Update emergency fund target if it differs from projection
-            cursor.execute("""
-                UPDATE emergency_fund
-                SET target_amount = ?
-                WHERE id = 1
-            """, (target_amount,))
-            
-            self.conn.commit()
-            
-            self.cached_data['emergency'] = {
+            data['emergency'] = {
                 'target': target_amount,
+                'stored_target': stored_target,
                 'current': current_amount,
                 'monthly': monthly_contribution,
                 'progress': (current_amount / target_amount * 100) if target_amount > 0 else 0
@@ -374,14 +396,23 @@ class DashboardPage(QWidget):
                 
         except sqlite3.Error as e:
             print(f"Database error in emergency fund: {e}")
-            self.cached_data['emergency'] = {
-                'target': 0, 'current': 0, 'monthly': 0, 'progress': 0
+            data['emergency'] = {
+                'target': 0, 'stored_target': None, 'current': 0, 'monthly': 0, 'progress': 0
             }
 
-    def load_savings_goals(self):
+    def save_emergency_target(self, emergency):
+        """Store the projected target if it moved; workers only read, so this runs here"""
+        if emergency['stored_target'] is None or emergency['target'] == emergency['stored_target']:
+            return
+        try:
+            save_emergency_target(self.conn, emergency['target'])
+        except sqlite3.Error as e:
+            print(f"Database error saving emergency fund target: {e}")
+
+    def load_savings_goals(self, conn, data):
         """Load savings goals data"""
         try:
-            cursor = self.conn.cursor()
+            cursor = conn.cursor()
             cursor.execute("""
                 SELECT 
                     name,
@@ -389,14 +420,14 @@ class DashboardPage(QWidget):
                     current_amount,
                     target_date,
                     monthly_contribution,
-                    (current_amount / target_amount * 100) as progress
+                    (current_amount * 100.0 / target_amount) as progress
                 FROM savings_goals
                 WHERE target_date >= date('now')
                 ORDER BY target_date ASC
             """)
             
             goals = cursor.fetchall()
-            self.cached_data['savings'] = {
+            data['savings'] = {
                 'goals': goals,
                 'total_goals': len(goals),
                 'total_saved': sum(goal[2] for goal in goals)
@@ -404,14 +435,14 @@ class DashboardPage(QWidget):
             
         except sqlite3.Error as e:
             print(f"Database error in savings goals: {e}")
-            self.cached_data['savings'] = {
+            data['savings'] = {
                 'goals': [], 'total_goals': 0, 'total_saved': 0
             }
 
-    def load_recent_transactions(self):
+    def load_recent_transactions(self, conn, data):
         """Load recent transactions"""
         try:
-            cursor = self.conn.cursor()
+            cursor = conn.cursor()
             cursor.execute("""
                 SELECT 
                     t.date,
@@ -425,40 +456,40 @@ class DashboardPage(QWidget):
                 LIMIT 10
             """)
             
-            self.cached_data['recent_transactions'] = cursor.fetchall()
+            data['recent_transactions'] = cursor.fetchall()
             
         except sqlite3.Error as e:
             print(f"Database error in recent transactions: {e}")
-            self.cached_data['recent_transactions'] = []
+            data['recent_transactions'] = []
 
-    def load_monthly_income(self):
+    def load_monthly_income(self, conn, data):
         """Load monthly income data"""
         try:
-            cursor = self.conn.cursor()
+            cursor = conn.cursor()
             current_month = datetime.now().strftime('%Y-%m')
             
             # Get total monthly income
             cursor.execute("""
                 SELECT COALESCE(SUM(amount), 0) as monthly_income
                 FROM income
-                WHERE strftime('%Y-%m', date) = ?
+                WHERE month = ?
                    OR (is_recurring = 1 AND frequency = 'monthly')
             """, (current_month,))
             
             monthly_income = cursor.fetchone()[0]
-            self.cached_data['income'] = {
+            data['income'] = {
                 'monthly': monthly_income,
-                'recurring': self.get_recurring_income()
+                'recurring': self.get_recurring_income(conn)
             }
             
         except sqlite3.Error as e:
             print(f"Database error in monthly income: {e}")
-            self.cached_data['income'] = {'monthly': 0, 'recurring': 0}
+            data['income'] = {'monthly': 0, 'recurring': 0}
 
-    def get_recurring_income(self):
+    def get_recurring_income(self, conn):
         """Calculate total recurring monthly income"""
         try:
-            cursor = self.conn.cursor()
+            cursor = conn.cursor()
             cursor.execute("""
                 SELECT COALESCE(SUM(amount), 0)
                 FROM income
@@ -468,34 +499,33 @@ class DashboardPage(QWidget):
         except sqlite3.Error:
             return 0
 
-    def load_analysis_data(self):
+    def load_analysis_data(self, conn, data):
         """Load analysis data for insights"""
         try:
-            cursor = self.conn.cursor()
+            cursor = conn.cursor()
             current_month = datetime.now().strftime('%Y-%m')
             
             # Top spending categories
             cursor.execute("""
                 SELECT 
                     c.name,
-                    SUM(t.amount) as total,
-                    COUNT(t.id) as count,
-                    (SUM(t.amount) / c.budget * 100) as budget_percent
-                FROM transactions t
-                JOIN categories c ON t.category_id = c.id
-                WHERE strftime('%Y-%m', t.date) = ?
-                GROUP BY c.id
-                ORDER BY total DESC
+                    m.total,
+                    m.count,
+                    (m.total * 100.0 / c.budget) as budget_percent
+                FROM category_month_totals m
+                JOIN categories c ON m.category_id = c.id
+                WHERE m.month = ?
+                ORDER BY m.total DESC
                 LIMIT 5
             """, (current_month,))
             
-            self.cached_data['top_categories'] = cursor.fetchall()
+            data['top_categories'] = cursor.fetchall()
             
             # Month-over-month trends
             cursor.execute("""
                 WITH monthly_totals AS (
                     SELECT 
-                        strftime('%Y-%m', date) as month,
+                        month,
                         SUM(amount) as total
                     FROM transactions
                     GROUP BY month
@@ -509,7 +539,7 @@ class DashboardPage(QWidget):
                 FROM monthly_totals
             """)
             
-            self.cached_data['trends'] = cursor.fetchall()
+            data['trends'] = cursor.fetchall()
             
             # Calculate insights
             insights = []
@@ -519,14 +549,13 @@ class DashboardPage(QWidget):
                 SELECT 
                     c.name,
                     c.budget,
-                    COALESCE(SUM(t.amount), 0) as spent,
-                    (COALESCE(SUM(t.amount), 0) / c.budget * 100) as utilization
+                    COALESCE(m.total, 0) as spent,
+                    (COALESCE(m.total, 0) * 100.0 / c.budget) as utilization
                 FROM categories c
-                LEFT JOIN transactions t ON c.id = t.category_id 
-                    AND strftime('%Y-%m', t.date) = ?
+                LEFT JOIN category_month_totals m ON c.id = m.category_id 
+                    AND m.month = ?
                 WHERE c.type = 'expense'
-                GROUP BY c.id
-                HAVING utilization > 90 OR utilization < 20
+                AND (utilization > 90 OR utilization < 20)
             """, (current_month,))
             
             for category in cursor.fetchall():
@@ -537,22 +566,22 @@ class DashboardPage(QWidget):
                     insights.append(f"💡 {name} is only at {utilization:.1f}% of budget")
             
             # Savings rate insight
-            if 'income' in self.cached_data and self.cached_data['income']['monthly'] > 0:
-                savings_rate = ((self.cached_data['income']['monthly'] - 
-                               self.cached_data['budget']['spent']) / 
-                               self.cached_data['income']['monthly'] * 100)
+            if 'income' in data and data['income']['monthly'] > 0:
+                savings_rate = ((data['income']['monthly'] - 
+                               data['budget']['spent']) / 
+                               data['income']['monthly'] * 100)
                 if savings_rate < 20:
                     insights.append(f"⚠️ Low savings rate: {savings_rate:.1f}%")
                 elif savings_rate > 40:
                     insights.append(f"🎯 Great savings rate: {savings_rate:.1f}%")
             
-            self.cached_data['insights'] = insights
+            data['insights'] = insights
             
         except sqlite3.Error as e:
             print(f"Database error in analysis: {e}")
-            self.cached_data['top_categories'] = []
-            self.cached_data['trends'] = []
-            self.cached_data['insights'] = []
+            data['top_categories'] = []
+            data['trends'] = []
+            data['insights'] = []
 
     def update_ui_from_cache(self):
         """Update UI elements from cached data"""
@@ -563,7 +592,7 @@ class DashboardPage(QWidget):
                 budget_label = self.budget_card.findChild(QLabel, "value_label")
                 if budget_label:
                     budget_label.setText(
-                        f"₹{budget_data['spent']:,.2f} / ₹{budget_data['total']:,.2f}"
+                        f"{format_rupees(budget_data['spent'])} / {format_rupees(budget_data['total'])}"
                     )
                 
                 budget_progress = self.budget_card.findChild(QProgressBar, "budget_progress")
@@ -578,7 +607,7 @@ class DashboardPage(QWidget):
                 emergency_label = self.emergency_card.findChild(QLabel, "value_label")
                 if emergency_label:
                     emergency_label.setText(
-                        f"₹{emergency_data['current']:,.2f} / ₹{emergency_data['target']:,.2f}"
+                        f"{format_rupees(emergency_data['current'])} / {format_rupees(emergency_data['target'])}"
                     )
                 
                 emergency_progress = self.emergency_card.findChild(QProgressBar, "emergency_progress")
@@ -605,7 +634,7 @@ class DashboardPage(QWidget):
                 income_data = self.cached_data['income']
                 income_label = self.income_card.findChild(QLabel, "value_label")
                 if income_label:
-                    income_label.setText(f"₹{income_data['monthly']:,.2f}")
+                    income_label.setText(format_rupees(income_data['monthly']))
                 
                 income_progress = self.income_card.findChild(QProgressBar, "income_progress")
                 if income_progress:
@@ -617,7 +646,7 @@ class DashboardPage(QWidget):
             if 'top_categories' in self.cached_data:
                 top_cats_text = []
                 for name, total, count, percent in self.cached_data['top_categories']:
-                    top_cats_text.append(f"• {name}: ₹{total:,.2f} ({count} transactions)")
+                    top_cats_text.append(f"• {name}: {format_rupees(total)} ({count} transactions)")
                 self.top_categories_list.setText("\n".join(top_cats_text))
             
             if 'trends' in self.cached_data:
@@ -626,9 +655,9 @@ class DashboardPage(QWidget):
                     month_name = datetime.strptime(month, '%Y-%m').strftime('%B %Y')
                     if prev_total:
                         change = ((total - prev_total) / prev_total * 100)
-                        trends_text.append(f"• {month_name}: ₹{total:,.2f} ({change:+.1f}%)")
+                        trends_text.append(f"• {month_name}: {format_rupees(total)} ({change:+.1f}%)")
                     else:
-                        trends_text.append(f"• {month_name}: ₹{total:,.2f}")
+                        trends_text.append(f"• {month_name}: {format_rupees(total)}")
                 self.trends_list.setText("\n".join(trends_text))
             
             if 'insights' in self.cached_data:
@@ -637,65 +666,26 @@ class DashboardPage(QWidget):
         except Exception as e:
             print(f"Error updating UI from cache: {e}")
 
-    def update_charts(self):
-        """Update all charts with latest data"""
+    def load_chart_data(self, conn, data):
+        """Load the series plotted by the dashboard charts"""
         try:
-            # Clear previous charts
-            self.spending_figure.clear()
-            self.category_figure.clear()
-            
-            # Set style
-            plt.style.use('bmh')  # Using a built-in style
-            
-            # Create subplots with white background
-            spending_ax = self.spending_figure.add_subplot(111, facecolor='white')
-            category_ax = self.category_figure.add_subplot(111, facecolor='white')
-            
-            # Set figure background to white
-            self.spending_figure.patch.set_facecolor('white')
-            self.category_figure.patch.set_facecolor('white')
+            cursor = conn.cursor()
             
             # Spending Trends
-            cursor = self.conn.cursor()
             cursor.execute("""
-                SELECT date, SUM(amount) as daily_total
-                FROM transactions
-                WHERE type = 'expense'
-                AND date >= date('now', '-30 days')
+                SELECT date, SUM(expense) as daily_total
+                FROM all_daily_totals
+                WHERE date >= date('now', '-30 days')
                 GROUP BY date
+                HAVING daily_total > 0
                 ORDER BY date
             """)
-            
-            results = cursor.fetchall()
-            if results:
-                dates, amounts = zip(*results)
-                dates = [datetime.strptime(d, '%Y-%m-%d') for d in dates]
-                
-                # Plot spending trend
-                spending_ax.plot(dates, amounts, marker='o', color='#2196F3', linewidth=2, markersize=6)
-                spending_ax.fill_between(dates, amounts, alpha=0.2, color='#2196F3')
-                
-                # Customize spending chart
-                spending_ax.set_title('30-Day Spending Trend', pad=20, fontsize=12, fontweight='bold')
-                spending_ax.set_xlabel('Date', labelpad=10)
-                spending_ax.set_ylabel('Amount (₹)', labelpad=10)
-                spending_ax.xaxis.set_major_formatter(mdates.DateFormatter('%d-%b'))
-                spending_ax.tick_params(axis='x', rotation=45)
-                spending_ax.grid(True, linestyle='--', alpha=0.7, color='#cccccc')
-                
-                # Format y-axis to show amounts in thousands
-                spending_ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'₹{x:,.0f}'))
-                
-                # Add some padding to the plot
-                spending_ax.margins(x=0.05)
-            else:
-                spending_ax.text(0.5, 0.5, 'No recent transactions',
-                               ha='center', va='center', fontsize=12)
+            data['spending_trend'] = [(day, to_rupees(total)) for day, total in cursor]
             
             # Category Distribution
             cursor.execute("""
                 SELECT c.name, SUM(t.amount) as total
-                FROM transactions t
+                FROM all_transactions t
                 JOIN categories c ON t.category_id = c.id
                 WHERE t.type = 'expense'
                 AND t.date >= date('now', '-30 days')
@@ -703,60 +693,23 @@ class DashboardPage(QWidget):
                 ORDER BY total DESC
                 LIMIT 5
             """)
+            data['category_distribution'] = [(name, to_rupees(total)) for name, total in cursor]
             
-            results = cursor.fetchall()
-            if results:
-                categories, totals = zip(*results)
-                
-                # Custom colors for pie chart
-                colors = ['#2196F3', '#4CAF50', '#FFC107', '#9C27B0', '#F44336']
-                
-                # Create pie chart
-                wedges, texts, autotexts = category_ax.pie(
-                    totals, 
-                    labels=categories, 
-                    colors=colors,
-                    autopct='%1.1f%%',
-                    startangle=90,
-                    wedgeprops={'width': 0.7}  # Create a donut chart
-                )
-                
-                # Customize pie chart
-                category_ax.set_title('Top 5 Expense Categories\n(Last 30 Days)', 
-                                    pad=20, fontsize=12, fontweight='bold')
-                
-                # Enhance the appearance of labels and percentages
-                plt.setp(autotexts, size=9, weight="bold", color='black')
-                plt.setp(texts, size=10, color='black')
-                
-                # Add a legend
-                category_ax.legend(
-                    wedges, categories,
-                    title="Categories",
-                    loc="center left",
-                    bbox_to_anchor=(1, 0, 0.5, 1)
-                )
-            else:
-                category_ax.text(0.5, 0.5, 'No category data',
-                               ha='center', va='center', fontsize=12)
-            
-            # Adjust layout and display
-            self.spending_figure.tight_layout()
-            self.category_figure.tight_layout()
-            self.spending_canvas.draw()
-            self.category_canvas.draw()
-            
+        except sqlite3.Error as e:
+            print(f"Database error in chart data: {e}")
+            data['spending_trend'] = []
+            data['category_distribution'] = []
+
+    def update_charts(self):
+        """Update both charts in place; unchanged series are not redrawn"""
+        try:
+            self.spending_chart.update(self.cached_data.get('spending_trend', []))
+            self.category_chart.update(self.cached_data.get('category_distribution', []))
         except Exception as e:
             print(f"Error updating charts: {e}")
             # Show error message in charts
-            for fig, canvas in [(self.spending_figure, self.spending_canvas),
-                              (self.category_figure, self.category_canvas)]:
-                fig.clear()
-                ax = fig.add_subplot(111)
-                ax.text(0.5, 0.5, f'Error loading chart:\n{str(e)}',
-                       ha='center', va='center', fontsize=10,
-                       wrap=True)
-                canvas.draw()
+            for chart in (self.spending_chart, self.category_chart):
+                chart.show_message(f'Error loading chart:\n{str(e)}')
 
     def show_status_message(self, message, timeout=3000):
         """Show a message in the status bar"""
@@ -768,6 +721,15 @@ class DashboardPage(QWidget):
         if parent and isinstance(parent, QMainWindow):
             parent.statusBar().showMessage(message, timeout)
 
+    def on_data_changed(self):
+        """Reload right away if visible, otherwise when next shown"""
+        if self.isVisible():
+            self.load_data()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.load_data()
+
     def refresh_data(self):
         """Refresh all dashboard data"""
         self.load_data()
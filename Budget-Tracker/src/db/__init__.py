@@ -0,0 +1 @@
+"""Database package for Budget Tracker"""
@@ -0,0 +1,437 @@
+"""Yearly archive databases for closed years.
+
+Expenses and income from a year before the current one can be moved out
+of budget.db into archives/budget_YYYY.db, which keeps the tables and
+indexes the app works on every day small. Queries that may reach into
+those years (reports, the calendar, dashboard averages) call
+attach_archives() for their date range and read from the all_transactions
+and all_income views, which add the rows of every attached archive to
+the ones still in budget.db; all_daily_totals does the same for the
+per-day totals. Without archives the views cover just budget.db.
+
+The history tables, search and the monthly rollups only cover budget.db.
+"""
+
+import sqlite3
+from datetime import date
+from pathlib import Path
+
+from .query_worker import database_path
+from .rollups import create_daily_totals_table, rebuild_daily_totals
+
+ARCHIVE_DIR = "archives"
+
+# Columns copied to the archives and exposed by the views, per table
+ARCHIVED_COLUMNS = {
+    "transactions": ("id", "date", "category_id", "amount", "description",
+                     "type", "created_at", "month"),
+    "income": ("id", "date", "amount", "source", "is_recurring", "frequency",
+               "next_date", "created_at", "month"),
+}
+
+# Summary tables kept in each archive too, and exposed as all_<table> views
+SUMMARY_COLUMNS = {
+    "daily_totals": ("date", "expense", "income", "count"),
+}
+
+# Archives at an older user_version are upgraded by upgrade_archive()
+ARCHIVE_VERSION = 3  # 1: amounts in integer paise, 2: daily_totals, 3: moved_rows kept
+
+# Archive tables by name; {schema} is the schema they are created in
+ARCHIVE_TABLES = {
+    "transactions": """
+    CREATE TABLE IF NOT EXISTS {schema}.transactions (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        category_id INTEGER,
+        amount INTEGER NOT NULL,  -- paise
+        description TEXT,
+        type TEXT NOT NULL,
+        created_at TIMESTAMP,
+        month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+    )
+    """,
+    "income": """
+    CREATE TABLE IF NOT EXISTS {schema}.income (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        amount INTEGER NOT NULL,  -- paise
+        source TEXT NOT NULL,
+        is_recurring BOOLEAN DEFAULT 0,
+        frequency TEXT,
+        next_date TEXT,
+        created_at TIMESTAMP,
+        month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+    )
+    """,
+    # Which budget.db row each archive row was copied from (see
+    # archive_year and drop_archived_copies)
+    "moved_rows": """
+    CREATE TABLE IF NOT EXISTS {schema}.moved_rows (
+        table_name TEXT NOT NULL,
+        archive_id INTEGER NOT NULL,
+        main_id INTEGER NOT NULL,
+        PRIMARY KEY (table_name, archive_id)
+    ) WITHOUT ROWID
+    """,
+}
+
+ARCHIVE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_transactions_date ON transactions(date)",
+    """
+    CREATE INDEX IF NOT EXISTS {schema}.idx_transactions_month_type
+    ON transactions(month, type, amount)
+    """,
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_income_date ON income(date)",
+    """
+    CREATE INDEX IF NOT EXISTS {schema}.idx_moved_rows_main
+    ON moved_rows(table_name, main_id)
+    """,
+)
+
+
+def archive_dir(conn):
+    """Directory holding the archives of conn's database"""
+    return Path(database_path(conn)).parent / ARCHIVE_DIR
+
+
+def archive_path(conn, year):
+    return archive_dir(conn) / f"budget_{year}.db"
+
+
+def archive_files(db_path):
+    """{year: path} of the archive files of the database at db_path"""
+    files = {}
+    for path in (Path(db_path).parent / ARCHIVE_DIR).glob("budget_*.db"):
+        suffix = path.stem.split("_", 1)[1]
+        if suffix.isdigit():
+            files[int(suffix)] = path
+    return files
+
+
+def archived_years(conn):
+    """Years that have an archive file, oldest first"""
+    if database_path(conn) is None:
+        return []
+    return sorted(archive_files(database_path(conn)))
+
+
+def schema_name(year):
+    return f"archive_{year}"
+
+
+def attached_archives(conn):
+    """Years whose archive is attached to conn"""
+    return {int(name.split("_", 1)[1])
+            for _, name, _ in conn.execute("PRAGMA database_list")
+            if name.startswith("archive_")}
+
+
+def create_views(conn, years):
+    """(Re)create the all_<table> views over main and years.
+
+    The views are TEMP because only a temp view may read from attached
+    databases; read-only connections are allowed to create them once
+    query_only is lifted for the statement.
+    """
+    query_only = conn.execute("PRAGMA query_only").fetchone()[0]
+    if query_only:
+        conn.execute("PRAGMA query_only = OFF")
+    try:
+        for table, columns in {**ARCHIVED_COLUMNS, **SUMMARY_COLUMNS}.items():
+            column_list = ", ".join(columns)
+            selects = [f"SELECT {column_list} FROM main.{table}"]
+            selects += [f"SELECT {column_list} FROM {schema_name(year)}.{table}"
+                        for year in sorted(years)]
+            conn.execute(f"DROP VIEW IF EXISTS temp.all_{table}")
+            conn.execute(f"CREATE TEMP VIEW all_{table} AS "
+                         + " UNION ALL ".join(selects))
+    finally:
+        if query_only:
+            conn.execute("PRAGMA query_only = ON")
+
+
+def drop_views(conn):
+    """Remove the all_<table> views from a connection that writes.
+
+    They name main tables and archives that a later schema change or
+    DETACH may not find, and SQLite checks every view on ALTER TABLE.
+    """
+    for table in (*ARCHIVED_COLUMNS, *SUMMARY_COLUMNS):
+        conn.execute(f"DROP VIEW IF EXISTS temp.all_{table}")
+
+
+def attach_archives(conn, start_date, end_date=None):
+    """Attach the archives a date range needs and point the views at them.
+
+    Archives outside the range are detached again, so a connection never
+    holds more than the range needs (SQLite allows 10 attachments by
+    default). Must be called outside a transaction; cheap when nothing
+    changes.
+    """
+    end_date = end_date or date.today().isoformat()
+    first, last = int(start_date[:4]), int(end_date[:4])
+    wanted = {year for year in archived_years(conn) if first <= year <= last}
+    attached = attached_archives(conn)
+    views = [f"all_{table}" for table in (*ARCHIVED_COLUMNS, *SUMMARY_COLUMNS)]
+    views_exist = conn.execute(f"""
+        SELECT COUNT(*) FROM sqlite_temp_master
+        WHERE type = 'view' AND name IN ({", ".join("?" * len(views))})
+    """, views).fetchone()[0] == len(views)
+    if wanted == attached and views_exist:
+        return
+
+    # The views must go before the databases they read can be detached
+    create_views(conn, ())
+    for year in attached - wanted:
+        conn.execute(f"DETACH DATABASE {schema_name(year)}")
+    for year in wanted - attached:
+        conn.execute(f"ATTACH DATABASE ? AS {schema_name(year)}",
+                     (str(archive_path(conn, year)),))
+    create_views(conn, wanted)
+
+
+def copied_condition(schema, table):
+    """SQL that is true when budget.db row m has been copied to the archive.
+
+    The copy must be recorded for m's id in moved_rows and still match m
+    in every stored column, so a row that reused the id of a copied one
+    never passes for it.
+    """
+    stored = [column for column in ARCHIVED_COLUMNS[table] if column not in ("id", "month")]
+    same = " AND ".join(f"a.{column} IS m.{column}" for column in stored)
+    return f"""EXISTS (
+        SELECT 1 FROM {schema}.moved_rows r
+        JOIN {schema}.{table} a ON a.id = r.archive_id
+        WHERE r.table_name = '{table}' AND r.main_id = m.id AND {same}
+    )"""
+
+
+def archive_year(conn, year):
+    """Move one closed year's expenses and income into its archive file.
+
+    The rows are copied and committed to the archive first and only then
+    deleted from budget.db: under WAL a transaction spanning two database
+    files is not atomic, and this order means an interruption can only
+    leave rows in both places, never in neither. Each copied row is
+    recorded in the archive's moved_rows in the same transaction, and
+    only rows with a recorded, identical copy are deleted. Running it
+    again for the same year finishes the move without copying anything
+    twice. The records are kept so drop_archived_copies can recognise
+    the rows when a backup brings them back.
+
+    Returns a dict of table name to rows moved.
+    """
+    if year >= date.today().year:
+        raise ValueError(f"{year} is not a closed year")
+
+    path = archive_path(conn, year)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    schema = schema_name(year)
+    start_date, end_date = f"{year}-01-01", f"{year}-12-31"
+
+    conn.commit()
+    drop_views(conn)  # the views may read from the archive being written
+    if year in attached_archives(conn):
+        conn.execute(f"DETACH DATABASE {schema}")
+    upgrade_archive(path)
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+    cursor = conn.cursor()
+    moved = {}
+    try:
+        with conn:
+            for statement in (*ARCHIVE_TABLES.values(), *ARCHIVE_INDEXES):
+                cursor.execute(statement.format(schema=schema))
+            create_daily_totals_table(cursor, schema)
+            cursor.execute(f"PRAGMA {schema}.user_version = {ARCHIVE_VERSION}")
+
+        with conn:
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS archive_plan (
+                    main_id INTEGER PRIMARY KEY,
+                    archive_id INTEGER NOT NULL
+                )
+            """)
+            for table, columns in ARCHIVED_COLUMNS.items():
+                stored = [column for column in columns if column != "month"]
+                pending = f"""
+                    FROM main.{table} m
+                    WHERE m.date BETWEEN ? AND ?
+                    AND NOT {copied_condition(schema, table)}
+                """
+                cursor.execute("DELETE FROM temp.archive_plan")
+                # Rows keep their id when the archive doesn't use it yet...
+                cursor.execute(f"""
+                    INSERT INTO temp.archive_plan (main_id, archive_id)
+                    SELECT m.id, m.id {pending}
+                    AND NOT EXISTS (SELECT 1 FROM {schema}.{table} a WHERE a.id = m.id)
+                """, (start_date, end_date))
+                # ...and a reused id is given a new one above every id taken
+                cursor.execute(f"""
+                    INSERT INTO temp.archive_plan (main_id, archive_id)
+                    SELECT m.id, (
+                        SELECT MAX(COALESCE((SELECT MAX(id) FROM {schema}.{table}), 0),
+                                   COALESCE((SELECT MAX(archive_id) FROM temp.archive_plan), 0))
+                    ) + ROW_NUMBER() OVER (ORDER BY m.id)
+                    {pending}
+                    AND m.id NOT IN (SELECT main_id FROM temp.archive_plan)
+                """, (start_date, end_date))
+                cursor.execute(f"""
+                    INSERT INTO {schema}.{table} ({", ".join(stored)})
+                    SELECT p.archive_id, {", ".join(f"m.{column}" for column in stored[1:])}
+                    FROM temp.archive_plan p
+                    JOIN main.{table} m ON m.id = p.main_id
+                """)
+                cursor.execute(f"""
+                    INSERT INTO {schema}.moved_rows (table_name, archive_id, main_id)
+                    SELECT '{table}', archive_id, main_id FROM temp.archive_plan
+                """)
+            cursor.execute("DROP TABLE temp.archive_plan")
+            rebuild_daily_totals(cursor, schema)
+
+        with conn:
+            for table in ARCHIVED_COLUMNS:
+                cursor.execute(f"""
+                    DELETE FROM main.{table} AS m
+                    WHERE m.date BETWEEN ? AND ?
+                    AND {copied_condition(schema, table)}
+                """, (start_date, end_date))
+                moved[table] = cursor.rowcount
+    finally:
+        conn.execute(f"DETACH DATABASE {schema}")
+    return moved
+
+
+def drop_archived_copies(conn):
+    """Delete budget.db rows that are exact copies of archived rows.
+
+    Restoring a backup taken before a year was archived brings that
+    year's rows back into budget.db while its archive still holds them,
+    and the all_<table> views would count them twice. A row is dropped
+    only if the archive recorded copying it, as archive_year does before
+    its own delete, so rows that were given a new id in the archive are
+    recognised too. Returns the number of rows deleted.
+    """
+    conn.commit()
+    drop_views(conn)
+    cursor = conn.cursor()
+    deleted = 0
+    for year in archived_years(conn):
+        schema = schema_name(year)
+        if year in attached_archives(conn):
+            conn.execute(f"DETACH DATABASE {schema}")
+        upgrade_archive(archive_path(conn, year))  # restored archives may predate moved_rows
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(archive_path(conn, year)),))
+        try:
+            with conn:
+                for table in ARCHIVED_COLUMNS:
+                    cursor.execute(f"""
+                        DELETE FROM main.{table} AS m
+                        WHERE m.date BETWEEN ? AND ?
+                        AND {copied_condition(schema, table)}
+                    """, (f"{year}-01-01", f"{year}-12-31"))
+                    deleted += cursor.rowcount
+        finally:
+            conn.execute(f"DETACH DATABASE {schema}")
+    return deleted
+
+
+def upgrade_archive(path):
+    """Bring an archive file written by an older version up to ARCHIVE_VERSION"""
+    if not Path(path).exists():
+        return
+    conn = sqlite3.connect(path)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= ARCHIVE_VERSION:
+            return
+        conn.execute("BEGIN")
+        try:
+            tables = {name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if version < 1:
+                # Version 1: rebuild the tables with amounts in paise
+                for table, columns in ARCHIVED_COLUMNS.items():
+                    if table not in tables:
+                        continue
+                    stored = [column for column in columns if column != "month"]
+                    select_list = ", ".join(
+                        "CAST(round(amount * 100) AS INTEGER)" if column == "amount" else column
+                        for column in stored)
+                    conn.execute(f"ALTER TABLE {table} RENAME TO old_{table}")
+                    conn.execute(ARCHIVE_TABLES[table].format(schema="main"))
+                    conn.execute(f"""
+                        INSERT INTO {table} ({", ".join(stored)})
+                        SELECT {select_list} FROM old_{table}
+                    """)
+                    conn.execute(f"DROP TABLE old_{table}")
+            if version < 3 and "moved_rows" in tables:
+                # Version 3 keys the records by archive row, and keeps them
+                conn.execute("ALTER TABLE moved_rows RENAME TO old_moved_rows")
+            for statement in (*ARCHIVE_TABLES.values(), *ARCHIVE_INDEXES):
+                conn.execute(statement.format(schema="main"))
+            if version < 3:
+                if "moved_rows" in tables:
+                    conn.execute("""
+                        INSERT OR IGNORE INTO moved_rows (table_name, archive_id, main_id)
+                        SELECT table_name, archive_id, main_id FROM old_moved_rows
+                    """)
+                    conn.execute("DROP TABLE old_moved_rows")
+                # Earlier moves dropped their records: assume the rows kept their id
+                for table in ARCHIVED_COLUMNS:
+                    if table in tables:
+                        conn.execute(f"""
+                            INSERT OR IGNORE INTO moved_rows (table_name, archive_id, main_id)
+                            SELECT '{table}', id, id FROM {table}
+                        """)
+            # Version 2: per-day totals of the archived transactions
+            cursor = conn.cursor()
+            create_daily_totals_table(cursor)
+            rebuild_daily_totals(cursor)
+            conn.execute(f"PRAGMA user_version = {ARCHIVE_VERSION}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        conn.close()
+
+
+def upgrade_archives(conn):
+    """Upgrade every archive of conn's database"""
+    for year in archived_years(conn):
+        upgrade_archive(archive_path(conn, year))
+
+
+def closed_years(conn):
+    """Years before the current one that still have rows in budget.db"""
+    current = str(date.today().year)
+    years = set()
+    for table in ARCHIVED_COLUMNS:
+        for (year,) in conn.execute(f"""
+            SELECT DISTINCT substr(date, 1, 4) FROM {table}
+            WHERE date < ?
+        """, (f"{current}-01-01",)):
+            years.add(int(year))
+    return sorted(years)
+
+
+def run_archive_command(db_path):
+    """Archive every closed year from the command line"""
+    from .migrations import migrate  # imports this module
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        migrate(conn)  # archives hold amounts in the current units
+        years = closed_years(conn)
+        if not years:
+            print("No closed years left to archive")
+            return 0
+        for year in years:
+            moved = archive_year(conn, year)
+            print(f"Archived {year} to {archive_path(conn, year)}: "
+                  f"{moved['transactions']} transactions, {moved['income']} income entries")
+        return 0
+    finally:
+        conn.close()
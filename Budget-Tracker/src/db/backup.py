@@ -0,0 +1,387 @@
+"""Online backups of the live database using the SQLite backup API.
+
+Connection.backup copies the database page by page from its own
+connection, so the app keeps reading and writing while a backup runs and
+nothing has to be closed first.
+
+Backups are stored gzip-compressed. A snapshot whose contents match the
+newest backup is discarded, and older backups are thinned out with a
+grandfather-father-son policy (see prune_backups).
+
+The yearly archives are backed up alongside budget.db: each backup's
+manifest entry names the compressed copy of every archive it goes with.
+Copies live in backups/archives and are named after their content hash,
+so an archive that hasn't changed is stored once however many backups
+refer to it.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from .archive import archive_files
+
+BACKUP_DIR = Path("backups")
+MANIFEST_NAME = "manifest.json"  # content hash and summary of each backup
+ARCHIVE_COPY_DIR = "archives"  # compressed archive copies, under BACKUP_DIR
+PAGES_PER_STEP = 256  # pages copied between progress updates
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+BACKUP_NAME = re.compile(r"^budget_backup_(\d{8}_\d{6})\.db(\.gz)?$")
+
+# Grandfather-father-son retention: keep the newest backup from each of the
+# most recent N hours, days and months that have one
+KEEP_HOURLY = 24
+KEEP_DAILY = 30
+KEEP_MONTHLY = 12
+
+# Held for a whole backup or restore, so an hourly backup can never prune
+# or rewrite the manifest in the middle of a restore (and vice versa)
+backup_lock = threading.RLock()
+# Held while the manifest is read, changed and written back
+manifest_lock = threading.RLock()
+
+
+def new_backup_path(backup_dir=BACKUP_DIR):
+    """Return a timestamped path for the next backup"""
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+    return Path(backup_dir) / f"budget_backup_{timestamp}.db.gz"
+
+
+def list_backups(backup_dir=BACKUP_DIR):
+    """Return (created, path) for every backup file, newest first.
+
+    Both compressed backups and the plain .db copies made by earlier
+    versions are included.
+    """
+    backups = []
+    backup_dir = Path(backup_dir)
+    if not backup_dir.is_dir():
+        return backups
+    for path in backup_dir.iterdir():
+        match = BACKUP_NAME.match(path.name)
+        if match:
+            backups.append((datetime.strptime(match.group(1), TIMESTAMP_FORMAT), path))
+    backups.sort(reverse=True)
+    return backups
+
+
+def backups_to_keep(backups):
+    """Pick the backups retained by the hourly/daily/monthly policy.
+
+    backups is (created, path) newest first, as from list_backups().
+    """
+    keep = set()
+    for bucket_format, count in (("%Y%m%d%H", KEEP_HOURLY),
+                                 ("%Y%m%d", KEEP_DAILY),
+                                 ("%Y%m", KEEP_MONTHLY)):
+        buckets = set()
+        for created, path in backups:
+            bucket = created.strftime(bucket_format)
+            if bucket in buckets:
+                continue
+            if len(buckets) == count:
+                break
+            buckets.add(bucket)
+            keep.add(path)  # newest backup in this bucket
+    return keep
+
+
+def prune_backups(backup_dir=BACKUP_DIR):
+    """Delete backups the retention policy no longer needs; returns them"""
+    backups = list_backups(backup_dir)
+    keep = backups_to_keep(backups)
+    removed = [path for created, path in backups if path not in keep]
+    for path in removed:
+        path.unlink(missing_ok=True)
+
+    with manifest_lock:
+        manifest = load_manifest(backup_dir)
+        if removed:
+            for path in removed:
+                manifest.pop(path.name, None)
+            save_manifest(backup_dir, manifest)
+
+    # Archive copies that no remaining backup refers to
+    referenced = {name for entry in manifest.values() if isinstance(entry, dict)
+                  for name in entry.get("archives", {}).values()}
+    copy_dir = Path(backup_dir) / ARCHIVE_COPY_DIR
+    if copy_dir.is_dir():
+        for path in copy_dir.glob("*.db.gz"):
+            if path.name not in referenced:
+                path.unlink(missing_ok=True)
+    return removed
+
+
+def load_manifest(backup_dir=BACKUP_DIR):
+    try:
+        with open(Path(backup_dir) / MANIFEST_NAME, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(backup_dir, manifest):
+    """Write the manifest through a temporary file of its own, then rename it"""
+    fd, partial_path = tempfile.mkstemp(dir=backup_dir, prefix=MANIFEST_NAME + ".",
+                                        suffix=".part")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(partial_path, Path(backup_dir) / MANIFEST_NAME)
+    except Exception:
+        Path(partial_path).unlink(missing_ok=True)
+        raise
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def latest_entry(backup_dir=BACKUP_DIR):
+    """Manifest entry of the newest backup; {} if it is not recorded"""
+    backups = list_backups(backup_dir)
+    if not backups:
+        return {}
+    entry = load_manifest(backup_dir).get(backups[0][1].name)
+    if isinstance(entry, str):  # manifests used to hold only the hash
+        return {"sha256": entry}
+    return entry or {}
+
+
+def compress_file(source_path, dest_path):
+    """gzip source_path to dest_path via a temporary file"""
+    dest_path = Path(dest_path)
+    partial_path = dest_path.with_name(dest_path.name + ".part")
+    try:
+        with open(source_path, "rb") as src, gzip.open(partial_path, "wb", compresslevel=1) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    except Exception:
+        partial_path.unlink(missing_ok=True)
+        raise
+    os.replace(partial_path, dest_path)
+
+
+def archive_copies(db_path):
+    """{archive file name: (path, copy name)} for the archives of db_path.
+
+    The copy name holds the archive's content hash, so unchanged archives
+    map to the copy an earlier backup already stored.
+    """
+    copies = {}
+    for path in sorted(archive_files(db_path).values()):
+        digest = file_digest(path)
+        copies[path.name] = (path, f"{path.stem}_{digest[:16]}.db.gz")
+    return copies
+
+
+def store_archive_copies(copies, backup_dir):
+    """Write the compressed archive copies that are not stored yet"""
+    copy_dir = Path(backup_dir) / ARCHIVE_COPY_DIR
+    copy_dir.mkdir(parents=True, exist_ok=True)
+    for path, copy_name in copies.values():
+        if not (copy_dir / copy_name).exists():
+            compress_file(path, copy_dir / copy_name)
+
+
+def read_only_uri(db_path):
+    """URI that opens a database file read-only without touching it"""
+    return f"{Path(db_path).resolve().as_uri()}?mode=ro&immutable=1"
+
+
+def read_summary(db_path):
+    """Row counts and date range of a database file, for the backup list.
+
+    The dates come from the date indexes, so only the counts walk the
+    tables. Missing tables just leave their fields out.
+    """
+    summary = {}
+    conn = sqlite3.connect(read_only_uri(db_path), uri=True)
+    try:
+        dates = []
+        for table in ("transactions", "income"):
+            try:
+                summary[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                first = conn.execute(f"SELECT MIN(date) FROM {table}").fetchone()[0]
+                last = conn.execute(f"SELECT MAX(date) FROM {table}").fetchone()[0]
+            except sqlite3.Error:
+                continue
+            dates += [d for d in (first, last) if d]
+        if dates:
+            summary["first_date"] = min(dates)
+            summary["last_date"] = max(dates)
+    finally:
+        conn.close()
+    summary["db_size"] = os.path.getsize(db_path)
+    return summary
+
+
+def copy_database(source_path, dest_path, progress=None):
+    """Copy a live database to dest_path.
+
+    The copy is written to a temporary file and renamed into place, so a
+    failed or interrupted backup never leaves a truncated file behind.
+    progress, if given, is called with (pages_copied, total_pages).
+    """
+    dest_path = Path(dest_path)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = dest_path.with_name(dest_path.name + ".part")
+
+    def report(status, remaining, total):
+        if progress is not None:
+            progress(total - remaining, total)
+
+    source = sqlite3.connect(source_path)
+    try:
+        dest = sqlite3.connect(partial_path)
+        try:
+            source.backup(dest, pages=PAGES_PER_STEP, progress=report)
+        finally:
+            dest.close()
+    except Exception:
+        partial_path.unlink(missing_ok=True)
+        raise
+    finally:
+        source.close()
+
+    os.replace(partial_path, dest_path)
+    return dest_path
+
+
+def create_backup(source_path, dest_path, progress=None):
+    """Snapshot, deduplicate, compress and prune in one go.
+
+    Returns the new backup's path, or None when the database and its
+    archives are unchanged since the newest backup and nothing was kept.
+    """
+    with backup_lock:
+        dest_path = Path(dest_path)
+        backup_dir = dest_path.parent
+        copies = archive_copies(source_path)
+        archives = {name: copy_name for name, (path, copy_name) in copies.items()}
+        snapshot = copy_database(source_path,
+                                 dest_path.with_name(dest_path.name + ".snapshot"),
+                                 progress)
+        try:
+            digest = file_digest(snapshot)
+            latest = latest_entry(backup_dir)
+            if digest == latest.get("sha256") and archives == latest.get("archives", {}):
+                return None
+            entry = {"sha256": digest, **read_summary(snapshot), "archives": archives}
+
+            store_archive_copies(copies, backup_dir)
+            compress_file(snapshot, dest_path)
+        finally:
+            snapshot.unlink(missing_ok=True)
+
+        with manifest_lock:
+            manifest = load_manifest(backup_dir)
+            manifest[dest_path.name] = entry
+            save_manifest(backup_dir, manifest)
+        prune_backups(backup_dir)
+        return dest_path
+
+
+class BackupSignals(QObject):
+    progress = pyqtSignal(int, int)  # pages copied, total pages
+    finished = pyqtSignal(str)  # path of the new backup
+    skipped = pyqtSignal()  # nothing changed since the last backup
+    failed = pyqtSignal(str)
+
+
+class BackupWorker(QRunnable):
+    """Run one backup on a QThreadPool thread"""
+
+    def __init__(self, source_path, dest_path, change_key=None):
+        super().__init__()
+        self.source_path = source_path
+        self.dest_path = dest_path
+        self.change_key = change_key
+        self.succeeded = False
+        self.signals = BackupSignals()
+        self.done = threading.Event()
+        # Kept alive by the manager, which checks done after run() returns
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            path = create_backup(self.source_path, self.dest_path,
+                                 self.signals.progress.emit)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.succeeded = True
+            if path is None:
+                self.signals.skipped.emit()
+            else:
+                self.signals.finished.emit(str(path))
+        finally:
+            self.done.set()
+
+
+class BackupManager(QObject):
+    """Starts background backups, running at most one at a time.
+
+    A request made while a backup is already running is folded into that
+    backup: it sees every commit made before it finishes, because the
+    backup API restarts the copy when another connection writes.
+
+    Callers may pass a change key (see data_version); a request whose key
+    matches the last completed backup is skipped without copying anything.
+    """
+
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(str)
+    skipped = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, db_path, backup_dir=BACKUP_DIR, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.backup_dir = Path(backup_dir)
+        self.worker = None
+
+    def is_running(self):
+        return self.worker is not None and not self.worker.done.is_set()
+
+    def start(self, change_key=None):
+        """Start a backup unless one is running or nothing changed.
+
+        Returns True if a backup was started.
+        """
+        if self.is_running():
+            return False
+        if change_key is not None and self.is_backed_up(change_key):
+            self.skipped.emit()
+            return False
+
+        self.worker = BackupWorker(self.db_path, new_backup_path(self.backup_dir), change_key)
+        self.worker.signals.progress.connect(self.progress)
+        self.worker.signals.finished.connect(self.finished)
+        self.worker.signals.skipped.connect(self.skipped)
+        self.worker.signals.failed.connect(self.failed)
+        QThreadPool.globalInstance().start(self.worker)
+        return True
+
+    def is_backed_up(self, change_key):
+        """True if the last backup succeeded and was taken at change_key"""
+        worker = self.worker
+        return (worker is not None and worker.done.is_set() and worker.succeeded
+                and worker.change_key == change_key)
+
+    def wait(self, timeout=None):
+        """Block until the current backup (if any) is done"""
+        if self.worker is not None:
+            self.worker.done.wait(timeout)
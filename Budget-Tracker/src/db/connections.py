@@ -0,0 +1,132 @@
+"""WAL setup for the writer connection and a pool of read-only connections.
+
+The app keeps one writer connection on the GUI thread (the one created in
+BudgetTracker.init_db). Anything that only reads - dashboard workers,
+reports, exports - checks a connection out of the read pool instead, so
+under WAL those reads never block a write and a write never blocks them.
+"""
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from .query_worker import database_path
+
+BUSY_TIMEOUT_MS = 5000
+
+
+def configure_writer(conn):
+    """Switch the database to WAL and apply the writer connection settings"""
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")  # durable enough with WAL
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA foreign_keys = ON")
+
+
+class ReadConnectionPool:
+    """Hands out read-only connections, at most max_connections at once.
+
+    A connection is used by one thread at a time: whoever checks it out
+    with reader() owns it until the with-block ends.
+    """
+
+    def __init__(self, db_path, max_connections=4):
+        self.uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self.max_connections = max_connections
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def open_connection(self):
+        conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if self.closed:
+                raise sqlite3.ProgrammingError("Read connection pool is closed")
+            can_open = self.opened < self.max_connections
+            if can_open:
+                self.opened += 1
+
+        if can_open:
+            try:
+                return self.open_connection()
+            except sqlite3.Error:
+                with self.lock:
+                    self.opened -= 1
+                raise
+        return self.idle.get()  # wait for another reader to finish
+
+    def release(self, conn):
+        if self.closed:
+            conn.close()
+            return
+        # End the implicit read transaction so the WAL can be checkpointed
+        conn.rollback()
+        self.idle.put(conn)
+
+    @contextmanager
+    def reader(self):
+        """Check out a read-only connection for the duration of a with-block"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close idle connections; busy ones are closed when released"""
+        with self.lock:
+            self.closed = True
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+
+
+def read_pool(conn):
+    """Return the read pool for conn's database file, or None for :memory:"""
+    path = database_path(conn)
+    if path is None:
+        return None
+    pool = _pools.get(path)
+    if pool is None or pool.closed:
+        pool = _pools[path] = ReadConnectionPool(path)
+    return pool
+
+
+@contextmanager
+def reader(conn):
+    """Yield a pooled read-only connection for conn's database.
+
+    Falls back to conn itself when the database can't be shared with
+    another connection (in-memory databases).
+    """
+    pool = read_pool(conn)
+    if pool is None:
+        yield conn
+    else:
+        with pool.reader() as read_conn:
+            yield read_conn
+
+
+def close_read_pools():
+    """Close every read pool, e.g. before the database file is copied"""
+    for pool in _pools.values():
+        pool.close()
+    _pools.clear()
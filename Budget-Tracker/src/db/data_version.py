@@ -0,0 +1,50 @@
+"""Change tracking so cached views only reload when the data has changed"""
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class DataChangeNotifier(QObject):
+    """Counts writes made by this process and announces them"""
+
+    changed = pyqtSignal()
+    rows_written = pyqtSignal(list)  # ISO dates of the rows written, [] if not known
+
+    def __init__(self):
+        super().__init__()
+        self.write_count = 0
+
+    def notify_write(self, dates=()):
+        self.write_count += 1
+        self.rows_written.emit(sorted(set(dates)))
+        self.changed.emit()
+
+
+_notifier = None
+
+
+def data_notifier():
+    """Return the process-wide change notifier"""
+    global _notifier
+    if _notifier is None:
+        _notifier = DataChangeNotifier()
+    return _notifier
+
+
+def notify_write(dates=()):
+    """Call after committing a change so caches and open views refresh.
+
+    dates are the days of the rows the change touched, when known, so
+    views keyed by day (the calendar) can refresh just those days.
+    """
+    data_notifier().notify_write(dates)
+
+
+def data_version(conn):
+    """Return a key that changes whenever the database contents may have changed.
+
+    PRAGMA data_version only moves when *another* connection commits, so
+    it is paired with the in-process write counter to also catch writes
+    made through conn itself.
+    """
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    return (data_notifier().write_count, version)
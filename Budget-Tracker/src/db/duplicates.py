@@ -0,0 +1,153 @@
+"""Duplicate detection for expenses through an indexed fingerprint column.
+
+The fingerprint is the date, the amount in paise and the trimmed,
+lower-cased description. It is a generated column, so SQLite keeps it
+right through inserts and edits, and the index on it turns "is this
+expense already recorded?" into a single index probe.
+"""
+
+import json
+import string
+
+# SQLite's built-in lower() folds ASCII letters only
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def fingerprint_sql(date, amount, description):
+    """SQL expression for the fingerprint of the given column names or parameters"""
+    return (f"({date} || '|' || {amount} || '|' "
+            f"|| lower(trim(coalesce({description}, ''))))")
+
+
+def fingerprint(date, amount, description):
+    """The fingerprint of a row, computed in Python exactly as fingerprint_sql does"""
+    description = (description or "").strip(" ")
+    description = description.lower() if description.isascii() else description.translate(ASCII_LOWER)
+    return f"{date}|{amount}|{description}"
+
+
+def create_fingerprint_index(cursor):
+    """Add the fingerprint column to transactions and index it"""
+    cursor.execute("PRAGMA table_xinfo(transactions)")
+    if not any(col[1] == 'fingerprint' for col in cursor.fetchall()):
+        cursor.execute(f"""
+            ALTER TABLE transactions
+            ADD COLUMN fingerprint TEXT
+            GENERATED ALWAYS AS {fingerprint_sql('date', 'amount', 'description')} VIRTUAL
+        """)
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_fingerprint
+        ON transactions(fingerprint)
+    """)
+
+
+COUNT_MATCHES = {
+    "transactions": f"""
+        SELECT COUNT(*) FROM transactions
+        WHERE fingerprint = {fingerprint_sql('?', '?', '?')}
+        AND type = 'expense' AND id <= ?
+    """,
+    # Income has no fingerprint column; the date index narrows it to one day
+    "income": f"""
+        SELECT COUNT(*) FROM income
+        WHERE date = ?
+        AND {fingerprint_sql('date', 'amount', 'source')} = {fingerprint_sql('?', '?', '?')}
+        AND id <= ?
+    """,
+}
+
+
+# Like COUNT_MATCHES for a JSON array of fingerprints at once, grouped by
+# fingerprint; income also takes a JSON array of the dates involved
+COUNT_BATCH_MATCHES = {
+    "transactions": """
+        SELECT fingerprint, COUNT(*) FROM transactions
+        WHERE fingerprint IN (SELECT value FROM json_each(?))
+        AND type = 'expense' AND id <= ?
+        GROUP BY fingerprint
+    """,
+    "income": f"""
+        SELECT fingerprint, COUNT(*) FROM (
+            SELECT {fingerprint_sql('date', 'amount', 'source')} AS fingerprint
+            FROM income
+            WHERE date IN (SELECT value FROM json_each(?)) AND id <= ?
+        )
+        WHERE fingerprint IN (SELECT value FROM json_each(?))
+        GROUP BY fingerprint
+    """,
+}
+
+
+def count_matches(cursor, date, amount, description, max_id=None, table="transactions"):
+    """Number of expenses (or income entries) with the same fingerprint.
+
+    amount is in paise, like the stored amounts.
+
+    Only rows with id <= max_id are counted when max_id is given, so an
+    import can ignore the rows it has written itself.
+    """
+    if max_id is None:
+        max_id = 2 ** 63 - 1
+    if table == "income":
+        params = (date, date, amount, description, max_id)
+    else:
+        params = (date, amount, description, max_id)
+    cursor.execute(COUNT_MATCHES[table], params)
+    return cursor.fetchone()[0]
+
+
+class DuplicateFilter:
+    """Decides which imported rows of one table are already in the database.
+
+    Statements can legitimately hold identical rows (two coffees on the
+    same day), so matching is by count: if the database already had n
+    expenses with a fingerprint, the first n rows with it in the import
+    are duplicates and any further ones are new. Only fingerprints that
+    were found are remembered, so memory does not grow with the file, and
+    rows dated after the newest existing one are never probed.
+    """
+
+    def __init__(self, conn, table="transactions"):
+        self.table = table
+        self.cursor = conn.cursor()
+        self.cursor.execute(f"SELECT COALESCE(MAX(id), 0), MAX(date) FROM {table}")
+        # Rows that existed before the import, and the newest date among them
+        self.max_id, self.last_date = self.cursor.fetchone()
+        self.remaining = {}
+
+    def is_duplicate(self, date, amount, description):
+        return self.find_duplicates([(date, amount, description)])[0]
+
+    def find_duplicates(self, rows):
+        """is_duplicate() for each (date, amount, description) of a batch, in order.
+
+        The fingerprints not seen before are counted with one query.
+        """
+        # Nothing to probe for rows newer than everything already recorded
+        keys = [fingerprint(date, amount, description)
+                if self.last_date is not None and date <= self.last_date else None
+                for date, amount, description in rows]
+        probe = {key for key in keys if key is not None and key not in self.remaining}
+        found = self.count_batch(probe) if probe else {}
+
+        duplicates = []
+        for key in keys:
+            remaining = self.remaining.get(key, found.get(key, 0)) if key else 0
+            if remaining == 0:
+                duplicates.append(False)
+                continue
+            self.remaining[key] = remaining - 1
+            duplicates.append(True)
+        return duplicates
+
+    def count_batch(self, fingerprints):
+        """{fingerprint: count} of the rows that existed before the import"""
+        fingerprints = sorted(fingerprints)
+        if self.table == "income":
+            dates = sorted({key.split("|", 1)[0] for key in fingerprints})
+            params = (json.dumps(dates), self.max_id, json.dumps(fingerprints))
+        else:
+            params = (json.dumps(fingerprints), self.max_id)
+        self.cursor.execute(COUNT_BATCH_MATCHES[self.table], params)
+        return dict(self.cursor.fetchall())
@@ -0,0 +1,95 @@
+"""Emergency fund target projected from need-category spending.
+
+The target is what the need categories (rent, groceries, ...) cost over
+a horizon of months: each category's average monthly spending over the
+lookback window, or its budget when it had no spending in that window.
+Monthly spending comes from the category_month_totals rollup, so the
+projection reads a few dozen rows instead of six months of transactions.
+Months already moved to an archive are summed from the attached archive.
+"""
+
+from datetime import date
+
+from .archive import attach_archives, attached_archives, schema_name
+
+DEFAULT_HORIZON_MONTHS = 6
+DEFAULT_LOOKBACK_MONTHS = 6
+
+
+def first_month(lookback_months, today=None):
+    """'YYYY-MM' of the oldest month in a window ending with the current month"""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (lookback_months - 1)
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def need_monthly_spending(conn, lookback_months=DEFAULT_LOOKBACK_MONTHS, today=None):
+    """Projected monthly spending in paise for each need category.
+
+    Returns {category_id: paise}. A category's projection is the average
+    over the months in the window that had spending, or its budget.
+    """
+    start = first_month(lookback_months, today)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT m.category_id, m.month, m.total
+        FROM category_month_totals m
+        JOIN categories c ON m.category_id = c.id
+        WHERE c.type = 'expense' AND c.need_type = 1
+        AND m.month >= ?
+    """, (start,))
+    monthly = {(category_id, month): total for category_id, month, total in cursor.fetchall()}
+
+    if conn.in_transaction:
+        archive_years = ()  # attaching is not possible inside a transaction
+    else:
+        attach_archives(conn, f"{start}-01")
+        archive_years = attached_archives(conn)
+    for year in archive_years:
+        cursor.execute(f"""
+            SELECT t.category_id, t.month, SUM(t.amount)
+            FROM {schema_name(year)}.transactions t
+            JOIN categories c ON t.category_id = c.id
+            WHERE c.type = 'expense' AND c.need_type = 1
+            AND t.type = 'expense' AND t.month >= ?
+            GROUP BY t.category_id, t.month
+        """, (start,))
+        for category_id, month, total in cursor.fetchall():
+            monthly[category_id, month] = monthly.get((category_id, month), 0) + total
+
+    totals = {}
+    for (category_id, _), total in monthly.items():
+        months_seen, spent = totals.get(category_id, (0, 0))
+        totals[category_id] = (months_seen + 1, spent + total)
+
+    cursor.execute("""
+        SELECT id, budget FROM categories
+        WHERE type = 'expense' AND need_type = 1
+    """)
+    projection = {}
+    for category_id, budget in cursor.fetchall():
+        if category_id in totals:
+            months_seen, spent = totals[category_id]
+            # Average rounded half up, like the SQL ROUND() it replaces
+            projection[category_id] = (spent * 2 + months_seen) // (months_seen * 2)
+        else:
+            projection[category_id] = budget or 0
+    return projection
+
+
+def emergency_projection(conn, horizon_months=DEFAULT_HORIZON_MONTHS,
+                         lookback_months=DEFAULT_LOOKBACK_MONTHS, today=None):
+    """Emergency fund target in paise: horizon_months of need spending"""
+    monthly = need_monthly_spending(conn, lookback_months, today)
+    return sum(monthly.values()) * horizon_months
+
+
+def save_emergency_target(conn, target):
+    """Store a new target; returns False without writing if it is unchanged"""
+    stored = conn.execute("SELECT target_amount FROM emergency_fund WHERE id = 1").fetchone()
+    if stored is None or stored[0] == target or target <= 0:
+        return False
+    conn.execute("UPDATE emergency_fund SET target_amount = ? WHERE id = 1", (target,))
+    conn.commit()
+    return True
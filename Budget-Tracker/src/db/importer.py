@@ -0,0 +1,499 @@
+"""Bulk import of bank statements in CSV, OFX and QIF format.
+
+Statements are read as a stream of records, so memory use stays flat no
+matter how long the file is. Records are handled in batches of
+BATCH_SIZE: duplicates are looked up with one query per batch and the
+rest is written with executemany in one transaction, which keeps the
+write lock short enough for the app's own connection to get in between
+batches. The search index and the rollups are brought up to date once
+per batch rather than by their per-row triggers, and large statements
+have most transaction indexes built once at the end. Money going out
+becomes an expense in transactions and money coming in becomes a row in
+income.
+"""
+
+import csv
+import html
+import os
+import re
+import sqlite3
+import threading
+from contextlib import nullcontext
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+from .connections import BUSY_TIMEOUT_MS, configure_writer
+from .duplicates import DuplicateFilter
+from .indexes import indexes_suspended
+from .rollups import bulk_rollups
+from .search import bulk_indexing
+from ..utils.money import to_paise
+
+BATCH_SIZE = 10000  # rows per transaction
+IMPORT_CACHE_KIB = 65536  # page cache of the import connection; the indexes get big
+# Large imports drop the transaction indexes other than the fingerprint
+# and rebuild them at the end (see indexes_suspended). On 1M rows that
+# took 43 s instead of 77 s, but rebuilding costs about a fifth of what
+# keeping the indexes up to date does per row, over the whole table, so
+# it only pays when the statement is big next to the table.
+LARGE_IMPORT_ROWS = 50000
+STATEMENT_BYTES_PER_ROW = 100  # rough size of a statement line, to estimate rows
+KEPT_INDEXES = ("idx_transactions_fingerprint",)  # the duplicate lookups use it
+UNCATEGORIZED = "Uncategorized"  # expense category for rows without one
+HEADER_SEARCH_ROWS = 30  # banks often put account details above the header
+
+# Lower-case CSV header names recognised for each field
+CSV_COLUMNS = {
+    "date": ("date", "transaction date", "txn date", "tran date", "value date",
+             "posting date", "posted date", "booking date"),
+    "amount": ("amount", "transaction amount", "amount (inr)", "amount(inr)"),
+    "debit": ("debit", "debit amount", "withdrawal", "withdrawals",
+              "withdrawal amt.", "withdrawal amount", "withdrawal amount (inr)"),
+    "credit": ("credit", "credit amount", "deposit", "deposits",
+               "deposit amt.", "deposit amount", "deposit amount (inr)"),
+    "description": ("description", "narration", "details", "particulars",
+                    "transaction details", "remarks", "payee", "memo", "name"),
+    "category": ("category",),
+    "type": ("type", "transaction type", "dr/cr", "cr/dr", "debit/credit"),
+}
+
+EXPENSE_TYPES = {"expense", "debit", "dr", "d", "withdrawal"}
+INCOME_TYPES = {"income", "credit", "cr", "c", "deposit"}
+
+MONTHS = {name: number for number, name in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun",
+     "jul", "aug", "sep", "oct", "nov", "dec"), start=1)}
+
+ISO_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+COMPACT_DATE = re.compile(r"(\d{4})(\d{2})(\d{2})")  # OFX: 20250131[120000...]
+NUMERIC_DATE = re.compile(r"(\d{1,2})[/.\-](\d{1,2})[/.\-'](\d{2,4})")
+NAMED_MONTH_DATE = re.compile(r"(\d{1,2})[ \-/]([A-Za-z]{3})[A-Za-z]*[ \-/,]+(\d{2,4})")
+
+OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+@lru_cache(maxsize=4096)  # statements repeat the same few dates
+def parse_date(text, day_first=True):
+    """Return an ISO date string for a statement date, or None.
+
+    Accepts ISO (2025-01-31), compact OFX (20250131...), numeric with /, .
+    or - (31/01/2025, QIF's 1/31'25) and named months (31 Jan 2025).
+    Ambiguous numeric dates are read day first unless day_first is False;
+    a date that only makes sense the other way round is swapped.
+    """
+    text = text.strip()
+    match = ISO_DATE.match(text)
+    if match:
+        year, month, day = match.groups()
+    elif (match := COMPACT_DATE.match(text)):
+        year, month, day = match.groups()
+    elif (match := NUMERIC_DATE.match(text)):
+        first, second, year = match.groups()
+        day, month = (first, second) if day_first else (second, first)
+        if int(month) > 12:
+            day, month = month, day
+    elif (match := NAMED_MONTH_DATE.match(text)):
+        day, month_name, year = match.groups()
+        month = MONTHS.get(month_name.lower())
+        if month is None:
+            return None
+    else:
+        return None
+
+    year = int(year)
+    if year < 100:
+        year += 2000
+    try:
+        return date(year, int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_amount(text):
+    """Return a statement amount as signed paise, or None.
+
+    Handles currency symbols, thousands separators, (negative) amounts in
+    brackets and a trailing Dr/Cr marker.
+    """
+    try:
+        return to_paise(text)
+    except ValueError:
+        pass
+
+    text = text.strip().replace(",", "").replace("₹", "").replace(" ", "")
+    if not text:
+        return None
+    sign = 1
+    lowered = text.lower()
+    if lowered.endswith("dr"):
+        sign, text = -1, text[:-2]
+    elif lowered.endswith("cr"):
+        text = text[:-2]
+    if lowered.startswith("rs."):
+        text = text[3:]
+    elif lowered.startswith(("rs", "inr")):
+        text = text[2 if lowered.startswith("rs") else 3:]
+    if text.startswith("(") and text.endswith(")"):
+        sign, text = -sign, text[1:-1]
+    try:
+        return sign * to_paise(text)
+    except ValueError:
+        return None
+
+
+def read_lines(path, progress=None, every=BATCH_SIZE):
+    """Yield the lines of a text file, reporting bytes read.
+
+    progress, if given, is called with (bytes_read, total_bytes) every
+    `every` lines and once at the end.
+    """
+    total = os.path.getsize(path)
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        for count, line in enumerate(f, 1):
+            if progress is not None and count % every == 0:
+                progress(f.buffer.tell(), total)
+            yield line
+    if progress is not None:
+        progress(total, total)
+
+
+def find_csv_columns(header):
+    """Map field names to column indexes for a header row, or None"""
+    names = [name.strip().lower() for name in header]
+    columns = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in names:
+                columns[field] = names.index(alias)
+                break
+    if "date" not in columns:
+        return None
+    if "amount" not in columns and not ("debit" in columns or "credit" in columns):
+        return None
+    return columns
+
+
+def csv_records(lines, day_first=True):
+    """Yield (date, amount, description, category) from CSV lines.
+
+    The header is looked for in the first HEADER_SEARCH_ROWS rows. With a
+    single amount column, negative amounts are money going out unless a
+    type column says otherwise; separate debit/credit columns are also
+    understood. Rows that cannot be read yield None.
+    """
+    rows = csv.reader(lines)
+    columns = None
+    for row in rows:
+        columns = find_csv_columns(row)
+        if columns is not None:
+            break
+        if rows.line_num >= HEADER_SEARCH_ROWS:
+            break
+    if columns is None:
+        raise ValueError("Could not find a header row with date and amount columns")
+
+    date_col = columns["date"]
+    amount_col = columns.get("amount")
+    debit_col = columns.get("debit")
+    credit_col = columns.get("credit")
+    desc_col = columns.get("description")
+    category_col = columns.get("category")
+    type_col = columns.get("type")
+
+    for row in rows:
+        if not row:
+            continue
+        try:
+            when = parse_date(row[date_col], day_first)
+            if amount_col is not None and row[amount_col].strip():
+                amount = parse_amount(row[amount_col])
+            else:
+                debit = row[debit_col].strip() if debit_col is not None else ""
+                credit = row[credit_col].strip() if credit_col is not None else ""
+                if debit:
+                    amount = -abs(parse_amount(debit))
+                elif credit:
+                    amount = abs(parse_amount(credit))
+                else:
+                    amount = None
+            if type_col is not None and amount is not None:
+                kind = row[type_col].strip().lower()
+                if kind in EXPENSE_TYPES:
+                    amount = -abs(amount)
+                elif kind in INCOME_TYPES:
+                    amount = abs(amount)
+            description = row[desc_col].strip() if desc_col is not None else ""
+            category = row[category_col].strip() if category_col is not None else ""
+        except (IndexError, TypeError):
+            yield None
+            continue
+        if when is None or amount is None:
+            yield None
+            continue
+        yield when, amount, description, category
+
+
+def ofx_records(lines, day_first=True):
+    """Yield (date, amount, description, category) from OFX/QFX lines.
+
+    Works for both the SGML (unclosed tags) and XML flavours by reading
+    the tags inside each <STMTTRN> block.
+    """
+    record = None
+    for line in lines:
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if not closing:
+                    record = {}
+                elif record is not None:
+                    yield ofx_record(record)
+                    record = None
+            elif record is not None and not closing:
+                value = value.strip()
+                record[tag] = html.unescape(value) if "&" in value else value
+
+
+def ofx_record(record):
+    when = parse_date(record.get("DTPOSTED", ""))
+    amount = parse_amount(record.get("TRNAMT", ""))
+    if when is None or amount is None:
+        return None
+    name = record.get("NAME") or record.get("PAYEE") or ""
+    memo = record.get("MEMO", "")
+    description = f"{name} - {memo}" if name and memo and memo != name else name or memo
+    return when, amount, description, ""
+
+
+def qif_records(lines, day_first=True):
+    """Yield (date, amount, description, category) from QIF lines.
+
+    Each record is a run of field lines (D date, T/U amount, P payee,
+    M memo, L category) ended by ^. Subcategories (Food:Groceries) and
+    transfers ([Account]) are reduced to their top-level name.
+    """
+    fields = {}
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code != "^":
+            if code not in fields:
+                fields[code] = value
+            continue
+
+        when = parse_date(fields.get("D", "").replace(" ", ""), day_first)
+        amount = parse_amount(fields.get("T") or fields.get("U") or "")
+        if when is None or amount is None:
+            yield None
+        else:
+            payee, memo = fields.get("P", ""), fields.get("M", "")
+            description = f"{payee} - {memo}" if payee and memo else payee or memo
+            category = fields.get("L", "").strip("[]").split(":")[0].strip()
+            yield when, amount, description, category
+        fields = {}
+
+
+PARSERS = {
+    ".csv": csv_records,
+    ".txt": csv_records,
+    ".ofx": ofx_records,
+    ".qfx": ofx_records,
+    ".qif": qif_records,
+}
+
+STATEMENT_FILTER = "Bank Statements (*.csv *.ofx *.qfx *.qif);;All Files (*)"
+
+
+def statement_parser(path):
+    """Pick the parser for a statement by extension, or by sniffing it"""
+    parser = PARSERS.get(Path(path).suffix.lower())
+    if parser is not None:
+        return parser
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        start = f.read(4096)
+    if "<OFX>" in start.upper() or "OFXHEADER" in start.upper():
+        return ofx_records
+    if start.lstrip().startswith("!Type:"):
+        return qif_records
+    return csv_records
+
+
+class CategoryResolver:
+    """Maps category names from a statement to expense category ids.
+
+    Names are matched case-insensitively against the expense categories.
+    Unknown names get a new expense category with no budget, and rows
+    without a category go to UNCATEGORIZED, created on first use.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.ids = {}
+        self.resolved = {}  # name as written in the statement -> id
+        self.created = []
+        for category_id, name, category_type in conn.execute(
+                "SELECT id, name, type FROM categories"):
+            if category_type == 'expense':
+                self.ids[name.lower()] = category_id
+            else:
+                self.ids.setdefault(name.lower(), None)  # taken by an income category
+
+    def resolve(self, name):
+        category_id = self.resolved.get(name)
+        if category_id is None:
+            category_id = self.resolved[name] = self.lookup(name)
+        return category_id
+
+    def lookup(self, name):
+        name = name.strip() or UNCATEGORIZED
+        key = name.lower()
+        if key in self.ids:
+            category_id = self.ids[key]
+            return category_id if category_id is not None else self.lookup(UNCATEGORIZED)
+
+        cursor = self.conn.execute(
+            "INSERT INTO categories (name, type, budget) VALUES (?, 'expense', 0)", (name,))
+        self.ids[key] = cursor.lastrowid
+        self.created.append(name)
+        return cursor.lastrowid
+
+
+class ImportSummary:
+    """What an import added and skipped"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.expenses = 0
+        self.income = 0
+        self.unreadable = 0
+        self.duplicates = 0  # already in the database, not imported again
+        self.new_categories = []
+
+    @property
+    def imported(self):
+        return self.expenses + self.income
+
+
+def is_large_import(conn, path):
+    """Whether importing path is worth dropping and rebuilding the indexes"""
+    rows = os.path.getsize(path) // STATEMENT_BYTES_PER_ROW
+    existing = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+    return rows >= LARGE_IMPORT_ROWS and rows * 4 >= existing
+
+
+def import_statement(conn, path, progress=None, batch_size=BATCH_SIZE, day_first=True,
+                     suspend_indexes=None):
+    """Import every transaction in a statement file; returns an ImportSummary.
+
+    conn must be a writable connection owned by the calling thread.
+    progress, if given, is called with (bytes_read, total_bytes). Each
+    batch is committed as it is written, so if the import fails part way
+    the batches before the failure stay imported; importing the file again
+    skips them as duplicates. suspend_indexes sets whether the transaction
+    indexes are set aside meanwhile; by default is_large_import decides.
+    """
+    summary = ImportSummary(path)
+    parser = statement_parser(path)
+    categories = CategoryResolver(conn)
+    duplicate_expenses = DuplicateFilter(conn, "transactions")
+    duplicate_income = DuplicateFilter(conn, "income")
+    records = []
+
+    def flush():
+        if not records:
+            return
+        spent = [record for record in records if record[1] < 0]
+        received = [record for record in records if record[1] > 0]
+        summary.unreadable += len(records) - len(spent) - len(received)  # zero amounts
+
+        expenses = []
+        duplicates = duplicate_expenses.find_duplicates(
+            [(when, -amount, description) for when, amount, description, _ in spent])
+        for (when, amount, description, category), duplicate in zip(spent, duplicates):
+            if not duplicate:
+                expenses.append((when, categories.resolve(category), -amount, description))
+
+        sources = [(when, amount, description or category or "Imported")
+                   for when, amount, description, category in received]
+        duplicates = duplicate_income.find_duplicates(sources)
+        income = [source for source, duplicate in zip(sources, duplicates) if not duplicate]
+
+        if expenses or income:
+            with conn, bulk_indexing(conn), bulk_rollups(conn):
+                if expenses:
+                    conn.executemany("""
+                        INSERT INTO transactions (date, category_id, amount, description, type)
+                        VALUES (?, ?, ?, ?, 'expense')
+                    """, expenses)
+                if income:
+                    conn.executemany("""
+                        INSERT INTO income (date, amount, source, is_recurring)
+                        VALUES (?, ?, ?, 0)
+                    """, income)
+        summary.expenses += len(expenses)
+        summary.income += len(income)
+        summary.duplicates += len(spent) + len(received) - len(expenses) - len(income)
+        records.clear()
+
+    if suspend_indexes is None:
+        suspend_indexes = is_large_import(conn, path)
+    try:
+        with (indexes_suspended(conn, "transactions", KEPT_INDEXES) if suspend_indexes
+              else nullcontext()):
+            for record in parser(read_lines(path, progress, batch_size), day_first):
+                if record is None:
+                    summary.unreadable += 1
+                    continue
+                records.append(record)
+                if len(records) >= batch_size:
+                    flush()
+            flush()
+    finally:
+        if conn.in_transaction:  # categories created after the last batch
+            conn.commit()
+        summary.new_categories = categories.created
+    return summary
+
+
+class ImportSignals(QObject):
+    progress = pyqtSignal(int, int)  # bytes read, file size
+    finished = pyqtSignal(object)  # ImportSummary
+    failed = pyqtSignal(str)
+
+
+class ImportWorker(QRunnable):
+    """Run import_statement on a QThreadPool thread with its own connection.
+
+    SQLite lets one connection write at a time; the import holds the lock
+    only while a batch is written, and the app's connection waits up to
+    BUSY_TIMEOUT_MS for it.
+    """
+
+    def __init__(self, db_path, statement_path):
+        super().__init__()
+        self.db_path = db_path
+        self.statement_path = statement_path
+        self.signals = ImportSignals()
+        self.done = threading.Event()
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+            try:
+                configure_writer(conn)
+                conn.execute(f"PRAGMA cache_size = -{IMPORT_CACHE_KIB}")
+                summary = import_statement(conn, self.statement_path,
+                                           self.signals.progress.emit)
+            finally:
+                conn.close()
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(summary)
+        finally:
+            self.done.set()
@@ -0,0 +1,61 @@
+"""Secondary indexes that are set aside while a large import runs.
+
+Keeping every index of transactions up to date costs more than writing
+the rows themselves, so a large import drops the indexes it does not
+read and builds them again once at the end, which is a single sorted
+pass per index. Each dropped index is recorded in suspended_indexes in
+the same transaction as the drop, so indexes left out by a crash are
+built again on the next start (rebuild_suspended_indexes).
+"""
+
+from contextlib import contextmanager
+
+
+def create_suspended_indexes(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS suspended_indexes (
+            name TEXT PRIMARY KEY,
+            sql TEXT NOT NULL
+        )
+    """)
+
+
+def rebuild_suspended_indexes(conn):
+    """Build the indexes recorded in suspended_indexes; returns their names"""
+    with conn:
+        rows = conn.execute("SELECT name, sql FROM suspended_indexes").fetchall()
+        for name, sql in rows:
+            exists = conn.execute("""
+                SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?
+            """, (name,)).fetchone()
+            if exists is None:
+                conn.execute(sql)
+        conn.execute("DELETE FROM suspended_indexes")
+    return [name for name, _ in rows]
+
+
+@contextmanager
+def indexes_suspended(conn, table, keep=()):
+    """Drop table's non-unique indexes except keep for the block.
+
+    They are built again when the block ends, also on an error. Unlike
+    search.bulk_indexing this spans many transactions: other connections
+    can read and write meanwhile, only without those indexes.
+    """
+    conn.commit()
+    conn.execute("BEGIN")  # the record and the drop commit together
+    with conn:
+        rows = conn.execute("""
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL
+            AND sql NOT LIKE 'CREATE UNIQUE%'
+        """, (table,)).fetchall()
+        rows = [(name, sql) for name, sql in rows if name not in keep]
+        conn.executemany("INSERT OR REPLACE INTO suspended_indexes (name, sql) VALUES (?, ?)",
+                         rows)
+        for name, _ in rows:
+            conn.execute(f"DROP INDEX {name}")
+    try:
+        yield
+    finally:
+        rebuild_suspended_indexes(conn)
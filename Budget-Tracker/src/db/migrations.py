@@ -0,0 +1,393 @@
+"""Schema migrations keyed on PRAGMA user_version.
+
+Every schema change is a numbered step in MIGRATIONS. migrate() applies
+the steps a database has not seen yet, oldest first, each in its own
+transaction together with the user_version bump, so a database is always
+at exactly one version: a failed step rolls back and is retried on the
+next start.
+
+Databases created before versioning report version 0 but may already
+have any of the early tables, columns and indexes, so steps 1 to 6 are
+written to be harmless when their objects exist. Later steps only ever
+run once and can backfill in bulk without such checks.
+"""
+
+import sqlite3
+import time
+
+from .rollups import (create_category_month_totals, rebuild_category_month_totals,
+                      create_daily_totals)
+from .duplicates import create_fingerprint_index, fingerprint_sql
+from .indexes import create_suspended_indexes
+from .search import create_search_indexes
+from .archive import upgrade_archives
+
+
+def create_base_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            type TEXT CHECK(type IN ('expense', 'income')) NOT NULL,
+            budget REAL DEFAULT 0,
+            alert_threshold INTEGER DEFAULT 80,
+            need_type INTEGER DEFAULT 0,  -- 1 for needs, 0 for wants
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            category_id INTEGER,
+            amount REAL NOT NULL CHECK (amount > 0),
+            description TEXT,
+            type TEXT CHECK(type IN ('expense', 'income')) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL,
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+                ON DELETE SET NULL
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS savings_goals (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            target_amount REAL NOT NULL CHECK (target_amount > 0),
+            current_amount REAL DEFAULT 0 CHECK (current_amount >= 0),
+            target_date TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            monthly_contribution REAL DEFAULT 0 CHECK (monthly_contribution >= 0)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS emergency_fund (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            target_amount REAL NOT NULL CHECK (target_amount > 0),
+            current_amount REAL DEFAULT 0 CHECK (current_amount >= 0),
+            monthly_contribution REAL DEFAULT 0 CHECK (monthly_contribution >= 0),
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS income (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            amount REAL NOT NULL CHECK (amount > 0),
+            source TEXT NOT NULL,
+            is_recurring BOOLEAN DEFAULT 0,
+            frequency TEXT CHECK(frequency IN ('monthly', 'quarterly', 'yearly')),
+            next_date TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+        )
+    """)
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions(category_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_income_date ON income(date)")
+
+    # The earliest databases predate these columns (ADD COLUMN cannot
+    # default to CURRENT_TIMESTAMP, so old rows get no created_at)
+    add_missing_columns(cursor, "categories", {
+        "need_type": "INTEGER DEFAULT 0",
+        "created_at": "TIMESTAMP",
+    })
+    add_missing_columns(cursor, "transactions", {"created_at": "TIMESTAMP"})
+    added = add_missing_columns(cursor, "income", {
+        "frequency": "TEXT CHECK(frequency IN ('monthly', 'quarterly', 'yearly'))",
+        "next_date": "TEXT",
+        "created_at": "TIMESTAMP",
+    })
+    add_missing_columns(cursor, "emergency_fund", {"last_updated": "TIMESTAMP"})
+    if "frequency" in added and "recurrence_period" in table_columns(cursor, "income"):
+        cursor.execute("""
+            UPDATE income SET frequency = recurrence_period
+            WHERE is_recurring AND recurrence_period IN ('monthly', 'yearly')
+        """)
+
+
+def table_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_xinfo({table})")
+    return {col[1] for col in cursor.fetchall()}
+
+
+def add_missing_columns(cursor, table, columns):
+    """Add the {name: definition} columns table lacks; returns the names added"""
+    existing = table_columns(cursor, table)
+    added = [name for name in columns if name not in existing]
+    for name in added:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {columns[name]}")
+    return added
+
+
+def add_month_column(cursor, table):
+    """Add the generated 'YYYY-MM' month key to an existing table"""
+    if "month" in table_columns(cursor, table):
+        return
+
+    cursor.execute(f"""
+        ALTER TABLE {table}
+        ADD COLUMN month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+    """)
+
+
+def add_month_keys(cursor):
+    # Databases created before the month key existed need it added
+    add_month_column(cursor, "transactions")
+    add_month_column(cursor, "income")
+
+    # Month-scoped lookups (budget status, alerts, dashboard cards)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_category_month
+        ON transactions(category_id, month, amount)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_month_type
+        ON transactions(month, type, amount)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_income_month ON income(month)")
+
+
+def add_history_indexes(cursor):
+    # History tables: category filter in date order, sorting by amount
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transactions_category_date
+        ON transactions(category_id, date)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_amount ON transactions(amount)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_income_amount ON income(amount)")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_income_recurring
+        ON income(is_recurring, frequency)
+    """)
+
+
+def rebuild_table(cursor, table, create_sql, columns, converted):
+    """Replace table with the definition in create_sql, keeping its rows and indexes.
+
+    create_sql has a {name} placeholder for the table name. Columns in
+    converted are copied through the SQL expression given for them.
+    Triggers are the caller's business: with triggers in place that
+    still name the old table, the rename would fail. Views, including
+    the TEMP all_<table> views, are dropped for the rebuild and created
+    again afterwards, since SQLite checks every view on a rename.
+    """
+    cursor.execute("""
+        SELECT sql FROM sqlite_master
+        WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL
+    """, (table,))
+    indexes = [row[0] for row in cursor.fetchall()]
+    views = []
+    for schema in ("main", "temp"):
+        cursor.execute(f"SELECT name, sql FROM {schema}.sqlite_master WHERE type = 'view'")
+        views += [(schema, name, sql) for name, sql in cursor.fetchall()]
+    for schema, name, _ in views:
+        cursor.execute(f"DROP VIEW {schema}.{name}")
+
+    cursor.execute(create_sql.format(name=f"new_{table}"))
+    column_list = ", ".join(columns)
+    select_list = ", ".join(converted.get(column, column) for column in columns)
+    cursor.execute(f"INSERT INTO new_{table} ({column_list}) SELECT {select_list} FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE new_{table} RENAME TO {table}")
+    for sql in indexes:
+        cursor.execute(sql)
+    for schema, _, sql in views:
+        if schema == "temp":  # stored as plain CREATE VIEW
+            sql = sql.replace("CREATE VIEW", "CREATE TEMP VIEW", 1)
+        cursor.execute(sql)
+
+
+def paise(column):
+    return f"CAST(round({column} * 100) AS INTEGER)"
+
+
+# The earliest databases typed categories and expenses as 'Need' or 'Want'
+EXPENSE_TYPE = "CASE WHEN type IN ('Need', 'Want') THEN 'expense' ELSE type END"
+
+
+def store_amounts_in_paise(cursor):
+    """Turn every REAL money column into INTEGER paise"""
+    cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+    triggers = cursor.fetchall()
+    for name, _ in triggers:
+        cursor.execute(f"DROP TRIGGER {name}")
+
+    rebuild_table(cursor, "categories", """
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            type TEXT CHECK(type IN ('expense', 'income')) NOT NULL,
+            budget INTEGER NOT NULL DEFAULT 0,  -- paise
+            alert_threshold INTEGER DEFAULT 80,
+            need_type INTEGER DEFAULT 0,  -- 1 for needs, 0 for wants
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """, ("id", "name", "type", "budget", "alert_threshold", "need_type", "created_at"),
+        {"budget": paise("COALESCE(budget, 0)"),
+         "type": EXPENSE_TYPE,
+         "need_type": "CASE type WHEN 'Need' THEN 1 WHEN 'Want' THEN 0 ELSE need_type END"})
+
+    rebuild_table(cursor, "transactions", f"""
+        CREATE TABLE {{name}} (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            category_id INTEGER,
+            amount INTEGER NOT NULL CHECK (amount > 0 AND typeof(amount) = 'integer'),  -- paise
+            description TEXT,
+            type TEXT CHECK(type IN ('expense', 'income')) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL,
+            fingerprint TEXT GENERATED ALWAYS AS
+                {fingerprint_sql('date', 'amount', 'description')} VIRTUAL,
+            FOREIGN KEY (category_id) REFERENCES categories (id)
+                ON DELETE SET NULL
+        )
+    """, ("id", "date", "category_id", "amount", "description", "type", "created_at"),
+        {"amount": paise("amount"), "type": EXPENSE_TYPE})
+
+    rebuild_table(cursor, "income", """
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            amount INTEGER NOT NULL CHECK (amount > 0 AND typeof(amount) = 'integer'),  -- paise
+            source TEXT NOT NULL,
+            is_recurring BOOLEAN DEFAULT 0,
+            frequency TEXT CHECK(frequency IN ('monthly', 'quarterly', 'yearly')),
+            next_date TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+        )
+    """, ("id", "date", "amount", "source", "is_recurring", "frequency", "next_date",
+          "created_at"),
+        {"amount": paise("amount")})
+
+    rebuild_table(cursor, "savings_goals", """
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            target_amount INTEGER NOT NULL CHECK (target_amount > 0),  -- paise
+            current_amount INTEGER DEFAULT 0 CHECK (current_amount >= 0),
+            target_date TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            monthly_contribution INTEGER DEFAULT 0 CHECK (monthly_contribution >= 0)
+        )
+    """, ("id", "name", "target_amount", "current_amount", "target_date", "created_at",
+          "monthly_contribution"),
+        {column: paise(column)
+         for column in ("target_amount", "current_amount", "monthly_contribution")})
+
+    rebuild_table(cursor, "emergency_fund", """
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            target_amount INTEGER NOT NULL CHECK (target_amount > 0),  -- paise
+            current_amount INTEGER DEFAULT 0 CHECK (current_amount >= 0),
+            monthly_contribution INTEGER DEFAULT 0 CHECK (monthly_contribution >= 0),
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """, ("id", "target_amount", "current_amount", "monthly_contribution", "last_updated"),
+        {column: paise(column)
+         for column in ("target_amount", "current_amount", "monthly_contribution")})
+
+    # The rollup is derived data: recreate it with integer totals and refill
+    cursor.execute("DROP TABLE category_month_totals")
+    cursor.execute("""
+        CREATE TABLE category_month_totals (
+            category_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,  -- paise
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (category_id, month)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX idx_category_month_totals_month
+        ON category_month_totals(month, total)
+    """)
+    rebuild_category_month_totals(cursor)
+
+    for _, sql in triggers:
+        cursor.execute(sql)
+
+    # Archived years are kept in the same units
+    upgrade_archives(cursor.connection)
+
+
+def add_daily_totals(cursor):
+    """Per-day totals in budget.db and in every archive"""
+    create_daily_totals(cursor)
+    upgrade_archives(cursor.connection)
+
+
+# (version, description, step); versions start at 1 and never change once shipped
+MIGRATIONS = (
+    (1, "Base tables", create_base_tables),
+    (2, "Month keys and month indexes", add_month_keys),
+    (3, "Category month totals", create_category_month_totals),
+    (4, "History filter and sort indexes", add_history_indexes),
+    (5, "Duplicate fingerprint", create_fingerprint_index),
+    (6, "Full-text search", create_search_indexes),
+    (7, "Amounts in integer paise", store_amounts_in_paise),
+    (8, "Daily totals", add_daily_totals),
+    (9, "Records of indexes suspended by imports", create_suspended_indexes),
+)
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, migrations=MIGRATIONS):
+    """Bring conn's database up to the latest schema version.
+
+    Returns a list of (version, description, milliseconds) for the steps
+    that ran. Foreign keys are switched off while the steps run so a step
+    may rebuild a table, and checked before each step commits.
+    """
+    version = schema_version(conn)
+    latest = migrations[-1][0]
+    if version > latest:
+        raise sqlite3.DatabaseError(
+            f"Database schema version {version} is newer than this version "
+            f"of Budget Tracker supports ({latest})")
+
+    pending = [step for step in migrations if step[0] > version]
+    if not pending:
+        return []
+
+    conn.commit()
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")  # has no effect inside a transaction
+    applied = []
+    try:
+        for step_version, description, step in pending:
+            started = time.perf_counter()
+            # DDL does not open a transaction by itself in sqlite3
+            conn.execute("BEGIN")
+            try:
+                cursor = conn.cursor()
+                step(cursor)
+                violations = cursor.execute("PRAGMA foreign_key_check").fetchall()
+                if violations:
+                    raise sqlite3.IntegrityError(
+                        f"Migration {step_version} left {len(violations)} "
+                        f"foreign key violations")
+                cursor.execute(f"PRAGMA user_version = {step_version}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            elapsed = (time.perf_counter() - started) * 1000
+            applied.append((step_version, description, elapsed))
+            print(f"Applied migration {step_version} ({description}) in {elapsed:.1f} ms")
+    finally:
+        if foreign_keys:
+            conn.execute("PRAGMA foreign_keys = ON")
+    return applied
@@ -0,0 +1,41 @@
+"""Run read queries on a QThreadPool thread with a pooled read connection"""
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+
+def database_path(conn):
+    """Return the file behind a connection's main database, or None for :memory:"""
+    for _, name, path in conn.execute("PRAGMA database_list"):
+        if name == 'main':
+            return path or None
+    return None
+
+
+class QueryWorkerSignals(QObject):
+    finished = pyqtSignal(object)  # whatever the query function returned
+    failed = pyqtSignal(str)
+
+
+class QueryWorker(QRunnable):
+    """Call load(conn) off the GUI thread and report the result by signal.
+
+    conn is a read-only connection checked out of the pool for the length
+    of run(), so it is never shared with another thread while in use.
+    Receivers connected from the GUI thread get the result through a
+    queued connection and can safely update widgets.
+    """
+
+    def __init__(self, pool, load):
+        super().__init__()
+        self.pool = pool
+        self.load = load
+        self.signals = QueryWorkerSignals()
+
+    def run(self):
+        try:
+            with self.pool.reader() as conn:
+                result = self.load(conn)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
@@ -0,0 +1,139 @@
+"""The numbers behind the Reports page, its charts and its exports.
+
+build_report() reads the spending series from the per-day totals in
+all_daily_totals and scans the transactions of the range once, grouped
+by month (or longer), category and type, for the category breakdown and
+the income vs expenses comparison. Periods are days for short ranges and
+grow to weeks, months, quarters and years as the range gets longer, so a
+chart never has more than a few dozen points however much history it
+covers. The grouping is done in SQL. The caller attaches the archives
+the range needs first.
+"""
+
+from datetime import date
+
+from .archive import archived_years, attach_archives, schema_name
+
+# Period sizes from finest to coarsest
+BUCKETS = ("day", "week", "month", "quarter", "year")
+
+MAX_TREND_POINTS = 120  # points on the spending line
+MAX_COMPARISON_GROUPS = 24  # bar groups on the income vs expenses chart
+
+# SQL giving the first day ('YYYY-MM-DD') of the period a date falls in
+BUCKET_SQL = {
+    "day": "{column}",
+    "week": "date({column}, 'weekday 0', '-6 days')",  # weeks start on Monday
+    "month": "substr({column}, 1, 7) || '-01'",
+    "quarter": ("substr({column}, 1, 5) || printf('%02d', "
+                "(CAST(substr({column}, 6, 2) AS INTEGER) - 1) / 3 * 3 + 1) || '-01'"),
+    "year": "substr({column}, 1, 4) || '-01-01'",
+}
+
+BUCKET_ADJECTIVES = {
+    "day": "Daily", "week": "Weekly", "month": "Monthly",
+    "quarter": "Quarterly", "year": "Yearly",
+}
+
+
+def bucket_count(start_date, end_date, bucket):
+    """Number of periods of the given size that start_date..end_date touches"""
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    if bucket == "day":
+        return (end - start).days + 1
+    if bucket == "week":
+        return (end.toordinal() - (start.toordinal() - start.weekday())) // 7 + 1
+    if bucket == "month":
+        return (end.year * 12 + end.month) - (start.year * 12 + start.month) + 1
+    if bucket == "quarter":
+        return ((end.year * 4 + (end.month - 1) // 3)
+                - (start.year * 4 + (start.month - 1) // 3) + 1)
+    return end.year - start.year + 1
+
+
+def choose_bucket(start_date, end_date, max_points, buckets=BUCKETS):
+    """The finest period size that keeps the range within max_points"""
+    for bucket in buckets:
+        if bucket_count(start_date, end_date, bucket) <= max_points:
+            return bucket
+    return buckets[-1]
+
+
+def period_label(period, bucket, long=False):
+    """Text for the period starting on 'YYYY-MM-DD' period"""
+    start = date.fromisoformat(period)
+    if bucket == "day":
+        return start.strftime('%d %b %Y')
+    if bucket == "week":
+        return start.strftime('Week of %d %b %Y')
+    if bucket == "month":
+        return start.strftime('%B %Y' if long else '%b %Y')
+    if bucket == "quarter":
+        return f"Q{(start.month - 1) // 3 + 1} {start.year}"
+    return str(start.year)
+
+
+def history_start(conn):
+    """Date of the first transaction, archived or not; None without any"""
+    for year in archived_years(conn):
+        attach_archives(conn, f"{year}-01-01", f"{year}-12-31")
+        first = conn.execute(f"SELECT MIN(date) FROM {schema_name(year)}.transactions").fetchone()[0]
+        if first:
+            return first
+    return conn.execute("SELECT MIN(date) FROM transactions").fetchone()[0]
+
+
+def build_report(conn, start_date, end_date):
+    """Report dataset for start_date..end_date (inclusive), amounts in paise.
+
+    Returns a dict with
+      bucket: period size of the spending series ('day' ... 'year')
+      spending: [(period start, expenses)] for periods with expenses
+      categories: [(name, expenses)] largest first
+      comparison_bucket: period size of the comparison, a month or longer
+      comparison: [(period start, income, expenses)] by period
+    """
+    bucket = choose_bucket(start_date, end_date, MAX_TREND_POINTS)
+    comparison_bucket = choose_bucket(start_date, end_date, MAX_COMPARISON_GROUPS,
+                                      BUCKETS[BUCKETS.index("month"):])
+
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {BUCKET_SQL[bucket].format(column="date")} as period, SUM(expense)
+        FROM all_daily_totals
+        WHERE date BETWEEN ? AND ?
+        GROUP BY period
+        HAVING SUM(expense) > 0
+        ORDER BY period
+    """, (start_date, end_date))
+    spending = cursor.fetchall()
+
+    cursor.execute(f"""
+        SELECT
+            {BUCKET_SQL[comparison_bucket].format(column="t.date")} as period,
+            c.name,
+            t.type,
+            SUM(t.amount)
+        FROM all_transactions t
+        LEFT JOIN categories c ON t.category_id = c.id
+        WHERE t.date BETWEEN ? AND ?
+        GROUP BY period, t.category_id, t.type
+    """, (start_date, end_date))
+
+    categories, comparison = {}, {}
+    for period, category, kind, total in cursor.fetchall():
+        totals = comparison.setdefault(period, {'income': 0, 'expense': 0})
+        totals[kind] += total
+        if kind == 'expense' and category is not None:  # uncategorized spending has no slice
+            categories[category] = categories.get(category, 0) + total
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'bucket': bucket,
+        'spending': spending,
+        'categories': sorted(categories.items(), key=lambda item: (-item[1], item[0])),
+        'comparison_bucket': comparison_bucket,
+        'comparison': [(period, totals['income'], totals['expense'])
+                       for period, totals in sorted(comparison.items())],
+    }
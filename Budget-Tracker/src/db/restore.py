@@ -0,0 +1,281 @@
+"""Browse, verify and restore the backups written by src.db.backup.
+
+A restore checks the backup with PRAGMA quick_check, takes a safety
+backup of the current database, and then copies the backup over the live
+database with the SQLite backup API. The destination stays locked for the
+whole copy and is committed at the end, so other connections see either
+the old database or the restored one, never a mix. The archives the
+backup was taken with are then put back in place of the current ones.
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from PyQt6.QtCore import QRunnable
+
+from .archive import ARCHIVE_DIR, archive_files, drop_archived_copies
+from .backup import (ARCHIVE_COPY_DIR, BACKUP_DIR, PAGES_PER_STEP, BackupSignals,
+                     backup_lock, create_backup, list_backups, load_manifest,
+                     manifest_lock, new_backup_path, read_only_uri, read_summary,
+                     save_manifest)
+from .connections import BUSY_TIMEOUT_MS, close_read_pools
+from .migrations import migrate
+
+
+class BackupInfo:
+    """One backup file and the summary shown in the backup browser"""
+
+    def __init__(self, path, created, size, summary):
+        self.path = path
+        self.created = created
+        self.size = size
+        self.transactions = summary.get("transactions")
+        self.income = summary.get("income")
+        self.first_date = summary.get("first_date")
+        self.last_date = summary.get("last_date")
+        self.db_size = summary.get("db_size")
+
+
+@contextmanager
+def backup_database_file(path):
+    """Yield a plain SQLite file for a backup, unpacking .gz to a temp file"""
+    path = Path(path)
+    if path.suffix != ".gz":
+        yield path
+        return
+
+    with tempfile.TemporaryDirectory(dir=path.parent) as temp_dir:
+        plain_path = Path(temp_dir) / path.stem
+        with gzip.open(path, "rb") as src, open(plain_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        yield plain_path
+
+
+def list_backup_info(backup_dir=BACKUP_DIR):
+    """Return BackupInfo for every backup, newest first.
+
+    Summaries are normally recorded in the manifest when a backup is made.
+    Older backups are summarised on first listing and the result is saved
+    to the manifest, so each file is only opened once.
+    """
+    with manifest_lock:
+        manifest = load_manifest(backup_dir)
+        changed = False
+        infos = []
+        for created, path in list_backups(backup_dir):
+            entry = manifest.get(path.name)
+            if not isinstance(entry, dict) or "db_size" not in entry:
+                try:
+                    with backup_database_file(path) as plain_path:
+                        summary = read_summary(plain_path)
+                except (OSError, sqlite3.Error) as e:
+                    print(f"Could not read backup {path.name}: {e}")
+                    summary = {}
+                else:
+                    entry = manifest[path.name] = {
+                        **(entry if isinstance(entry, dict) else {}), **summary}
+                    changed = True
+            infos.append(BackupInfo(path, created, path.stat().st_size, entry or {}))
+
+        if changed:
+            save_manifest(backup_dir, manifest)
+    return infos
+
+
+def quick_check(db_path):
+    """Run PRAGMA quick_check; returns (ok, message)"""
+    conn = sqlite3.connect(read_only_uri(db_path), uri=True)
+    try:
+        results = [row[0] for row in conn.execute("PRAGMA quick_check")]
+    except sqlite3.DatabaseError as e:
+        return False, str(e)
+    finally:
+        conn.close()
+    return results == ["ok"], "\n".join(results)
+
+
+def verify_backup(path):
+    """Check a backup file's integrity; returns (ok, message)"""
+    with backup_database_file(path) as plain_path:
+        return quick_check(plain_path)
+
+
+def unpack_archives(archives, backup_dir, temp_dir):
+    """Unpack and check a backup's archive copies; returns the plain paths.
+
+    archives is the {archive file name: copy name} of its manifest entry.
+    Raises sqlite3.DatabaseError if a copy is missing or damaged.
+    """
+    copy_dir = Path(backup_dir) / ARCHIVE_COPY_DIR
+    paths = {}
+    for name, copy_name in archives.items():
+        plain_path = Path(temp_dir) / name
+        try:
+            with gzip.open(copy_dir / copy_name, "rb") as src, open(plain_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        except OSError as e:
+            raise sqlite3.DatabaseError(f"Archive copy {copy_name} could not be read: {e}")
+        ok, message = quick_check(plain_path)
+        if not ok:
+            raise sqlite3.DatabaseError(f"Archive {name} failed integrity check: {message}")
+        paths[name] = plain_path
+    return paths
+
+
+def replace_archives(db_path, archives):
+    """Make the archives of db_path exactly the {file name: path} given"""
+    close_read_pools()  # pooled readers may have the old archives attached
+    target_dir = Path(db_path).parent / ARCHIVE_DIR
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for name, path in archives.items():
+        os.replace(path, target_dir / name)
+    for path in archive_files(db_path).values():
+        if path.name not in archives:
+            path.unlink()
+
+
+def restore_backup(backup_path, db_path, progress=None, backup_dir=BACKUP_DIR):
+    """Verify backup_path and copy it over the database at db_path.
+
+    A backup of the current database is taken first so the restore can be
+    undone; its path is returned (None if the newest backup already holds
+    the current contents). Backups that record their archives bring those
+    back too; older ones leave the archives alone. No other backup runs
+    until the restore is done. Raises sqlite3.DatabaseError if the backup
+    or one of its archives fails its integrity check, in which case
+    nothing is changed.
+    """
+    def report(status, remaining, total):
+        if progress is not None:
+            progress(total - remaining, total)
+
+    with backup_lock:
+        entry = load_manifest(backup_dir).get(Path(backup_path).name)
+        archives = entry.get("archives") if isinstance(entry, dict) else None
+
+        with backup_database_file(backup_path) as plain_path, \
+                tempfile.TemporaryDirectory(dir=Path(db_path).parent) as temp_dir:
+            ok, message = quick_check(plain_path)
+            if not ok:
+                raise sqlite3.DatabaseError(f"Backup failed integrity check: {message}")
+            if archives is not None:
+                archive_paths = unpack_archives(archives, backup_dir, temp_dir)
+
+            safety_backup = create_backup(db_path, new_backup_path(backup_dir))
+
+            source = sqlite3.connect(read_only_uri(plain_path), uri=True)
+            try:
+                dest = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+                try:
+                    source.backup(dest, pages=PAGES_PER_STEP, progress=report)
+                finally:
+                    dest.close()
+            finally:
+                source.close()
+
+            if archives is not None:
+                replace_archives(db_path, archive_paths)
+        return safety_backup
+
+
+def prepare_restored(conn):
+    """Bring a just-restored database up to date on the app's connection.
+
+    The schema is migrated, and rows that an archive already holds are
+    dropped: backups from before a year was archived still have them.
+    Returns the number of rows dropped.
+    """
+    # The restore rewrote the file under conn: load its schema before an
+    # ATTACH, which otherwise can leave main looking empty
+    conn.execute("SELECT COUNT(*) FROM main.sqlite_master").fetchone()
+    migrate(conn)
+    return drop_archived_copies(conn)
+
+
+class RestoreWorker(QRunnable):
+    """Run restore_backup on a QThreadPool thread"""
+
+    def __init__(self, backup_path, db_path):
+        super().__init__()
+        self.backup_path = backup_path
+        self.db_path = db_path
+        self.signals = BackupSignals()  # finished carries the safety backup
+        self.done = threading.Event()
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            safety_backup = restore_backup(self.backup_path, self.db_path,
+                                           self.signals.progress.emit)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(str(safety_backup or ""))
+        finally:
+            self.done.set()
+
+
+def build_benchmark_database(path, size_mb):
+    """Fill a database with synthetic transactions until it reaches size_mb"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        PRAGMA journal_mode = WAL;
+        CREATE TABLE transactions (
+            id INTEGER PRIMARY KEY, date TEXT NOT NULL, category_id INTEGER,
+            amount REAL NOT NULL, description TEXT, type TEXT);
+        CREATE TABLE income (
+            id INTEGER PRIMARY KEY, date TEXT NOT NULL, source TEXT, amount REAL);
+        CREATE INDEX idx_transactions_date ON transactions(date);
+        CREATE INDEX idx_income_date ON income(date);
+    """)
+    batch = 50000
+    while Path(path).stat().st_size < size_mb * 1024 * 1024:
+        conn.executemany(
+            "INSERT INTO transactions (date, category_id, amount, description, type) "
+            "VALUES (date('2015-01-01', ? || ' days'), ?, ?, ?, 'expense')",
+            ((i % 3650, i % 12 + 1, i % 5000 / 3, f"Synthetic expense {i} " * 4)
+             for i in range(batch)))
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def benchmark_restore(size_mb=500):
+    """Time backup, listing, verification and restore on a synthetic database"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = Path(work_dir) / "budget.db"
+        backup_dir = Path(work_dir) / "backups"
+
+        started = time.perf_counter()
+        build_benchmark_database(db_path, size_mb)
+        print(f"Built {db_path.stat().st_size / 1024 / 1024:.0f} MB database "
+              f"in {time.perf_counter() - started:.1f} s")
+
+        def timed(label, func):
+            started = time.perf_counter()
+            result = func()
+            print(f"  {label:<34}{time.perf_counter() - started:>8.2f} s")
+            return result
+
+        backup_path = timed("Backup (copy, hash, gzip)",
+                            lambda: create_backup(db_path, new_backup_path(backup_dir)))
+        print(f"  {'Compressed size':<34}{backup_path.stat().st_size / 1024 / 1024:>8.1f} MB")
+        infos = timed("List backups", lambda: list_backup_info(backup_dir))
+        timed("Verify (quick_check)", lambda: verify_backup(infos[0].path))
+
+        conn = sqlite3.connect(db_path)
+        conn.execute("DELETE FROM transactions WHERE id % 2 = 0")
+        conn.commit()
+        conn.close()
+
+        started = time.perf_counter()
+        restore_backup(backup_path, db_path, backup_dir=backup_dir)
+        print(f"  {'Restore (verify + safety + copy)':<34}{time.perf_counter() - started:>8.2f} s")
+        print(f"Restored {read_summary(db_path)['transactions']:,} transactions "
+              f"(backup had {infos[0].transactions:,})")
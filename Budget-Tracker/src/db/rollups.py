@@ -0,0 +1,368 @@
+"""Trigger-maintained summary tables derived from transactions"""
+
+import sqlite3
+from contextlib import contextmanager
+
+from ..utils.money import format_rupees
+
+
+def create_category_month_totals(cursor):
+    """Create the per-category monthly rollup and the triggers that maintain it"""
+    cursor.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'category_month_totals'
+    """)
+    exists = cursor.fetchone() is not None
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS category_month_totals (
+            category_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (category_id, month)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_category_month_totals_month
+        ON category_month_totals(month, total)
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_category_month_totals_insert
+        AFTER INSERT ON transactions
+        WHEN NEW.category_id IS NOT NULL
+        BEGIN
+            INSERT INTO category_month_totals (category_id, month, total, count)
+            VALUES (NEW.category_id, NEW.month, NEW.amount, 1)
+            ON CONFLICT (category_id, month) DO UPDATE
+            SET total = total + excluded.total, count = count + 1;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_category_month_totals_delete
+        AFTER DELETE ON transactions
+        WHEN OLD.category_id IS NOT NULL
+        BEGIN
+            UPDATE category_month_totals
+            SET total = total - OLD.amount, count = count - 1
+            WHERE category_id = OLD.category_id AND month = OLD.month;
+
+            DELETE FROM category_month_totals
+            WHERE category_id = OLD.category_id AND month = OLD.month
+            AND count <= 0;
+        END
+    """)
+
+    # Fires for edits and for ON DELETE SET NULL when a category is removed
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_category_month_totals_update
+        AFTER UPDATE OF date, category_id, amount ON transactions
+        BEGIN
+            UPDATE category_month_totals
+            SET total = total - OLD.amount, count = count - 1
+            WHERE OLD.category_id IS NOT NULL
+            AND category_id = OLD.category_id AND month = OLD.month;
+
+            DELETE FROM category_month_totals
+            WHERE OLD.category_id IS NOT NULL
+            AND category_id = OLD.category_id AND month = OLD.month
+            AND count <= 0;
+
+            INSERT INTO category_month_totals (category_id, month, total, count)
+            SELECT NEW.category_id, NEW.month, NEW.amount, 1
+            WHERE NEW.category_id IS NOT NULL
+            ON CONFLICT (category_id, month) DO UPDATE
+            SET total = total + excluded.total, count = count + 1;
+        END
+    """)
+
+    # Backfill once when the rollup is added to an existing database
+    if not exists:
+        rebuild_category_month_totals(cursor)
+
+
+def rebuild_category_month_totals(cursor):
+    """Recompute the rollup from scratch out of the transactions table"""
+    cursor.execute("DELETE FROM category_month_totals")
+    cursor.execute("""
+        INSERT INTO category_month_totals (category_id, month, total, count)
+        SELECT category_id, month, SUM(amount), COUNT(*)
+        FROM transactions
+        WHERE category_id IS NOT NULL
+        GROUP BY category_id, month
+    """)
+    return cursor.rowcount
+
+
+def verify_category_month_totals(cursor):
+    """Compare the rollup with the raw transactions.
+
+    Returns a list of (category_id, month, expected_total, expected_count,
+    stored_total, stored_count) tuples for every group that disagrees.
+    """
+    cursor.execute("""
+        WITH expected AS (
+            SELECT category_id, month, SUM(amount) as total, COUNT(*) as count
+            FROM transactions
+            WHERE category_id IS NOT NULL
+            GROUP BY category_id, month
+        ),
+        keys AS (
+            SELECT category_id, month FROM expected
+            UNION
+            SELECT category_id, month FROM category_month_totals
+        )
+        SELECT
+            k.category_id,
+            k.month,
+            COALESCE(e.total, 0),
+            COALESCE(e.count, 0),
+            COALESCE(s.total, 0),
+            COALESCE(s.count, 0)
+        FROM keys k
+        LEFT JOIN expected e
+            ON e.category_id = k.category_id AND e.month = k.month
+        LEFT JOIN category_month_totals s
+            ON s.category_id = k.category_id AND s.month = k.month
+        WHERE COALESCE(e.count, 0) != COALESCE(s.count, 0)
+           OR COALESCE(e.total, 0) != COALESCE(s.total, 0)
+        ORDER BY k.month, k.category_id
+    """)
+    return cursor.fetchall()
+
+
+def create_daily_totals_table(cursor, schema="main"):
+    """Create the per-day totals table in schema (main or an archive)"""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.daily_totals (
+            date TEXT PRIMARY KEY,
+            expense INTEGER NOT NULL DEFAULT 0,  -- paise
+            income INTEGER NOT NULL DEFAULT 0,  -- paise
+            count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+
+def create_daily_totals(cursor):
+    """Create the per-day rollup of transactions and the triggers that maintain it.
+
+    expense and income are the day's transactions of each type, which is
+    what the calendar colours and the daily spending series plot.
+    """
+    create_daily_totals_table(cursor)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_daily_totals_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO daily_totals (date, expense, income, count)
+            VALUES (
+                NEW.date,
+                CASE WHEN NEW.type = 'expense' THEN NEW.amount ELSE 0 END,
+                CASE WHEN NEW.type = 'income' THEN NEW.amount ELSE 0 END,
+                1
+            )
+            ON CONFLICT (date) DO UPDATE
+            SET expense = expense + excluded.expense,
+                income = income + excluded.income,
+                count = count + 1;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_daily_totals_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            UPDATE daily_totals
+            SET expense = expense - CASE WHEN OLD.type = 'expense' THEN OLD.amount ELSE 0 END,
+                income = income - CASE WHEN OLD.type = 'income' THEN OLD.amount ELSE 0 END,
+                count = count - 1
+            WHERE date = OLD.date;
+
+            DELETE FROM daily_totals WHERE date = OLD.date AND count <= 0;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_daily_totals_update
+        AFTER UPDATE OF date, amount, type ON transactions
+        BEGIN
+            UPDATE daily_totals
+            SET expense = expense - CASE WHEN OLD.type = 'expense' THEN OLD.amount ELSE 0 END,
+                income = income - CASE WHEN OLD.type = 'income' THEN OLD.amount ELSE 0 END,
+                count = count - 1
+            WHERE date = OLD.date;
+
+            DELETE FROM daily_totals WHERE date = OLD.date AND count <= 0;
+
+            INSERT INTO daily_totals (date, expense, income, count)
+            VALUES (
+                NEW.date,
+                CASE WHEN NEW.type = 'expense' THEN NEW.amount ELSE 0 END,
+                CASE WHEN NEW.type = 'income' THEN NEW.amount ELSE 0 END,
+                1
+            )
+            ON CONFLICT (date) DO UPDATE
+            SET expense = expense + excluded.expense,
+                income = income + excluded.income,
+                count = count + 1;
+        END
+    """)
+
+    rebuild_daily_totals(cursor)
+
+
+def daily_totals_query(schema="main"):
+    """SELECT computing the daily_totals rows from schema's transactions"""
+    return f"""
+        SELECT
+            date,
+            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END),
+            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END),
+            COUNT(*)
+        FROM {schema}.transactions
+        GROUP BY date
+    """
+
+
+def rebuild_daily_totals(cursor, schema="main"):
+    """Recompute schema's daily_totals from its transactions table"""
+    cursor.execute(f"DELETE FROM {schema}.daily_totals")
+    cursor.execute(f"""
+        INSERT INTO {schema}.daily_totals (date, expense, income, count)
+        {daily_totals_query(schema)}
+    """)
+    return cursor.rowcount
+
+
+# Each rollup's insert trigger, and the statement that adds the
+# transactions with id > ? to the rollup in one go
+BULK_ROLLUPS = (
+    ("trg_category_month_totals_insert", """
+        INSERT INTO category_month_totals (category_id, month, total, count)
+        SELECT category_id, month, SUM(amount), COUNT(*)
+        FROM transactions
+        WHERE id > ? AND category_id IS NOT NULL
+        GROUP BY category_id, month
+        ON CONFLICT (category_id, month) DO UPDATE
+        SET total = total + excluded.total, count = count + excluded.count
+    """),
+    ("trg_daily_totals_insert", """
+        INSERT INTO daily_totals (date, expense, income, count)
+        SELECT
+            date,
+            SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END),
+            SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END),
+            COUNT(*)
+        FROM transactions
+        WHERE id > ?
+        GROUP BY date
+        ON CONFLICT (date) DO UPDATE
+        SET expense = expense + excluded.expense,
+            income = income + excluded.income,
+            count = count + excluded.count
+    """),
+)
+
+
+@contextmanager
+def bulk_rollups(conn):
+    """Add transactions inserted inside the block to the rollups in one go.
+
+    Works like search.bulk_indexing: the insert triggers are dropped for
+    the block, the new rows are summed per group with one statement per
+    rollup, and the triggers are recreated, all in one transaction that
+    is left open for the caller to commit.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM transactions")
+    last_id = cursor.fetchone()[0]
+    suspended = []
+    for trigger, statement in BULK_ROLLUPS:
+        cursor.execute("""
+            SELECT sql FROM sqlite_master
+            WHERE type = 'trigger' AND name = ?
+        """, (trigger,))
+        row = cursor.fetchone()
+        if row is None:
+            continue
+        suspended.append((statement, row[0]))
+        cursor.execute(f"DROP TRIGGER {trigger}")
+
+    yield
+
+    for statement, trigger_sql in suspended:
+        cursor.execute(statement, (last_id,))
+        cursor.execute(trigger_sql)
+
+
+def verify_daily_totals(cursor):
+    """Compare daily_totals with the raw transactions.
+
+    Returns a list of (date, expected, stored) tuples for every day that
+    disagrees, where expected and stored are (expense, income, count).
+    """
+    cursor.execute(f"""
+        WITH expected (date, expense, income, count) AS ({daily_totals_query()}),
+        keys AS (
+            SELECT date FROM expected
+            UNION
+            SELECT date FROM daily_totals
+        )
+        SELECT
+            k.date,
+            COALESCE(e.expense, 0), COALESCE(e.income, 0), COALESCE(e.count, 0),
+            COALESCE(s.expense, 0), COALESCE(s.income, 0), COALESCE(s.count, 0)
+        FROM keys k
+        LEFT JOIN expected e ON e.date = k.date
+        LEFT JOIN daily_totals s ON s.date = k.date
+        WHERE COALESCE(e.expense, 0) != COALESCE(s.expense, 0)
+           OR COALESCE(e.income, 0) != COALESCE(s.income, 0)
+           OR COALESCE(e.count, 0) != COALESCE(s.count, 0)
+        ORDER BY k.date
+    """)
+    return [(day, row[:3], row[3:]) for day, *row in cursor.fetchall()]
+
+
+def run_rollup_command(db_path, rebuild=False):
+    """Verify (and optionally rebuild) the rollup tables from the command line"""
+    from .migrations import migrate  # imports this module
+
+    conn = sqlite3.connect(db_path)
+    try:
+        migrate(conn)  # creates the rollup and stores amounts in paise
+        cursor = conn.cursor()
+
+        if rebuild:
+            groups = rebuild_category_month_totals(cursor)
+            days = rebuild_daily_totals(cursor)
+            conn.commit()
+            print(f"Rebuilt category_month_totals: {groups} groups")
+            print(f"Rebuilt daily_totals: {days} days")
+
+        mismatches = verify_category_month_totals(cursor)
+        day_mismatches = verify_daily_totals(cursor)
+        conn.commit()
+        if not mismatches and not day_mismatches:
+            print("category_month_totals and daily_totals are consistent with transactions")
+            return 0
+
+        if mismatches:
+            print(f"category_month_totals has {len(mismatches)} mismatched groups:")
+        for category_id, month, total, count, stored_total, stored_count in mismatches:
+            print(f"  category {category_id} {month}: expected {format_rupees(total)} "
+                  f"({count}) but found {format_rupees(stored_total)} ({stored_count})")
+        if day_mismatches:
+            print(f"daily_totals has {len(day_mismatches)} mismatched days:")
+        for day, (expense, income, count), (stored_expense, stored_income, stored_count) \
+                in day_mismatches:
+            print(f"  {day}: expected {format_rupees(expense)} spent, {format_rupees(income)} "
+                  f"received ({count}) but found {format_rupees(stored_expense)} spent, "
+                  f"{format_rupees(stored_income)} received ({stored_count})")
+        return 1
+    finally:
+        conn.close()
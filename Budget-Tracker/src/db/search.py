@@ -0,0 +1,120 @@
+"""Full-text search over expense descriptions and income sources.
+
+Each table has an FTS5 index that stores only the tokens (external
+content), kept in sync by triggers, so searching never scans the table.
+"""
+
+import re
+from contextlib import contextmanager
+
+# (FTS table, content table, indexed column)
+SEARCH_INDEXES = (
+    ("transactions_fts", "transactions", "description"),
+    ("income_fts", "income", "source"),
+)
+
+TOKEN = re.compile(r"\w+")
+
+
+def create_search_indexes(cursor):
+    """Create the FTS5 tables and their triggers, filling them on first run"""
+    for fts, table, column in SEARCH_INDEXES:
+        cursor.execute("""
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'table' AND name = ?
+        """, (fts,))
+        exists = cursor.fetchone() is not None
+
+        # Prefix indexes keep search-as-you-type fast for short prefixes
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {column},
+                content='{table}',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        """)
+
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_insert
+            AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {fts} (rowid, {column}) VALUES (NEW.id, NEW.{column});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_delete
+            AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column})
+                VALUES ('delete', OLD.id, OLD.{column});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{fts}_update
+            AFTER UPDATE OF {column} ON {table}
+            BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column})
+                VALUES ('delete', OLD.id, OLD.{column});
+                INSERT INTO {fts} (rowid, {column}) VALUES (NEW.id, NEW.{column});
+            END
+        """)
+
+        # Index the existing rows once when search is added to a database
+        if not exists:
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+@contextmanager
+def bulk_indexing(conn):
+    """Index rows inserted inside the block with one statement per table.
+
+    FTS5 is several times faster fed by INSERT ... SELECT than row by row
+    from a trigger, so the insert triggers are dropped for the block and
+    recreated after it. Everything happens in one transaction, which is
+    left open for the caller to commit: other connections never see the
+    triggers missing, and on an error the rollback restores them.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    cursor = conn.cursor()
+    suspended = []
+    for fts, table, column in SEARCH_INDEXES:
+        cursor.execute("""
+            SELECT sql FROM sqlite_master
+            WHERE type = 'trigger' AND name = ?
+        """, (f"trg_{fts}_insert",))
+        row = cursor.fetchone()
+        if row is None:
+            continue
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+        suspended.append((fts, table, column, row[0], cursor.fetchone()[0]))
+        cursor.execute(f"DROP TRIGGER trg_{fts}_insert")
+
+    yield
+
+    for fts, table, column, trigger_sql, last_id in suspended:
+        cursor.execute(f"""
+            INSERT INTO {fts} (rowid, {column})
+            SELECT id, {column} FROM {table} WHERE id > ?
+        """, (last_id,))
+        cursor.execute(trigger_sql)
+
+
+def match_expression(text):
+    """Turn what the user typed into an FTS5 query, or None if it is empty.
+
+    Every word must match, and the last one is treated as a prefix so
+    results appear while it is still being typed. A one-letter last word
+    is left out until a second letter arrives: a single-letter prefix
+    matches most of the index and would stall every keystroke.
+    """
+    words = TOKEN.findall(text)
+    if words and len(words[-1]) < 2:
+        words.pop()
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
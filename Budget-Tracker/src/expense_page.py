@@ -1,11 +1,16 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                           QPushButton, QFrame, QTableWidget, QTableWidgetItem,
+                           QPushButton, QFrame, QTableView,
                            QLineEdit, QComboBox, QMessageBox, QHeaderView,
                            QMainWindow, QDateEdit)
-from PyQt6.QtCore import Qt, pyqtSignal, QDate
-from PyQt6.QtGui import QColor
-from datetime import datetime
+from PyQt6.QtCore import Qt, pyqtSignal, QDate, QTimer
 import sqlite3
+from .utils.action_delegate import ActionButtonDelegate
+from .history_model import ExpenseHistoryModel
+from .db.data_version import notify_write, data_version
+from .db.duplicates import count_matches
+from .import_dialog import import_statement_file
+from .utils.history_filters import HistoryFilterBar, enable_header_sorting
+from .utils.money import to_paise, to_rupees, format_rupees
 
 class ExpensePage(QWidget):
     expense_added = pyqtSignal(float, str, str, str)  # amount, category, description, type
@@ -141,19 +146,64 @@ class ExpensePage(QWidget):
         history_layout = QVBoxLayout(history_frame)
         
         # Title
+        title_layout = QHBoxLayout()
         history_title = QLabel("Expense History")
         history_title.setStyleSheet("font-size: 16px; font-weight: bold;")
-        history_layout.addWidget(history_title)
+        title_layout.addWidget(history_title)
+        title_layout.addStretch()
         
-        # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
-            "Date", "Category", "Amount", "Description", "Budget Status", "Actions"
-        ])
+        # Search the whole history as the user types
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search descriptions...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setMinimumWidth(250)
+        self.search_input.setStyleSheet("""
+            QLineEdit {
+                padding: 5px;
+                border: 1px solid #ccc;
+                border-radius: 4px;
+            }
+        """)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.apply_filters)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        title_layout.addWidget(self.search_input)
+        
+        import_button = QPushButton("Import Statement")
+        import_button.setToolTip("Import transactions from a CSV, OFX or QIF bank statement")
+        import_button.setStyleSheet("""
+            QPushButton {
+                background-color: #2196F3;
+                color: white;
+                border: none;
+                padding: 6px 12px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #1976D2;
+            }
+        """)
+        import_button.clicked.connect(self.import_statement)
+        title_layout.addWidget(import_button)
+        history_layout.addLayout(title_layout)
+        
+        self.filter_bar = HistoryFilterBar(show_category=True)
+        self.filter_bar.changed.connect(self.search_timer.start)
+        history_layout.addWidget(self.filter_bar)
+        
+        # Table (rows are fetched in pages as the user scrolls)
+        self.model = ExpenseHistoryModel(self.conn, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.actions = ActionButtonDelegate(self.table)
+        self.actions.edit_clicked.connect(self.edit_expense)
+        self.actions.delete_clicked.connect(self.delete_expense)
+        self.table.setItemDelegateForColumn(5, self.actions)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 border: none;
                 gridline-color: #ddd;
             }
@@ -165,6 +215,7 @@ class ExpensePage(QWidget):
             }
         """)
         history_layout.addWidget(self.table)
+        enable_header_sorting(self.table)
         
         layout.addWidget(history_frame)
 
@@ -183,7 +234,7 @@ class ExpensePage(QWidget):
         try:
             cursor = self.conn.cursor()
             cursor.execute("""
-                SELECT name 
+                SELECT id, name 
                 FROM categories 
                 WHERE type = 'expense'
                 ORDER BY name
@@ -193,7 +244,8 @@ class ExpensePage(QWidget):
             
             self.category_combo.clear()
             self.category_combo.addItem("Select Category")
-            self.category_combo.addItems([cat[0] for cat in categories])
+            self.category_combo.addItems([cat[1] for cat in categories])
+            self.filter_bar.set_categories(categories)
             
         except sqlite3.Error as e:
             print(f"Error loading categories: {e}")
@@ -202,126 +254,34 @@ class ExpensePage(QWidget):
 
     def load_data(self):
         """Load expense history"""
+        self.data_key = data_version(self.conn)
+        self.model.refresh()
+        
+        # Load categories
+        self.load_categories()
+
+    def showEvent(self, event):
+        """Reload if the data changed while the page was hidden"""
+        super().showEvent(event)
         try:
-            cursor = self.conn.cursor()
-            
-            # Get expense history with category names and budget status
-            cursor.execute("""
-                SELECT 
-                    t.id,
-                    t.date,
-                    c.name as category,
-                    t.amount,
-                    t.description,
-                    c.budget,
-                    (
-                        SELECT SUM(amount) 
-                        FROM transactions 
-                        WHERE category_id = t.category_id 
-                        AND strftime('%Y-%m', date) = strftime('%Y-%m', t.date)
-                    ) as monthly_total
-                FROM transactions t
-                JOIN categories c ON t.category_id = c.id
-                WHERE t.type = 'expense'
-                ORDER BY t.date DESC, t.id DESC
-                LIMIT 100
-            """)
-            
-            expenses = cursor.fetchall()
-            
-            self.table.setRowCount(len(expenses))
-            
-            for row, (expense_id, date_str, category, amount, description, budget, monthly_total) in enumerate(expenses):
-                # Date
-                date_item = QTableWidgetItem(
-                    datetime.strptime(date_str, '%Y-%m-%d').strftime('%d-%b-%Y')
-                )
-                date_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(row, 0, date_item)
-                
-                # Category
-                category_item = QTableWidgetItem(category)
-                category_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(row, 1, category_item)
-                
-                # Amount
-                amount_item = QTableWidgetItem(f"₹{amount:,.2f}")
-                amount_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
-                self.table.setItem(row, 2, amount_item)
-                
-                # Description
-                desc_item = QTableWidgetItem(description or "")
-                desc_item.setTextAlignment(Qt.AlignmentFlag.AlignLeft)
-                self.table.setItem(row, 3, desc_item)
-                
-                # Budget Status
-                if budget > 0:
-                    percentage = (monthly_total / budget) * 100
-                    if percentage >= 90:
-                        status = "Over Budget!"
-                        color = "#f44336"  # Red
-                    elif percentage >= 75:
-                        status = "Near Budget"
-                        color = "#ff9800"  # Orange
-                    else:
-                        status = "Within Budget"
-                        color = "#4caf50"  # Green
-                    
-                    status_item = QTableWidgetItem(
-                        f"{status} ({percentage:.1f}%)"
-                    )
-                else:
-                    status_item = QTableWidgetItem("No Budget Set")
-                    color = "#757575"  # Gray
-                
-                status_item.setForeground(Qt.GlobalColor.white)
-                status_item.setBackground(QColor(color))
-                status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(row, 4, status_item)
-                
-                # Action Buttons
-                action_widget = QWidget()
-                action_layout = QHBoxLayout(action_widget)
-                action_layout.setContentsMargins(4, 4, 4, 4)
-                
-                edit_btn = QPushButton("Edit")
-                edit_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #4CAF50;
-                        color: white;
-                        border-radius: 3px;
-                        padding: 5px;
-                    }
-                    QPushButton:hover {
-                        background-color: #388E3C;
-                    }
-                """)
-                edit_btn.clicked.connect(lambda checked, eid=expense_id: self.edit_expense(eid))
-                
-                delete_btn = QPushButton("Delete")
-                delete_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #f44336;
-                        color: white;
-                        border-radius: 3px;
-                        padding: 5px;
-                    }
-                    QPushButton:hover {
-                        background-color: #d32f2f;
-                    }
-                """)
-                delete_btn.clicked.connect(lambda checked, eid=expense_id: self.delete_expense(eid))
-                
-                action_layout.addWidget(edit_btn)
-                action_layout.addWidget(delete_btn)
-                self.table.setCellWidget(row, 5, action_widget)
-            
-            # Load categories
-            self.load_categories()
-            
+            if data_version(self.conn) != self.data_key:
+                self.load_data()
         except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            QMessageBox.warning(self, "Error", "Failed to load expense history")
+            print(f"Error checking for changes: {e}")
+
+    def apply_filters(self):
+        """Filter the history by the search box and the filter bar"""
+        self.model.set_filters(self.filter_bar.filters())
+        self.model.set_search(self.search_input.text())
+        if self.model.match and not self.model.ranked:
+            self.show_status_message("Many matches: showing the newest first")
+
+    def import_statement(self):
+        """Bulk import transactions from a bank statement file"""
+        if import_statement_file(self, self.conn):
+            notify_write()
+            self.load_data()
+            self.show_status_message("Statement imported")
 
     def add_expense(self):
         """Add a new expense or update existing one"""
@@ -341,7 +301,7 @@ class ExpensePage(QWidget):
                 return
             
             try:
-                amount = float(amount_text)
+                amount = to_paise(amount_text)
                 if amount <= 0:
                     raise ValueError
             except ValueError:
@@ -357,8 +317,13 @@ class ExpensePage(QWidget):
                 QMessageBox.warning(self, "Error", "Selected category not found")
                 return
             
+            changed_dates = [date]
+            
             # If we're editing an existing expense
             if hasattr(self, 'editing_expense_id'):
+                cursor.execute("SELECT date FROM transactions WHERE id = ?",
+                               (self.editing_expense_id,))
+                changed_dates += [row[0] for row in cursor.fetchall()]  # the day it moved from
                 cursor.execute("""
                     UPDATE transactions 
                     SET date = ?, amount = ?, category_id = ?, description = ?
@@ -367,17 +332,31 @@ class ExpensePage(QWidget):
                 
                 # Clear the editing flag
                 delattr(self, 'editing_expense_id')
-                success_msg = f"Updated expense: ₹{amount:,.2f} for {category}"
+                success_msg = f"Updated expense: {format_rupees(amount)} for {category}"
             else:
+                # Same date, amount and description as an existing expense?
+                if count_matches(cursor, date, amount, description):
+                    reply = QMessageBox.question(
+                        self, "Possible Duplicate",
+                        f"An expense of {format_rupees(amount)} on {date} with this description "
+                        "is already recorded. Add it anyway?",
+                        QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                        QMessageBox.StandardButton.No
+                    )
+                    if reply != QMessageBox.StandardButton.Yes:
+                        return
+
                 # Add new transaction
                 cursor.execute("""
                     INSERT INTO transactions (date, category_id, amount, description, type)
                     VALUES (?, ?, ?, ?, 'expense')
                 """, (date, category_id[0], amount, description))
-                success_msg = f"Added expense: ₹{amount:,.2f} for {category}"
+                success_msg = f"Added expense: {format_rupees(amount)} for {category}"
             
             self.conn.commit()
             
+            notify_write(changed_dates)
+            
             # Clear inputs
             self.amount_input.clear()
             self.category_combo.setCurrentIndex(0)
@@ -391,7 +370,7 @@ class ExpensePage(QWidget):
             self.show_status_message(success_msg)
             
             # Emit signal
-            self.expense_added.emit(amount, category, description, "expense")
+            self.expense_added.emit(to_rupees(amount), category, description, "expense")
             
         except sqlite3.Error as e:
             print(f"Database error: {e}")
@@ -422,7 +401,7 @@ class ExpensePage(QWidget):
             
             # Pre-fill the form
             self.date_input.setDate(QDate.fromString(date_str, Qt.DateFormat.ISODate))
-            self.amount_input.setText(str(amount))
+            self.amount_input.setText(format_rupees(amount, symbol="", grouping=False))
             index = self.category_combo.findText(category_name)
             if index >= 0:
                 self.category_combo.setCurrentIndex(index)
@@ -451,8 +430,11 @@ class ExpensePage(QWidget):
             
             if reply == QMessageBox.StandardButton.Yes:
                 cursor = self.conn.cursor()
+                cursor.execute("SELECT date FROM transactions WHERE id = ?", (expense_id,))
+                changed_dates = [row[0] for row in cursor.fetchall()]
                 cursor.execute("DELETE FROM transactions WHERE id = ?", (expense_id,))
                 self.conn.commit()
+                notify_write(changed_dates)
                 
                 self.load_data()
                 self.show_status_message("Expense deleted successfully")
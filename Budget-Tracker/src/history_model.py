@@ -0,0 +1,378 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+from datetime import datetime, date
+import json
+import sqlite3
+from .utils.action_delegate import ROW_ID_ROLE
+from .db.search import match_expression
+from .utils.money import format_rupees
+
+
+class PagedQueryModel(QAbstractTableModel):
+    """Table model that pulls rows from SQLite a page at a time.
+
+    Rows are ordered by one of the sortable columns (newest first by
+    default) and each page continues from the (sort value, id) of the last
+    loaded row, so a page is an index seek no matter how far back the user
+    has scrolled. Filters are added to the query's WHERE clause, so only
+    matching rows are ever read. Cells are formatted on demand for the
+    rows the view actually paints.
+
+    While a search is active, rows come from the table's full-text index
+    instead. Ranking with bm25 needs statistics from every match, so a
+    search is ranked once when it starts: the ids of its matches are kept
+    best first and each page loads the next page_size of them. Searches
+    with more than rank_limit matches would take too long to rank on
+    every keystroke and are shown newest first, a page at a time below
+    the lowest id loaded, which FTS5 streams straight from the index.
+    ranked tells the pages which order is in use.
+    """
+
+    page_size = 200
+    rank_limit = 10000  # ranking 10,000 matches takes about 50 ms
+    headers = []
+    search_table = None  # FTS5 table searched by set_search
+
+    query = ""  # SELECT ... FROM {source} ..., where {source} becomes table
+    table = ""  # main table with the alias used in columns
+    columns = {}  # filter/sort name -> SQL column
+    conditions = []  # always applied
+    sort_columns = {}  # view column -> (columns key, index in a fetched row)
+
+    def __init__(self, db_connection, parent=None):
+        super().__init__(parent)
+        self.conn = db_connection
+        self.rows = []
+        self.exhausted = False
+        self.match = None  # FTS5 query while searching
+        self.ranked = False  # whether the matches are in rank order
+        self.ranked_ids = []  # ids of the matches, best first, while ranked
+        self.match_after = None  # ranked: ranked_ids loaded, else lowest id loaded
+        self.filters = {}
+        self.sort_column = 0
+        self.descending = True
+
+    def filter_conditions(self):
+        """Return (conditions, params) for the active filters.
+
+        filters may hold category_id, min_amount, max_amount, start_date and
+        end_date (amounts in paise); None or a missing key means no limit.
+        """
+        tests = (
+            ("category_id", "category_id", "="),
+            ("min_amount", "amount", ">="),
+            ("max_amount", "amount", "<="),
+            ("start_date", "date", ">="),
+            ("end_date", "date", "<="),
+        )
+        conditions = list(self.conditions)
+        params = []
+        for key, column, operator in tests:
+            value = self.filters.get(key)
+            if value is not None and column in self.columns:
+                conditions.append(f"{self.columns[column]} {operator} ?")
+                params.append(value)
+        return conditions, params
+
+    def fetch_page(self, cursor, after, limit):
+        """Return up to limit rows past the (sort value, id) key in after"""
+        name, _ = self.sort_columns[self.sort_column]
+        sort_key, row_id = self.columns[name], self.columns["id"]
+        direction = "DESC" if self.descending else "ASC"
+
+        conditions, params = self.filter_conditions()
+        if after:
+            conditions.append(f"({sort_key}, {row_id}) {'<' if self.descending else '>'} (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cursor.execute(f"""
+            {self.query.format(source=self.table)}
+            {where}
+            ORDER BY {sort_key} {direction}, {row_id} {direction}
+            LIMIT ?
+        """, (*params, limit))
+        return cursor.fetchall()
+
+    def fetch_matches(self, cursor, match, after, limit):
+        """Return up to limit rows matching match with ids below after"""
+        row_id = self.columns["id"]
+        conditions, params = self.filter_conditions()
+        conditions.insert(0, f"{self.search_table} MATCH ?")
+        params.insert(0, match)
+        if after:
+            conditions.append("f.rowid < ?")
+            params.append(after)
+
+        # The index drives the join, so matches stream out in rowid order
+        source = f"{self.search_table} f JOIN {self.table} ON {row_id} = f.rowid"
+        cursor.execute(f"""
+            {self.query.format(source=source)}
+            WHERE {' AND '.join(conditions)}
+            ORDER BY f.rowid DESC
+            LIMIT ?
+        """, (*params, limit))
+        return cursor.fetchall()
+
+    def rank_matches(self, cursor, match):
+        """Ids of the rows matching match, best rank first, or None if too many"""
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM {self.search_table}
+                WHERE {self.search_table} MATCH ?
+                LIMIT ?
+            )
+        """, (match, self.rank_limit + 1))
+        if cursor.fetchone()[0] > self.rank_limit:
+            return None
+
+        row_id = self.columns["id"]
+        conditions, params = self.filter_conditions()
+        cursor.execute(f"""
+            SELECT f.rowid FROM {self.search_table} f
+            JOIN {self.table} ON {row_id} = f.rowid
+            WHERE {self.search_table} MATCH ? {''.join(f' AND {c}' for c in conditions)}
+            ORDER BY f.rank, f.rowid
+        """, (match, *params))
+        return [row[0] for row in cursor.fetchall()]
+
+    def fetch_ranked(self, cursor, ids):
+        """Return the rows with the given ids, in the same order"""
+        row_id = self.columns["id"]
+        cursor.execute(f"""
+            {self.query.format(source=self.table)}
+            WHERE {row_id} IN (SELECT value FROM json_each(?))
+        """, (json.dumps(ids),))
+        rows = {row[0]: row for row in cursor.fetchall()}
+        return [rows[i] for i in ids if i in rows]  # rows deleted since are left out
+
+    def set_search(self, text):
+        """Show only rows matching text, or every row when it is blank"""
+        match = match_expression(text)
+        if match != self.match:
+            self.match = match
+            self.refresh()
+
+    def set_filters(self, filters):
+        """Show only rows within filters (see filter_conditions)"""
+        if filters != self.filters:
+            self.filters = dict(filters)
+            self.refresh()
+
+    def sort(self, column, order=Qt.SortOrder.DescendingOrder):
+        """Order rows by a sortable column; other columns are ignored.
+
+        Searches keep their own order (see ranked) whatever the sort order.
+        """
+        descending = order == Qt.SortOrder.DescendingOrder
+        if column not in self.sort_columns:
+            return
+        if (column, descending) != (self.sort_column, self.descending):
+            self.sort_column = column
+            self.descending = descending
+            self.refresh()
+
+    def cell(self, row, column, role):
+        """Return the value for one cell of a fetched row.
+
+        By default the values after the row's id are shown unformatted,
+        one per column; subclasses format them and add the other roles.
+        """
+        if role == Qt.ItemDataRole.DisplayRole and column + 1 < len(row):
+            return row[column + 1]
+        return None
+
+    def refresh(self):
+        """Drop all loaded rows and fetch the first page again"""
+        self.beginResetModel()
+        self.rows = []
+        self.exhausted = False
+        self.match_after = None
+        self.ranked_ids = []
+        if self.match:
+            try:
+                ranked_ids = self.rank_matches(self.conn.cursor(), self.match)
+            except sqlite3.Error as e:
+                print(f"Database error while ranking matches: {e}")
+                ranked_ids = None
+            self.ranked = ranked_ids is not None
+            self.ranked_ids = ranked_ids or []
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def row_id(self, row):
+        return self.rows[row][0]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (orientation == Qt.Orientation.Horizontal and
+                role == Qt.ItemDataRole.DisplayRole):
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == ROW_ID_ROLE:
+            return self.row_id(index.row())
+        return self.cell(self.rows[index.row()], index.column(), role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+
+        try:
+            cursor = self.conn.cursor()
+            if self.match and self.ranked:
+                start = self.match_after or 0
+                self.match_after = start + self.page_size
+                page = self.fetch_ranked(cursor, self.ranked_ids[start:self.match_after])
+            elif self.match:
+                page = self.fetch_matches(cursor, self.match, self.match_after, self.page_size)
+                if page:
+                    self.match_after = min(row[0] for row in page)
+            else:
+                # Rows start with the id; the sort value is the seek key
+                _, index = self.sort_columns[self.sort_column]
+                after = (self.rows[-1][index], self.rows[-1][0]) if self.rows else None
+                page = self.fetch_page(cursor, after, self.page_size)
+        except sqlite3.Error as e:
+            print(f"Database error while fetching rows: {e}")
+            page = []
+
+        if self.match and self.ranked:
+            self.exhausted = self.match_after >= len(self.ranked_ids)
+        elif len(page) < self.page_size:
+            self.exhausted = True
+        if not page:
+            return
+
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+
+def format_date(date_str):
+    return datetime.strptime(date_str, '%Y-%m-%d').strftime('%d-%b-%Y')
+
+
+class ExpenseHistoryModel(PagedQueryModel):
+    headers = ["Date", "Category", "Amount", "Description", "Budget Status", "Actions"]
+    search_table = "transactions_fts"
+    table = "transactions t"
+    query = """
+        SELECT
+            t.id,
+            t.date,
+            COALESCE(c.name, '') as category,
+            t.amount,
+            t.description,
+            COALESCE(c.budget, 0),
+            COALESCE(m.total, 0) as monthly_total
+        FROM {source}
+        LEFT JOIN categories c ON t.category_id = c.id
+        LEFT JOIN category_month_totals m
+            ON m.category_id = t.category_id AND m.month = t.month
+    """
+    columns = {"id": "t.id", "date": "t.date", "amount": "t.amount",
+               "category_id": "t.category_id"}
+    conditions = ["t.type = 'expense'"]
+    sort_columns = {0: ("date", 1), 2: ("amount", 3)}
+
+    def budget_status(self, budget, monthly_total):
+        """Return the status text and colour for a category's monthly spend"""
+        if budget > 0:
+            percentage = (monthly_total / budget) * 100
+            if percentage >= 90:
+                status, color = "Over Budget!", "#f44336"  # Red
+            elif percentage >= 75:
+                status, color = "Near Budget", "#ff9800"  # Orange
+            else:
+                status, color = "Within Budget", "#4caf50"  # Green
+            return f"{status} ({percentage:.1f}%)", color
+        return "No Budget Set", "#757575"  # Gray
+
+    def cell(self, row, column, role):
+        expense_id, date_str, category, amount, description, budget, monthly_total = row
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return format_date(date_str)
+            if column == 1:
+                return category
+            if column == 2:
+                return format_rupees(amount)
+            if column == 3:
+                return description or ""
+            if column == 4:
+                return self.budget_status(budget, monthly_total)[0]
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if column == 2:
+                return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+            if column == 3:
+                return Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+            return Qt.AlignmentFlag.AlignCenter
+        elif column == 4:
+            if role == Qt.ItemDataRole.BackgroundRole:
+                return QColor(self.budget_status(budget, monthly_total)[1])
+            if role == Qt.ItemDataRole.ForegroundRole:
+                return QColor(Qt.GlobalColor.white)
+        return None
+
+
+class IncomeHistoryModel(PagedQueryModel):
+    headers = ["Date", "Source", "Amount", "Frequency", "Next Due", "Actions"]
+    search_table = "income_fts"
+    table = "income i"
+    query = """
+        SELECT
+            i.id,
+            i.date,
+            i.source,
+            i.amount,
+            i.is_recurring,
+            i.frequency,
+            i.next_date
+        FROM {source}
+    """
+    columns = {"id": "i.id", "date": "i.date", "amount": "i.amount"}
+    sort_columns = {0: ("date", 1), 2: ("amount", 3)}
+
+    def cell(self, row, column, role):
+        income_id, date_str, source, amount, is_recurring, frequency, next_date = row
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return format_date(date_str)
+            if column == 1:
+                return source
+            if column == 2:
+                return format_rupees(amount)
+            if column == 3:
+                return frequency.title() if is_recurring else "One-time"
+            if column == 4:
+                return format_date(next_date) if next_date else "N/A"
+        elif role == Qt.ItemDataRole.TextAlignmentRole:
+            if column == 2:
+                return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+            return Qt.AlignmentFlag.AlignCenter
+        elif role == Qt.ItemDataRole.ForegroundRole and column == 4 and next_date:
+            # Color code based on due date
+            due_date = datetime.strptime(next_date, '%Y-%m-%d').date()
+            days_until = (due_date - date.today()).days
+
+            if days_until < 0:
+                return QColor("#f44336")  # Red for overdue
+            elif days_until <= 7:
+                return QColor("#ff9800")  # Orange for due soon
+            return QColor("#4caf50")  # Green for upcoming
+        return None
@@ -0,0 +1,93 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                           QProgressBar, QFileDialog)
+from PyQt6.QtCore import QThreadPool
+from .db.importer import ImportWorker, STATEMENT_FILTER
+from .db.query_worker import database_path
+
+
+class ImportDialog(QDialog):
+    """Imports a bank statement in the background and shows its progress"""
+
+    def __init__(self, db_path, statement_path, parent=None):
+        super().__init__(parent)
+        self.worker = None
+        self.summary = None
+        self.setWindowTitle("Import Statement")
+        self.setModal(True)
+        self.resize(480, 160)
+        self.setup_ui(statement_path)
+
+        self.worker = ImportWorker(db_path, statement_path)
+        self.worker.signals.progress.connect(self.on_progress)
+        self.worker.signals.finished.connect(self.on_finished)
+        self.worker.signals.failed.connect(self.on_failed)
+        QThreadPool.globalInstance().start(self.worker)
+
+    def setup_ui(self, statement_path):
+        layout = QVBoxLayout(self)
+
+        self.status_label = QLabel(f"Importing {statement_path}")
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        self.progress = QProgressBar()
+        self.progress.setMaximum(0)  # busy until the first progress report
+        layout.addWidget(self.progress)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self.close_button = QPushButton("Close")
+        self.close_button.setEnabled(False)
+        self.close_button.clicked.connect(self.accept)
+        button_layout.addWidget(self.close_button)
+        layout.addLayout(button_layout)
+
+    def on_progress(self, done, total):
+        # Scale to KB so large files fit in the progress bar's int range
+        self.progress.setMaximum(max(total // 1024, 1))
+        self.progress.setValue(done // 1024)
+
+    def on_finished(self, summary):
+        self.worker = None
+        self.summary = summary
+        self.progress.setMaximum(1)
+        self.progress.setValue(1)
+
+        lines = [f"Imported {summary.expenses:,} expenses and {summary.income:,} income entries."]
+        if summary.duplicates:
+            lines.append(f"Skipped {summary.duplicates:,} transactions that were already recorded.")
+        if summary.unreadable:
+            lines.append(f"Skipped {summary.unreadable:,} rows that could not be read.")
+        if summary.new_categories:
+            lines.append(f"Added categories: {', '.join(summary.new_categories)}")
+        self.status_label.setText("\n".join(lines))
+        self.close_button.setEnabled(True)
+
+    def on_failed(self, message):
+        self.worker = None
+        self.progress.hide()
+        self.status_label.setText(f"Import failed: {message}\n"
+                                  "Rows written before the error have been kept.")
+        self.close_button.setEnabled(True)
+
+    def reject(self):
+        # Keep the dialog open until the import finishes
+        if self.worker is None:
+            super().reject()
+
+
+def import_statement_file(parent, conn):
+    """Ask for a statement file and import it.
+
+    Returns True if an import was run; rows may have been added even if
+    it failed part way.
+    """
+    file_path, _ = QFileDialog.getOpenFileName(
+        parent, "Import Bank Statement", "", STATEMENT_FILTER
+    )
+    if not file_path:
+        return False
+
+    dialog = ImportDialog(database_path(conn), file_path, parent)
+    dialog.exec()
+    return True
@@ -1,12 +1,17 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                           QPushButton, QFrame, QTableWidget, QTableWidgetItem,
+                           QPushButton, QFrame, QTableView,
                            QLineEdit, QComboBox, QMessageBox, QHeaderView,
                            QMainWindow, QDateEdit)
-from PyQt6.QtCore import Qt, pyqtSignal, QDate
-from PyQt6.QtGui import QColor
-from datetime import datetime, date
+from PyQt6.QtCore import Qt, pyqtSignal, QDate, QTimer
+from datetime import date
 import sqlite3
 from dateutil.relativedelta import relativedelta
+from .utils.action_delegate import ActionButtonDelegate
+from .history_model import IncomeHistoryModel
+from .db.data_version import notify_write, data_version
+from .import_dialog import import_statement_file
+from .utils.history_filters import HistoryFilterBar, enable_header_sorting
+from .utils.money import to_paise, to_rupees, format_rupees
 
 class IncomePage(QWidget):
     income_added = pyqtSignal(float, str, str)  # amount, source, frequency
@@ -142,19 +147,64 @@ class IncomePage(QWidget):
         list_layout = QVBoxLayout(list_frame)
         
         # Title
+        title_layout = QHBoxLayout()
         list_title = QLabel("Income History")
         list_title.setStyleSheet("font-size: 16px; font-weight: bold;")
-        list_layout.addWidget(list_title)
+        title_layout.addWidget(list_title)
+        title_layout.addStretch()
         
-        # Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels([
-            "Date", "Source", "Amount", "Frequency", "Next Due", "Actions"
-        ])
+        # Search the whole history as the user types
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search sources...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setMinimumWidth(250)
+        self.search_input.setStyleSheet("""
+            QLineEdit {
+                padding: 5px;
+                border: 1px solid #ccc;
+                border-radius: 4px;
+            }
+        """)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.apply_filters)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        title_layout.addWidget(self.search_input)
+        
+        import_button = QPushButton("Import Statement")
+        import_button.setToolTip("Import transactions from a CSV, OFX or QIF bank statement")
+        import_button.setStyleSheet("""
+            QPushButton {
+                background-color: #2196F3;
+                color: white;
+                border: none;
+                padding: 6px 12px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #1976D2;
+            }
+        """)
+        import_button.clicked.connect(self.import_statement)
+        title_layout.addWidget(import_button)
+        list_layout.addLayout(title_layout)
+        
+        self.filter_bar = HistoryFilterBar(show_category=False)
+        self.filter_bar.changed.connect(self.search_timer.start)
+        list_layout.addWidget(self.filter_bar)
+        
+        # Table (rows are fetched in pages as the user scrolls)
+        self.model = IncomeHistoryModel(self.conn, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.actions = ActionButtonDelegate(self.table)
+        self.actions.edit_clicked.connect(self.edit_income)
+        self.actions.delete_clicked.connect(self.delete_income)
+        self.table.setItemDelegateForColumn(5, self.actions)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 border: none;
                 gridline-color: #ddd;
             }
@@ -166,120 +216,40 @@ class IncomePage(QWidget):
             }
         """)
         list_layout.addWidget(self.table)
+        enable_header_sorting(self.table)
         
         layout.addWidget(list_frame)
 
     def load_data(self):
         """Load income history"""
+        self.data_key = data_version(self.conn)
+        self.model.refresh()
+        
+        # Load sources
+        self.load_sources()
+
+    def showEvent(self, event):
+        """Reload if the data changed while the page was hidden"""
+        super().showEvent(event)
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    id,
-                    date,
-                    source,
-                    amount,
-                    is_recurring,
-                    frequency,
-                    next_date
-                FROM income
-                ORDER BY date DESC, id DESC
-                LIMIT 100
-            """)
-            
-            incomes = cursor.fetchall()
-            
-            self.table.setRowCount(len(incomes))
-            
-            for row, (income_id, date_str, source, amount, is_recurring, frequency, next_date) in enumerate(incomes):
-                # Date
-                date_item = QTableWidgetItem(
-                    datetime.strptime(date_str, '%Y-%m-%d').strftime('%d-%b-%Y')
-                )
-                date_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(row, 0, date_item)
-                
-                # Source
-                source_item = QTableWidgetItem(source)
-                source_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(row, 1, source_item)
-                
-                # Amount
-                amount_item = QTableWidgetItem(f"₹{amount:,.2f}")
-                amount_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
-                self.table.setItem(row, 2, amount_item)
-                
-                # Frequency
-                freq_text = frequency.title() if is_recurring else "One-time"
-                freq_item = QTableWidgetItem(freq_text)
-                freq_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(row, 3, freq_item)
-                
-                # Next Due
-                if next_date:
-                    next_due = datetime.strptime(next_date, '%Y-%m-%d').strftime('%d-%b-%Y')
-                    next_item = QTableWidgetItem(next_due)
-                    
-                    # Color code based on due date
-                    today = date.today()
-                    due_date = datetime.strptime(next_date, '%Y-%m-%d').date()
-                    days_until = (due_date - today).days
-                    
-                    if days_until < 0:
-                        next_item.setForeground(QColor("#f44336"))  # Red for overdue
-                    elif days_until <= 7:
-                        next_item.setForeground(QColor("#ff9800"))  # Orange for due soon
-                    else:
-                        next_item.setForeground(QColor("#4caf50"))  # Green for upcoming
-                else:
-                    next_item = QTableWidgetItem("N/A")
-                
-                next_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                self.table.setItem(row, 4, next_item)
-                
-                # Action Buttons
-                action_widget = QWidget()
-                action_layout = QHBoxLayout(action_widget)
-                action_layout.setContentsMargins(4, 4, 4, 4)
-                
-                edit_btn = QPushButton("Edit")
-                edit_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #4CAF50;
-                        color: white;
-                        border-radius: 3px;
-                        padding: 5px;
-                    }
-                    QPushButton:hover {
-                        background-color: #388E3C;
-                    }
-                """)
-                edit_btn.clicked.connect(lambda checked, iid=income_id: self.edit_income(iid))
-                
-                delete_btn = QPushButton("Delete")
-                delete_btn.setStyleSheet("""
-                    QPushButton {
-                        background-color: #f44336;
-                        color: white;
-                        border-radius: 3px;
-                        padding: 5px;
-                    }
-                    QPushButton:hover {
-                        background-color: #d32f2f;
-                    }
-                """)
-                delete_btn.clicked.connect(lambda checked, iid=income_id: self.delete_income(iid))
-                
-                action_layout.addWidget(edit_btn)
-                action_layout.addWidget(delete_btn)
-                self.table.setCellWidget(row, 5, action_widget)
-            
-            # Load sources
-            self.load_sources()
-            
+            if data_version(self.conn) != self.data_key:
+                self.load_data()
         except sqlite3.Error as e:
-            print(f"Database error: {e}")
-            QMessageBox.warning(self, "Error", "Failed to load income history")
+            print(f"Error checking for changes: {e}")
+
+    def apply_filters(self):
+        """Filter the history by the search box and the filter bar"""
+        self.model.set_filters(self.filter_bar.filters())
+        self.model.set_search(self.search_input.text())
+        if self.model.match and not self.model.ranked:
+            self.show_status_message("Many matches: showing the newest first")
+
+    def import_statement(self):
+        """Bulk import transactions from a bank statement file"""
+        if import_statement_file(self, self.conn):
+            notify_write()
+            self.load_data()
+            self.show_status_message("Statement imported")
 
     def load_sources(self):
         """Load income sources"""
@@ -358,7 +328,7 @@ class IncomePage(QWidget):
                 return
             
             try:
-                amount = float(amount_text)
+                amount = to_paise(amount_text)
                 if amount <= 0:
                     raise ValueError
             except ValueError:
@@ -371,8 +341,12 @@ class IncomePage(QWidget):
             
             cursor = self.conn.cursor()
             
+            changed_dates = [date]
+            
             # If we're editing an existing income
             if hasattr(self, 'editing_income_id'):
+                cursor.execute("SELECT date FROM income WHERE id = ?", (self.editing_income_id,))
+                changed_dates += [row[0] for row in cursor.fetchall()]  # the day it moved from
                 cursor.execute("""
                     UPDATE income 
                     SET date = ?, amount = ?, source = ?, is_recurring = ?, 
@@ -385,7 +359,7 @@ class IncomePage(QWidget):
                 
                 # Clear the editing flag
                 delattr(self, 'editing_income_id')
-                success_msg = f"Updated {frequency} income: ₹{amount:,.2f} from {source}"
+                success_msg = f"Updated {frequency} income: {format_rupees(amount)} from {source}"
             else:
                 # Add new income
                 cursor.execute("""
@@ -395,10 +369,12 @@ class IncomePage(QWidget):
                 """, (date, source, amount, is_recurring, 
                       frequency if is_recurring else None,
                       next_date.isoformat() if next_date else None))
-                success_msg = f"Added {frequency} income: ₹{amount:,.2f} from {source}"
+                success_msg = f"Added {frequency} income: {format_rupees(amount)} from {source}"
             
             self.conn.commit()
             
+            notify_write(changed_dates)
+            
             # Clear inputs
             self.amount_input.clear()
             self.source_combo.setCurrentIndex(0)
@@ -412,7 +388,7 @@ class IncomePage(QWidget):
             self.show_status_message(success_msg)
             
             # Emit signal
-            self.income_added.emit(amount, source, frequency)
+            self.income_added.emit(to_rupees(amount), source, frequency)
             
         except sqlite3.Error as e:
             print(f"Database error: {e}")
@@ -442,7 +418,7 @@ class IncomePage(QWidget):
             
             # Pre-fill the form
             self.date_input.setDate(QDate.fromString(date_str, Qt.DateFormat.ISODate))
-            self.amount_input.setText(str(amount))
+            self.amount_input.setText(format_rupees(amount, symbol="", grouping=False))
             index = self.source_combo.findText(source)
             if index >= 0:
                 self.source_combo.setCurrentIndex(index)
@@ -476,8 +452,11 @@ class IncomePage(QWidget):
             
             if reply == QMessageBox.StandardButton.Yes:
                 cursor = self.conn.cursor()
+                cursor.execute("SELECT date FROM income WHERE id = ?", (income_id,))
+                changed_dates = [row[0] for row in cursor.fetchall()]
                 cursor.execute("DELETE FROM income WHERE id = ?", (income_id,))
                 self.conn.commit()
+                notify_write(changed_dates)
                 
                 self.load_data()
                 self.show_status_message("Income entry deleted successfully")
@@ -1,23 +1,35 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                           QComboBox, QFrame, QPushButton, QFileDialog, QMessageBox)
-from PyQt6.QtCore import Qt
+                           QComboBox, QFrame, QPushButton, QFileDialog, QMessageBox,
+                           QDateEdit)
+from PyQt6.QtCore import Qt, QDate, QTimer
 from PyQt6.QtGui import QFont
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 import sqlite3
 from datetime import datetime, timedelta
-import matplotlib.dates as mdates
 from .utils.colors import *
+from .utils.charts import LineChart, DonutChart, GroupedBarChart
+from .db.connections import reader
+from .db.archive import attach_archives
+from .db.data_version import data_version
+from .db.report_data import build_report, history_start, period_label, BUCKET_ADJECTIVES
+from .utils.money import to_rupees, format_rupees
 import csv
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+# Tick labels of the spending line for each period size
+TREND_DATE_FORMATS = {
+    'day': '%d-%b',
+    'week': '%d %b %y',
+    'month': '%b %Y',
+    'quarter': lambda d: f"Q{(d.month - 1) // 3 + 1} {d.year}",
+    'year': '%Y',
+}
 
 class ReportsPage(QWidget):
     def __init__(self, db_connection):
         super().__init__()
         self.conn = db_connection
+        self.report_cache = {}  # (start_date, end_date, data version) -> dataset
         plt.style.use('bmh')  # Use a clean base style
         plt.rcParams.update(CHART_STYLE)  # Apply our custom style
         self.init_ui()
@@ -90,7 +102,8 @@ class ReportsPage(QWidget):
         range_layout = QHBoxLayout(range_frame)
         
         self.range_combo = QComboBox()
-        self.range_combo.addItems(['Last 7 Days', 'Last 30 Days', 'Last 3 Months', 'Last 6 Months', 'Last Year'])
+        self.range_combo.addItems(['Last 7 Days', 'Last 30 Days', 'Last 3 Months', 'Last 6 Months',
+                                   'Last Year', 'All Time', 'Custom Range'])
         self.range_combo.setStyleSheet(f"""
             QComboBox {{
                 padding: 5px;
@@ -99,11 +112,30 @@ class ReportsPage(QWidget):
                 min-width: 150px;
             }}
         """)
-        self.range_combo.currentTextChanged.connect(self.update_charts)
+        self.range_combo.currentTextChanged.connect(self.on_range_changed)
+        
+        # Start and end of a custom range, shown only for 'Custom Range'
+        self.start_date_input = QDateEdit()
+        self.start_date_input.setDate(QDate.currentDate().addYears(-1))
+        self.end_date_input = QDateEdit()
+        self.end_date_input.setDate(QDate.currentDate())
+        self.custom_range_label = QLabel("to")
+        # Typing a date changes it once per keystroke; redraw once typing pauses
+        self.custom_range_timer = QTimer(self)
+        self.custom_range_timer.setSingleShot(True)
+        self.custom_range_timer.setInterval(150)
+        self.custom_range_timer.timeout.connect(self.update_charts)
+        for date_input in (self.start_date_input, self.end_date_input):
+            date_input.setCalendarPopup(True)
+            date_input.dateChanged.connect(self.on_custom_date_changed)
         
         range_layout.addWidget(QLabel("Time Range:"))
         range_layout.addWidget(self.range_combo)
+        range_layout.addWidget(self.start_date_input)
+        range_layout.addWidget(self.custom_range_label)
+        range_layout.addWidget(self.end_date_input)
         range_layout.addStretch()
+        self.set_custom_range_visible(False)
         
         layout.addWidget(range_frame)
         
@@ -133,6 +165,16 @@ class ReportsPage(QWidget):
         comparison_frame.layout().addWidget(self.comparison_canvas)
         layout.addWidget(comparison_frame)
         
+        no_data = 'No data available for selected time range'
+        self.trends_chart = LineChart(self.trends_canvas, 'Daily Spending Trend', PRIMARY, no_data)
+        self.distribution_chart = DonutChart(
+            self.distribution_canvas, 'Expense Distribution by Category',
+            CHART_COLORS[:8], no_data, pct_color=TEXT_PRIMARY)
+        self.comparison_chart = GroupedBarChart(
+            self.comparison_canvas, 'Monthly Income vs Expenses', ['Income', 'Expenses'],
+            [SECONDARY, WARNING], no_data, xlabel='Month', tick_ha='center',
+            alpha=0.7, value_labels=True)
+        
         self.update_charts()
         
     def create_chart_frame(self, title):
@@ -171,195 +213,78 @@ class ReportsPage(QWidget):
             start_date = end_date - timedelta(days=90)
         elif range_text == 'Last 6 Months':
             start_date = end_date - timedelta(days=180)
-        else:  # Last Year
+        elif range_text == 'Last Year':
             start_date = end_date - timedelta(days=365)
+        elif range_text == 'All Time':
+            with reader(self.conn) as conn:
+                first = history_start(conn)
+            start_date = datetime.strptime(first, '%Y-%m-%d') if first else end_date
+        else:  # Custom Range
+            start = self.start_date_input.date().toString(Qt.DateFormat.ISODate)
+            end = self.end_date_input.date().toString(Qt.DateFormat.ISODate)
+            return min(start, end), max(start, end)
             
         return start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
         
+    def on_range_changed(self, range_text):
+        self.custom_range_timer.stop()
+        self.set_custom_range_visible(range_text == 'Custom Range')
+        self.update_charts()
+        
+    def on_custom_date_changed(self):
+        if self.range_combo.currentText() == 'Custom Range':
+            self.custom_range_timer.start()
+
+    def set_custom_range_visible(self, visible):
+        for widget in (self.start_date_input, self.custom_range_label, self.end_date_input):
+            widget.setVisible(visible)
+        
+    def report_data(self):
+        """Dataset for the selected range, read once per range and data version"""
+        start_date, end_date = self.get_date_range()
+        key = (start_date, end_date, data_version(self.conn))
+        if key not in self.report_cache:
+            with reader(self.conn) as conn:
+                attach_archives(conn, start_date, end_date)
+                dataset = build_report(conn, start_date, end_date)
+            # Entries from an older data version can never be used again
+            self.report_cache = {cached: value for cached, value in self.report_cache.items()
+                                 if cached[2] == key[2]}
+            self.report_cache[key] = dataset
+        return self.report_cache[key]
+
+    def showEvent(self, event):
+        """Redraw if the data changed while the page was hidden"""
+        super().showEvent(event)
+        self.update_charts()
+
     def update_charts(self):
         try:
-            self.update_spending_trends()
-            self.update_category_distribution()
-            self.update_income_expenses_comparison()
+            report = self.report_data()
+            self.update_spending_trends(report)
+            self.update_category_distribution(report)
+            self.update_income_expenses_comparison(report)
         except Exception as e:
             print(f"Error updating charts: {e}")
             
-    def update_spending_trends(self):
-        start_date, end_date = self.get_date_range()
-        
-        # Get daily spending data
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT date, SUM(amount) as daily_total
-            FROM transactions
-            WHERE type = 'expense'
-            AND date BETWEEN ? AND ?
-            GROUP BY date
-            ORDER BY date
-        """, (start_date, end_date))
-        
-        results = cursor.fetchall()
-        if not results:
-            self.show_no_data_message(self.trends_figure)
-            self.trends_canvas.draw()
-            return
-            
-        dates, amounts = zip(*results)
-        dates = [datetime.strptime(d, '%Y-%m-%d') for d in dates]
-        
-        self.trends_figure.clear()
-        ax = self.trends_figure.add_subplot(111)
-        
-        # Plot spending trend
-        ax.plot(dates, amounts, color=PRIMARY, marker='o', linewidth=2, markersize=6)
-        ax.fill_between(dates, amounts, alpha=0.2, color=PRIMARY)
-        
-        # Customize chart
-        ax.set_title('Daily Spending Trend', pad=20, fontsize=12, fontweight='bold')
-        ax.set_xlabel('Date', labelpad=10)
-        ax.set_ylabel('Amount (₹)', labelpad=10)
-        
-        # Format axes
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d-%b'))
-        ax.tick_params(axis='x', rotation=45)
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'₹{x:,.0f}'))
-        
-        self.trends_figure.tight_layout()
-        self.trends_canvas.draw()
-        
-    def update_category_distribution(self):
-        start_date, end_date = self.get_date_range()
-        
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            SELECT c.name, SUM(t.amount) as total
-            FROM transactions t
-            JOIN categories c ON t.category_id = c.id
-            WHERE t.type = 'expense'
-            AND t.date BETWEEN ? AND ?
-            GROUP BY c.name
-            ORDER BY total DESC
-            LIMIT 8
-        """, (start_date, end_date))
-        
-        results = cursor.fetchall()
-        if not results:
-            self.show_no_data_message(self.distribution_figure)
-            self.distribution_canvas.draw()
-            return
-            
-        categories, totals = zip(*results)
-        
-        self.distribution_figure.clear()
-        ax = self.distribution_figure.add_subplot(111)
-        
-        # Create pie chart
-        colors = CHART_COLORS[:len(categories)]
-        wedges, texts, autotexts = ax.pie(
-            totals, 
-            labels=categories,
-            colors=colors,
-            autopct='%1.1f%%',
-            startangle=90,
-            wedgeprops={'width': 0.7}  # Create a donut chart
+    def update_spending_trends(self, report):
+        bucket = report['bucket']
+        self.trends_chart.set_title(f"{BUCKET_ADJECTIVES[bucket]} Spending Trend")
+        self.trends_chart.set_date_format(TREND_DATE_FORMATS[bucket])
+        self.trends_chart.update((period, to_rupees(total)) for period, total in report['spending'])
+        
+    def update_category_distribution(self, report):
+        self.distribution_chart.update(
+            (name, to_rupees(total)) for name, total in report['categories'][:8])
+        
+    def update_income_expenses_comparison(self, report):
+        bucket = report['comparison_bucket']
+        self.comparison_chart.set_title(f"{BUCKET_ADJECTIVES[bucket]} Income vs Expenses",
+                                        xlabel=bucket.capitalize())
+        self.comparison_chart.update(
+            (period_label(period, bucket), to_rupees(income), to_rupees(expense))
+            for period, income, expense in report['comparison']
         )
-        
-        # Customize chart
-        plt.setp(autotexts, size=9, weight="bold", color=TEXT_PRIMARY)
-        plt.setp(texts, size=10)
-        
-        ax.set_title('Expense Distribution by Category', pad=20, fontsize=12, fontweight='bold')
-        
-        # Add legend
-        ax.legend(
-            wedges, categories,
-            title="Categories",
-            loc="center left",
-            bbox_to_anchor=(1, 0, 0.5, 1)
-        )
-        
-        self.distribution_figure.tight_layout()
-        self.distribution_canvas.draw()
-        
-    def update_income_expenses_comparison(self):
-        start_date, end_date = self.get_date_range()
-        
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            WITH monthly_totals AS (
-                SELECT 
-                    strftime('%Y-%m', date) as month,
-                    type,
-                    SUM(amount) as total
-                FROM transactions
-                WHERE date BETWEEN ? AND ?
-                GROUP BY strftime('%Y-%m', date), type
-            )
-            SELECT 
-                month,
-                MAX(CASE WHEN type = 'income' THEN total ELSE 0 END) as income,
-                MAX(CASE WHEN type = 'expense' THEN total ELSE 0 END) as expense
-            FROM monthly_totals
-            GROUP BY month
-            ORDER BY month
-        """, (start_date, end_date))
-        
-        results = cursor.fetchall()
-        if not results:
-            self.show_no_data_message(self.comparison_figure)
-            self.comparison_canvas.draw()
-            return
-            
-        months, incomes, expenses = zip(*results)
-        months = [datetime.strptime(m + '-01', '%Y-%m-%d') for m in months]
-        
-        self.comparison_figure.clear()
-        ax = self.comparison_figure.add_subplot(111)
-        
-        # Plot bars
-        bar_width = 0.35
-        x = range(len(months))
-        
-        income_bars = ax.bar([i - bar_width/2 for i in x], incomes, bar_width, 
-                           label='Income', color=SECONDARY, alpha=0.7)
-        expense_bars = ax.bar([i + bar_width/2 for i in x], expenses, bar_width,
-                            label='Expenses', color=WARNING, alpha=0.7)
-        
-        # Customize chart
-        ax.set_title('Monthly Income vs Expenses', pad=20, fontsize=12, fontweight='bold')
-        ax.set_xlabel('Month', labelpad=10)
-        ax.set_ylabel('Amount (₹)', labelpad=10)
-        
-        # Format axes
-        ax.set_xticks(x)
-        ax.set_xticklabels([d.strftime('%b %Y') for d in months], rotation=45)
-        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'₹{x:,.0f}'))
-        
-        # Add legend
-        ax.legend()
-        
-        # Add value labels on bars
-        def add_value_labels(bars):
-            for bar in bars:
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'₹{int(height):,}',
-                       ha='center', va='bottom', rotation=0,
-                       fontsize=8)
-        
-        add_value_labels(income_bars)
-        add_value_labels(expense_bars)
-        
-        self.comparison_figure.tight_layout()
-        self.comparison_canvas.draw()
-        
-    def show_no_data_message(self, figure):
-        figure.clear()
-        ax = figure.add_subplot(111)
-        ax.text(0.5, 0.5, 'No data available for selected time range',
-               ha='center', va='center', fontsize=12)
-        ax.set_xticks([])
-        ax.set_yticks([])
 
     def export_csv(self):
         try:
@@ -373,7 +298,8 @@ class ReportsPage(QWidget):
             if not file_path.endswith('.csv'):
                 file_path += '.csv'
                 
-            start_date, end_date = self.get_date_range()
+            report = self.report_data()
+            start_date, end_date = report['start_date'], report['end_date']
             
             with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
                 writer = csv.writer(csvfile)
@@ -383,76 +309,39 @@ class ReportsPage(QWidget):
                 writer.writerow([f'Period: {start_date} to {end_date}'])
                 writer.writerow([])
                 
-                # Daily Spending Data
-                writer.writerow(['Daily Spending'])
-                writer.writerow(['Date', 'Amount'])
-                
-                cursor = self.conn.cursor()
-                cursor.execute("""
-                    SELECT date, SUM(amount) as daily_total
-                    FROM transactions
-                    WHERE type = 'expense'
-                    AND date BETWEEN ? AND ?
-                    GROUP BY date
-                    ORDER BY date
-                """, (start_date, end_date))
+                # Spending per day, week, ... depending on the range
+                writer.writerow([f"{BUCKET_ADJECTIVES[report['bucket']]} Spending"])
+                writer.writerow([report['bucket'].capitalize(), 'Amount'])
                 
-                for row in cursor.fetchall():
-                    writer.writerow([row[0], f'₹{row[1]:,.2f}'])
+                for period, amount in report['spending']:
+                    writer.writerow([period_label(period, report['bucket'], long=True),
+                                     format_rupees(amount)])
                 writer.writerow([])
                 
                 # Category Distribution
                 writer.writerow(['Category Distribution'])
                 writer.writerow(['Category', 'Total Amount', 'Percentage'])
                 
-                cursor.execute("""
-                    SELECT c.name, SUM(t.amount) as total
-                    FROM transactions t
-                    JOIN categories c ON t.category_id = c.id
-                    WHERE t.type = 'expense'
-                    AND t.date BETWEEN ? AND ?
-                    GROUP BY c.name
-                    ORDER BY total DESC
-                """, (start_date, end_date))
-                
-                category_data = cursor.fetchall()
+                category_data = report['categories']
                 total_expenses = sum(row[1] for row in category_data)
                 
                 for name, amount in category_data:
                     percentage = (amount / total_expenses * 100) if total_expenses > 0 else 0
-                    writer.writerow([name, f'₹{amount:,.2f}', f'{percentage:.1f}%'])
+                    writer.writerow([name, format_rupees(amount), f'{percentage:.1f}%'])
                 writer.writerow([])
                 
-                # Monthly Income vs Expenses
-                writer.writerow(['Monthly Income vs Expenses'])
-                writer.writerow(['Month', 'Income', 'Expenses', 'Net'])
-                
-                cursor.execute("""
-                    WITH monthly_totals AS (
-                        SELECT 
-                            strftime('%Y-%m', date) as month,
-                            type,
-                            SUM(amount) as total
-                        FROM transactions
-                        WHERE date BETWEEN ? AND ?
-                        GROUP BY strftime('%Y-%m', date), type
-                    )
-                    SELECT 
-                        month,
-                        MAX(CASE WHEN type = 'income' THEN total ELSE 0 END) as income,
-                        MAX(CASE WHEN type = 'expense' THEN total ELSE 0 END) as expense
-                    FROM monthly_totals
-                    GROUP BY month
-                    ORDER BY month
-                """, (start_date, end_date))
+                # Income vs Expenses per month, quarter or year
+                bucket = report['comparison_bucket']
+                writer.writerow([f"{BUCKET_ADJECTIVES[bucket]} Income vs Expenses"])
+                writer.writerow([bucket.capitalize(), 'Income', 'Expenses', 'Net'])
                 
-                for month, income, expense in cursor.fetchall():
+                for period, income, expense in report['comparison']:
                     net = income - expense
                     writer.writerow([
-                        datetime.strptime(month + '-01', '%Y-%m-%d').strftime('%B %Y'),
-                        f'₹{income:,.2f}',
-                        f'₹{expense:,.2f}',
-                        f'₹{net:,.2f}'
+                        period_label(period, bucket, long=True),
+                        format_rupees(income),
+                        format_rupees(expense),
+                        format_rupees(net)
                     ])
                 
             QMessageBox.information(self, "Success", "Report exported successfully as CSV!")
@@ -462,6 +351,12 @@ class ReportsPage(QWidget):
             
     def export_pdf(self):
         try:
+            # reportlab is only needed here, so keep it out of startup
+            from reportlab.lib import colors
+            from reportlab.lib.pagesizes import letter, inch
+            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+            
             file_path, _ = QFileDialog.getSaveFileName(
                 self, "Export Report as PDF", "", "PDF Files (*.pdf)"
             )
@@ -472,7 +367,8 @@ class ReportsPage(QWidget):
             if not file_path.endswith('.pdf'):
                 file_path += '.pdf'
                 
-            start_date, end_date = self.get_date_range()
+            report = self.report_data()
+            start_date, end_date = report['start_date'], report['end_date']
             
             # Create PDF document
             doc = SimpleDocTemplate(file_path, pagesize=letter)
@@ -499,26 +395,14 @@ class ReportsPage(QWidget):
             elements.append(Paragraph(f"Period: {start_date} to {end_date}", styles['Normal']))
             elements.append(Spacer(1, 20))
             
-            cursor = self.conn.cursor()
+            # Spending per day, week, ... depending on the range
+            bucket = report['bucket']
+            elements.append(Paragraph(f"{BUCKET_ADJECTIVES[bucket]} Spending", heading_style))
             
-            # Daily Spending
-            elements.append(Paragraph("Daily Spending", heading_style))
+            data = [[bucket.capitalize(), 'Amount']]
+            for period, amount in report['spending'][:10]:
+                data.append([period_label(period, bucket, long=True), format_rupees(amount)])
             
-            cursor.execute("""
-                SELECT date, SUM(amount) as daily_total
-                FROM transactions
-                WHERE type = 'expense'
-                AND date BETWEEN ? AND ?
-                GROUP BY date
-                ORDER BY date
-                LIMIT 10
-            """, (start_date, end_date))
-            
-            data = [['Date', 'Amount']]
-            for row in cursor.fetchall():
-                date = datetime.strptime(row[0], '%Y-%m-%d').strftime('%d %b %Y')
-                data.append([date, f'₹{row[1]:,.2f}'])
-                
             table = Table(data, colWidths=[4*inch, 2*inch])
             table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -540,24 +424,14 @@ class ReportsPage(QWidget):
             # Category Distribution
             elements.append(Paragraph("Category Distribution", heading_style))
             
-            cursor.execute("""
-                SELECT c.name, SUM(t.amount) as total
-                FROM transactions t
-                JOIN categories c ON t.category_id = c.id
-                WHERE t.type = 'expense'
-                AND t.date BETWEEN ? AND ?
-                GROUP BY c.name
-                ORDER BY total DESC
-            """, (start_date, end_date))
-            
-            category_data = cursor.fetchall()
+            category_data = report['categories']
             total_expenses = sum(row[1] for row in category_data)
             
             data = [['Category', 'Amount', 'Percentage']]
             for name, amount in category_data:
                 percentage = (amount / total_expenses * 100) if total_expenses > 0 else 0
-                data.append([name, f'₹{amount:,.2f}', f'{percentage:.1f}%'])
-                
+                data.append([name, format_rupees(amount), f'{percentage:.1f}%'])
+            
             table = Table(data, colWidths=[2.5*inch, 2*inch, 1.5*inch])
             table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
@@ -576,39 +450,21 @@ class ReportsPage(QWidget):
             elements.append(table)
             elements.append(Spacer(1, 20))
             
-            # Monthly Income vs Expenses
-            elements.append(Paragraph("Monthly Income vs Expenses", heading_style))
-            
-            cursor.execute("""
-                WITH monthly_totals AS (
-                    SELECT 
-                        strftime('%Y-%m', date) as month,
-                        type,
-                        SUM(amount) as total
-                    FROM transactions
-                    WHERE date BETWEEN ? AND ?
-                    GROUP BY strftime('%Y-%m', date), type
-                )
-                SELECT 
-                    month,
-                    MAX(CASE WHEN type = 'income' THEN total ELSE 0 END) as income,
-                    MAX(CASE WHEN type = 'expense' THEN total ELSE 0 END) as expense
-                FROM monthly_totals
-                GROUP BY month
-                ORDER BY month
-            """, (start_date, end_date))
+            # Income vs Expenses per month, quarter or year
+            bucket = report['comparison_bucket']
+            elements.append(Paragraph(f"{BUCKET_ADJECTIVES[bucket]} Income vs Expenses",
+                                      heading_style))
             
-            data = [['Month', 'Income', 'Expenses', 'Net']]
-            for month, income, expense in cursor.fetchall():
+            data = [[bucket.capitalize(), 'Income', 'Expenses', 'Net']]
+            for period, income, expense in report['comparison']:
                 net = income - expense
-                month_str = datetime.strptime(month + '-01', '%Y-%m-%d').strftime('%B %Y')
                 data.append([
-                    month_str,
-                    f'₹{income:,.2f}',
-                    f'₹{expense:,.2f}',
-                    f'₹{net:,.2f}'
+                    period_label(period, bucket, long=True),
+                    format_rupees(income),
+                    format_rupees(expense),
+                    format_rupees(net)
                 ])
-                
+            
             table = Table(data, colWidths=[2*inch, 1.5*inch, 1.5*inch, 1.5*inch])
             table.setStyle(TableStyle([
                 ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
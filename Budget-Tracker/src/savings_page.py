@@ -7,6 +7,10 @@ from PyQt6.QtGui import QFont, QColor
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from .utils.action_delegate import ActionButtonDelegate, ROW_ID_ROLE
+from .db.data_version import notify_write
+from .utils.charts import GroupedBarChart
+from .utils.money import to_paise, to_rupees, format_rupees
 
 class SavingsGoalDialog(QDialog):
     def __init__(self, parent=None, goal_data=None):
@@ -30,7 +34,7 @@ class SavingsGoalDialog(QDialog):
         self.target_input.setRange(0, 10000000)
         self.target_input.setSingleStep(1000)
         if self.goal_data:
-            self.target_input.setValue(int(self.goal_data['target_amount']))
+            self.target_input.setValue(int(to_rupees(self.goal_data['target_amount'])))
         layout.addRow("Target Amount (₹):", self.target_input)
 
         # Target Date
@@ -48,7 +52,7 @@ class SavingsGoalDialog(QDialog):
         self.current_input.setRange(0, 10000000)
         self.current_input.setSingleStep(1000)
         if self.goal_data:
-            self.current_input.setValue(int(self.goal_data['current_amount']))
+            self.current_input.setValue(int(to_rupees(self.goal_data['current_amount'])))
         layout.addRow("Current Amount (₹):", self.current_input)
 
         # Buttons
@@ -64,9 +68,9 @@ class SavingsGoalDialog(QDialog):
     def get_data(self):
         return {
             'name': self.name_input.text(),
-            'target_amount': self.target_input.value(),
+            'target_amount': to_paise(self.target_input.value()),
             'target_date': self.date_input.date().toString(Qt.DateFormat.ISODate),
-            'current_amount': self.current_input.value()
+            'current_amount': to_paise(self.current_input.value())
         }
 
 class SavingsPage(QWidget):
@@ -142,6 +146,11 @@ class SavingsPage(QWidget):
                 font-weight: bold;
             }
         """)
+
+        self.actions = ActionButtonDelegate(self.table)
+        self.actions.edit_clicked.connect(self.edit_goal)
+        self.actions.delete_clicked.connect(self.delete_goal)
+        self.table.setItemDelegateForColumn(6, self.actions)
         layout.addWidget(self.table)
 
         # Progress Chart
@@ -153,6 +162,8 @@ class SavingsPage(QWidget):
         self.figure = Figure(figsize=(8, 4))
         self.canvas = FigureCanvas(self.figure)
         chart_layout.addWidget(self.canvas)
+        self.chart = GroupedBarChart(self.canvas, 'Savings Goals Progress',
+                                     ['Target', 'Current'], ['#2196F3', '#4CAF50'])
         
         layout.addWidget(chart_frame)
 
@@ -184,12 +195,12 @@ class SavingsPage(QWidget):
             self.table.setItem(row, 0, QTableWidgetItem(name))
             
             # Target Amount
-            target_item = QTableWidgetItem(f"₹{target:,.2f}")
+            target_item = QTableWidgetItem(format_rupees(target))
             target_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
             self.table.setItem(row, 1, target_item)
             
             # Current Amount
-            current_item = QTableWidgetItem(f"₹{current:,.2f}")
+            current_item = QTableWidgetItem(format_rupees(current))
             current_item.setTextAlignment(Qt.AlignmentFlag.AlignRight)
             self.table.setItem(row, 2, current_item)
             
@@ -215,71 +226,20 @@ class SavingsPage(QWidget):
                 days_item.setForeground(QColor("#f44336"))
             self.table.setItem(row, 5, days_item)
             
-            # Action Buttons
-            action_widget = QWidget()
-            action_layout = QHBoxLayout(action_widget)
-            action_layout.setContentsMargins(4, 4, 4, 4)
-            
-            edit_btn = QPushButton("Edit")
-            edit_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #4CAF50;
-                    color: white;
-                    border-radius: 3px;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #388E3C;
-                }
-            """)
-            edit_btn.clicked.connect(lambda checked, gid=goal_id: self.edit_goal(gid))
-            
-            delete_btn = QPushButton("Delete")
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #f44336;
-                    color: white;
-                    border-radius: 3px;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #d32f2f;
-                }
-            """)
-            delete_btn.clicked.connect(lambda checked, gid=goal_id: self.delete_goal(gid))
-            
-            action_layout.addWidget(edit_btn)
-            action_layout.addWidget(delete_btn)
-            self.table.setCellWidget(row, 6, action_widget)
+            # Actions (painted by the delegate, which reads the row id)
+            action_item = QTableWidgetItem()
+            action_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+            action_item.setData(ROW_ID_ROLE, goal_id)
+            self.table.setItem(row, 6, action_item)
         
         # Update total savings display
-        self.total_savings.setText(f"Total Savings: ₹{total_saved:,.2f}")
+        self.total_savings.setText(f"Total Savings: {format_rupees(total_saved)}")
         
         # Update chart
         self.update_chart(goals)
 
     def update_chart(self, goals):
-        self.figure.clear()
-        ax = self.figure.add_subplot(111)
-        
-        names = [goal[1] for goal in goals]
-        currents = [goal[3] for goal in goals]
-        targets = [goal[2] for goal in goals]
-        
-        x = range(len(names))
-        width = 0.35
-        
-        ax.bar([i - width/2 for i in x], targets, width, label='Target', color='#2196F3')
-        ax.bar([i + width/2 for i in x], currents, width, label='Current', color='#4CAF50')
-        
-        ax.set_ylabel('Amount (₹)')
-        ax.set_title('Savings Goals Progress')
-        ax.set_xticks(x)
-        ax.set_xticklabels(names, rotation=45, ha='right')
-        ax.legend()
-        
-        self.figure.tight_layout()
-        self.canvas.draw()
+        self.chart.update((goal[1], to_rupees(goal[2]), to_rupees(goal[3])) for goal in goals)
 
     def add_goal(self):
         dialog = SavingsGoalDialog(self)
@@ -292,6 +252,7 @@ class SavingsPage(QWidget):
             """, (data['name'], data['target_amount'], data['current_amount'],
                  data['target_date']))
             self.conn.commit()
+            notify_write()
             self.load_data()
 
     def edit_goal(self, goal_id):
@@ -318,6 +279,7 @@ class SavingsPage(QWidget):
             """, (data['name'], data['target_amount'], data['current_amount'],
                  data['target_date'], goal_id))
             self.conn.commit()
+            notify_write()
             self.load_data()
 
     def delete_goal(self, goal_id):
@@ -333,4 +295,5 @@ class SavingsPage(QWidget):
             cursor = self.conn.cursor()
             cursor.execute("DELETE FROM savings_goals WHERE id = ?", (goal_id,))
             self.conn.commit()
+            notify_write()
             self.load_data()
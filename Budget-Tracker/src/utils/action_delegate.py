@@ -0,0 +1,88 @@
+"""Item delegate that paints Edit/Delete buttons for a table's action column"""
+
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
+from PyQt6.QtCore import Qt, QEvent, QRect, QSize, pyqtSignal
+from PyQt6.QtGui import QColor, QCursor
+from .colors import SECONDARY, SECONDARY_DARK, WARNING, WARNING_DARK
+
+# Role holding the database id of the row behind an action cell
+ROW_ID_ROLE = Qt.ItemDataRole.UserRole
+
+BUTTONS = [
+    # (label, color, hover color)
+    ("Edit", SECONDARY, SECONDARY_DARK),
+    ("Delete", WARNING, WARNING_DARK),
+]
+
+
+class ActionButtonDelegate(QStyledItemDelegate):
+    """Paint the row buttons instead of creating a widget tree per row.
+
+    Clicks are hit-tested against the painted button rectangles and
+    reported with the row id stored under ROW_ID_ROLE.
+    """
+
+    edit_clicked = pyqtSignal(int)
+    delete_clicked = pyqtSignal(int)
+
+    margin = 4
+    spacing = 4
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+        # Needed for hover feedback while moving between the two buttons
+        view.setMouseTracking(True)
+
+    def button_rects(self, rect):
+        area = rect.adjusted(self.margin, self.margin, -self.margin, -self.margin)
+        width = (area.width() - self.spacing) // len(BUTTONS)
+        return [
+            QRect(area.left() + i * (width + self.spacing), area.top(), width, area.height())
+            for i in range(len(BUTTONS))
+        ]
+
+    def paint(self, painter, option, index):
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+
+        hovered = option.state & QStyle.StateFlag.State_MouseOver
+        cursor_pos = self.view.viewport().mapFromGlobal(QCursor.pos())
+
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        for (label, color, hover_color), rect in zip(BUTTONS, self.button_rects(option.rect)):
+            is_hovered = hovered and rect.contains(cursor_pos)
+            painter.setBrush(QColor(hover_color if is_hovered else color))
+            painter.drawRoundedRect(rect, 3, 3)
+
+        painter.setPen(QColor("white"))
+        for (label, color, hover_color), rect in zip(BUTTONS, self.button_rects(option.rect)):
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, label)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        metrics = option.fontMetrics
+        width = sum(metrics.horizontalAdvance(label) + 20 for label, _, _ in BUTTONS)
+        height = metrics.height() + 10
+        return QSize(width + self.spacing + 2 * self.margin, height + 2 * self.margin)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseMove:
+            self.view.viewport().update(option.rect)
+            return False
+
+        if (event.type() == QEvent.Type.MouseButtonRelease and
+                event.button() == Qt.MouseButton.LeftButton):
+            row_id = index.data(ROW_ID_ROLE)
+            pos = event.position().toPoint()
+            for (label, _, _), rect in zip(BUTTONS, self.button_rects(option.rect)):
+                if rect.contains(pos) and row_id is not None:
+                    if label == "Edit":
+                        self.edit_clicked.emit(row_id)
+                    else:
+                        self.delete_clicked.emit(row_id)
+                    return True
+
+        return False
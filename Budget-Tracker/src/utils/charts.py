@@ -0,0 +1,281 @@
+"""Charts that keep their matplotlib artists and update them in place.
+
+Each chart builds its axes and artists once. update() swaps in the new
+series (line data, bar heights, wedge angles) and returns False without
+drawing anything when the series is the same as last time. The expensive
+tight_layout pass only runs when labels change size, not on every refresh.
+"""
+
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib.ticker import FuncFormatter
+
+MARKER_LIMIT = 60  # lines with more points than this are drawn without markers
+
+rupee_formatter = FuncFormatter(lambda x, p: f'₹{x:,.0f}')
+
+
+class Chart(ABC):
+    """Common empty-state, change detection and drawing for the charts below"""
+
+    def __init__(self, canvas, title, empty_text, **axes_kw):
+        self.canvas = canvas
+        self.figure = canvas.figure
+        self.ax = self.figure.add_subplot(111, **axes_kw)
+        self.ax.set_title(title, pad=20, fontsize=12, fontweight='bold')
+        self.empty_text = empty_text
+        self.message = self.ax.text(0.5, 0.5, empty_text, ha='center', va='center',
+                                    fontsize=12, transform=self.ax.transAxes)
+        self.series = None
+        self.layout_key = None
+
+    def update(self, rows):
+        """Plot rows of (label, value, ...); returns False if nothing changed"""
+        rows = tuple(tuple(row) for row in rows)
+        if rows == self.series:
+            return False
+        self.series = rows
+
+        if rows:
+            layout_key = self.show(*zip(*rows))
+            self.set_visible(True)
+        else:
+            layout_key = None
+            self.set_visible(False)
+            self.message.set_text(self.empty_text)
+
+        if layout_key != self.layout_key:
+            self.layout_key = layout_key
+            self.figure.tight_layout()
+        self.canvas.draw_idle()
+        return True
+
+    def set_title(self, title, xlabel=None):
+        """Change the title (and x axis label), redrawing only if they changed"""
+        if title == self.ax.get_title() and (not xlabel or xlabel == self.ax.get_xlabel()):
+            return
+        self.ax.set_title(title, pad=20, fontsize=12, fontweight='bold')
+        if xlabel:
+            self.ax.set_xlabel(xlabel, labelpad=10)
+        self.canvas.draw_idle()
+
+    def show_message(self, message):
+        """Replace the chart with a message until the next update"""
+        self.series = None
+        self.set_visible(False)
+        self.message.set_text(message)
+        self.canvas.draw_idle()
+
+    def set_visible(self, visible):
+        self.ax.set_axis_on() if visible else self.ax.set_axis_off()
+        self.ax.title.set_visible(visible)
+        self.message.set_visible(not visible)
+        for artist in self.artists():
+            artist.set_visible(visible)
+
+    @abstractmethod
+    def show(self, *series):
+        """Update the artists and return a key that changes when labels do"""
+
+    def artists(self):
+        return []
+
+
+class LineChart(Chart):
+    """Filled line over 'YYYY-MM-DD' dates.
+
+    Callers keep the series short: the reports group long ranges into
+    weeks, months, quarters or years (see report_data.MAX_TREND_POINTS)
+    and the dashboard plots 30 days.
+    """
+
+    def __init__(self, canvas, title, color, empty_text, date_format='%d-%b', **axes_kw):
+        super().__init__(canvas, title, empty_text, **axes_kw)
+        ax = self.ax
+        self.color = color
+        self.line, = ax.plot([], [], marker='o', color=color, linewidth=2, markersize=6)
+        self.fill = None
+
+        ax.set_xlabel('Date', labelpad=10)
+        ax.set_ylabel('Amount (₹)', labelpad=10)
+        ax.xaxis_date()
+        ax.xaxis.set_major_formatter(mdates.DateFormatter(date_format))
+        ax.yaxis.set_major_formatter(rupee_formatter)
+        ax.tick_params(axis='x', rotation=45)
+        ax.margins(x=0.05)
+        self.set_visible(False)
+
+    def set_date_format(self, date_format):
+        """strftime format, or a function of a datetime, for the date ticks"""
+        if callable(date_format):
+            formatter = FuncFormatter(lambda x, p: date_format(mdates.num2date(x)))
+        else:
+            formatter = mdates.DateFormatter(date_format)
+        self.ax.xaxis.set_major_formatter(formatter)
+
+    def show(self, dates, amounts):
+        x = mdates.date2num(np.array(dates, dtype='datetime64[D]'))
+        amounts = np.asarray(amounts, dtype=float)
+        self.line.set_data(x, amounts)
+        self.line.set_marker('o' if len(amounts) <= MARKER_LIMIT else '')
+
+        # The fill is a single polygon, so replacing it is cheap
+        if self.fill is not None:
+            self.fill.remove()
+        self.fill = self.ax.fill_between(x, amounts, alpha=0.2, color=self.color)
+
+        self.ax.relim()
+        self.ax.autoscale_view()
+        return len(f'{max(amounts):,.0f}')
+
+    def artists(self):
+        return [self.line] + ([self.fill] if self.fill is not None else [])
+
+
+class GroupedBarChart(Chart):
+    """Side by side bars, one group per label and one bar per series"""
+
+    def __init__(self, canvas, title, series_names, colors, empty_text='No data',
+                 xlabel=None, tick_ha='right', alpha=None, value_labels=False, **axes_kw):
+        super().__init__(canvas, title, empty_text, **axes_kw)
+        self.series_names = series_names
+        self.colors = colors
+        self.tick_ha = tick_ha
+        self.alpha = alpha
+        self.value_labels = value_labels
+        self.containers = []
+        self.labels = []
+
+        self.ax.set_ylabel('Amount (₹)', labelpad=10)
+        self.ax.yaxis.set_major_formatter(rupee_formatter)
+        if xlabel:
+            self.ax.set_xlabel(xlabel, labelpad=10)
+        self.set_visible(False)
+
+    def show(self, names, *values):
+        if not self.containers or len(self.containers[0]) != len(names):
+            self.build_bars(len(names))
+
+        for container, heights in zip(self.containers, values):
+            for bar, height in zip(container, heights):
+                bar.set_height(height)
+
+        if self.value_labels:
+            bars = [bar for container in self.containers for bar in container]
+            for text, bar in zip(self.labels, bars):
+                height = bar.get_height()
+                text.set_position((bar.get_x() + bar.get_width() / 2., height))
+                text.set_text(f'₹{int(height):,}')
+
+        self.ax.set_xticks(range(len(names)))
+        self.ax.set_xticklabels(names, rotation=45, ha=self.tick_ha)
+        self.ax.relim()
+        self.ax.autoscale_view()
+        return names
+
+    def build_bars(self, count):
+        """(Re)create the bars when the number of groups changes"""
+        for container in self.containers:
+            container.remove()
+        for text in self.labels:
+            text.remove()
+
+        width = 0.35
+        offsets = [-width / 2, width / 2]
+        self.containers = [
+            self.ax.bar([i + offset for i in range(count)], [0] * count, width,
+                        label=name, color=color, alpha=self.alpha)
+            for name, color, offset in zip(self.series_names, self.colors, offsets)
+        ]
+        self.labels = []
+        if self.value_labels:
+            self.labels = [self.ax.text(0, 0, '', ha='center', va='bottom', fontsize=8)
+                           for container in self.containers for bar in container]
+        self.ax.legend()
+
+    def artists(self):
+        artists = [bar for container in self.containers for bar in container]
+        if self.ax.get_legend():
+            artists.append(self.ax.get_legend())
+        return artists + self.labels
+
+
+class DonutChart(Chart):
+    """Donut pie with percentage labels and a legend"""
+
+    START_ANGLE = 90
+    LABEL_DISTANCE = 1.1  # matplotlib's pie() defaults
+    PCT_DISTANCE = 0.6
+
+    def __init__(self, canvas, title, colors, empty_text, label_color=None,
+                 pct_color='black', **axes_kw):
+        super().__init__(canvas, title, empty_text, **axes_kw)
+        self.colors = colors
+        self.label_color = label_color
+        self.pct_color = pct_color
+        self.wedges = []
+        self.texts = []
+        self.autotexts = []
+        self.set_visible(False)
+
+    def show(self, labels, totals):
+        if len(self.wedges) != len(labels):
+            self.build_pie(labels, totals)
+            return labels
+
+        # Same number of slices: move the existing wedges and their labels
+        total = sum(totals)
+        theta1 = self.START_ANGLE / 360
+        for i, (label, value) in enumerate(zip(labels, totals)):
+            theta2 = theta1 + value / total
+            self.wedges[i].set_theta1(360 * theta1)
+            self.wedges[i].set_theta2(360 * theta2)
+
+            angle = math.pi * (theta1 + theta2)
+            x, y = math.cos(angle), math.sin(angle)
+            self.texts[i].set_position((self.LABEL_DISTANCE * x, self.LABEL_DISTANCE * y))
+            self.texts[i].set_horizontalalignment('left' if x > 0 else 'right')
+            self.texts[i].set_text(label)
+            self.autotexts[i].set_position((self.PCT_DISTANCE * x, self.PCT_DISTANCE * y))
+            self.autotexts[i].set_text('%1.1f%%' % (100 * value / total))
+            theta1 = theta2
+
+        for text, label in zip(self.ax.get_legend().get_texts(), labels):
+            text.set_text(label)
+        return labels
+
+    def build_pie(self, labels, totals):
+        """(Re)create the wedges when the number of slices changes"""
+        for artist in self.artists():
+            artist.remove()
+
+        self.wedges, self.texts, self.autotexts = self.ax.pie(
+            totals,
+            labels=labels,
+            colors=self.colors,
+            autopct='%1.1f%%',
+            startangle=self.START_ANGLE,
+            wedgeprops={'width': 0.7}  # Create a donut chart
+        )
+        for text in self.autotexts:
+            text.set(size=9, weight='bold', color=self.pct_color)
+        for text in self.texts:
+            text.set(size=10)
+            if self.label_color:
+                text.set_color(self.label_color)
+
+        self.ax.legend(
+            self.wedges, labels,
+            title="Categories",
+            loc="center left",
+            bbox_to_anchor=(1, 0, 0.5, 1)
+        )
+
+    def artists(self):
+        artists = self.wedges + self.texts + self.autotexts
+        if self.ax.get_legend():
+            artists.append(self.ax.get_legend())
+        return artists
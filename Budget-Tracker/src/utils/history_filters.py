@@ -0,0 +1,139 @@
+"""Filter bar and header sorting for the paged history tables"""
+
+from PyQt6.QtWidgets import (QWidget, QHBoxLayout, QLabel, QLineEdit, QComboBox,
+                             QCheckBox, QDateEdit, QPushButton)
+from PyQt6.QtCore import Qt, QDate, pyqtSignal
+from PyQt6.QtGui import QDoubleValidator
+from .money import to_paise
+
+INPUT_STYLE = """
+    QLineEdit, QComboBox, QDateEdit {
+        padding: 4px;
+        border: 1px solid #ccc;
+        border-radius: 4px;
+    }
+"""
+
+
+class HistoryFilterBar(QWidget):
+    """Category, amount range and date range filters for a history table.
+
+    filters() returns the dict PagedQueryModel.set_filters expects.
+    """
+
+    changed = pyqtSignal()
+
+    def __init__(self, show_category=True, parent=None):
+        super().__init__(parent)
+        self.setStyleSheet(INPUT_STYLE)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.category_combo = None
+        if show_category:
+            self.category_combo = QComboBox()
+            self.category_combo.addItem("All Categories", None)
+            self.category_combo.currentIndexChanged.connect(self.changed)
+            layout.addWidget(self.category_combo)
+
+        validator = QDoubleValidator(0, 1e12, 2, self)
+        self.min_amount = QLineEdit()
+        self.min_amount.setPlaceholderText("Min ₹")
+        self.max_amount = QLineEdit()
+        self.max_amount.setPlaceholderText("Max ₹")
+        for amount_input in (self.min_amount, self.max_amount):
+            amount_input.setValidator(validator)
+            amount_input.setMaximumWidth(100)
+            amount_input.textChanged.connect(self.changed)
+        layout.addWidget(self.min_amount)
+        layout.addWidget(QLabel("to"))
+        layout.addWidget(self.max_amount)
+
+        self.date_check = QCheckBox("From")
+        self.date_check.toggled.connect(self.on_date_toggled)
+        self.start_date = QDateEdit()
+        self.start_date.setDate(QDate.currentDate().addMonths(-1))
+        self.end_date = QDateEdit()
+        self.end_date.setDate(QDate.currentDate())
+        for date_input in (self.start_date, self.end_date):
+            date_input.setCalendarPopup(True)
+            date_input.setEnabled(False)
+            date_input.dateChanged.connect(self.changed)
+        layout.addWidget(self.date_check)
+        layout.addWidget(self.start_date)
+        layout.addWidget(QLabel("to"))
+        layout.addWidget(self.end_date)
+
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        layout.addWidget(clear_button)
+        layout.addStretch()
+
+    def on_date_toggled(self, checked):
+        self.start_date.setEnabled(checked)
+        self.end_date.setEnabled(checked)
+        self.changed.emit()
+
+    def set_categories(self, categories):
+        """Fill the category list from (id, name) pairs, keeping the selection"""
+        if self.category_combo is None:
+            return
+        selected = self.category_combo.currentData()
+        self.category_combo.blockSignals(True)
+        self.category_combo.clear()
+        self.category_combo.addItem("All Categories", None)
+        for category_id, name in categories:
+            self.category_combo.addItem(name, category_id)
+        index = self.category_combo.findData(selected)
+        self.category_combo.setCurrentIndex(max(index, 0))
+        self.category_combo.blockSignals(False)
+        if index < 0 and selected is not None:
+            self.changed.emit()  # the selected category was deleted
+
+    def filters(self):
+        def amount(line_edit):
+            try:
+                return to_paise(line_edit.text())
+            except ValueError:
+                return None
+
+        filters = {
+            "min_amount": amount(self.min_amount),
+            "max_amount": amount(self.max_amount),
+        }
+        if self.category_combo is not None:
+            filters["category_id"] = self.category_combo.currentData()
+        if self.date_check.isChecked():
+            filters["start_date"] = self.start_date.date().toString(Qt.DateFormat.ISODate)
+            filters["end_date"] = self.end_date.date().toString(Qt.DateFormat.ISODate)
+        return filters
+
+    def clear(self):
+        self.blockSignals(True)
+        if self.category_combo is not None:
+            self.category_combo.setCurrentIndex(0)
+        self.min_amount.clear()
+        self.max_amount.clear()
+        self.date_check.setChecked(False)
+        self.blockSignals(False)
+        self.changed.emit()
+
+
+def enable_header_sorting(table):
+    """Let the sortable columns of a paged history table be sorted by clicking.
+
+    The model sorts in SQL; clicks on other columns are ignored and the
+    sort indicator stays where it was.
+    """
+    model = table.model()
+    header = table.horizontalHeader()
+
+    def keep_sortable(column, order):
+        if column not in model.sort_columns:
+            header.setSortIndicator(model.sort_column,
+                                    Qt.SortOrder.DescendingOrder if model.descending
+                                    else Qt.SortOrder.AscendingOrder)
+
+    header.setSortIndicator(model.sort_column, Qt.SortOrder.DescendingOrder)
+    table.setSortingEnabled(True)
+    header.sortIndicatorChanged.connect(keep_sortable)
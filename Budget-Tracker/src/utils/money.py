@@ -0,0 +1,37 @@
+"""Conversions between the integer paise stored in the database and rupees.
+
+Every amount in the database (transactions, income, budgets, savings
+goals, the emergency fund and the rollups) is a whole number of paise,
+so sums and budget comparisons are exact. Amounts become rupees only
+where they meet the user: input fields, table text and chart values.
+"""
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+PAISE_PER_RUPEE = 100
+
+
+def to_paise(rupees):
+    """Rupees (number or text) to whole paise, rounding half away from zero.
+
+    Raises ValueError for text that is not a number.
+    """
+    try:
+        value = Decimal(str(rupees).replace(",", "").strip()) * PAISE_PER_RUPEE
+        return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError, OverflowError):  # text, NaN, infinity
+        raise ValueError(f"Not an amount: {rupees!r}")
+
+
+def to_rupees(paise):
+    """Paise to rupees as a float, for charts and arithmetic on display values"""
+    return (paise or 0) / PAISE_PER_RUPEE
+
+
+def format_rupees(paise, symbol="₹", grouping=True):
+    """Paise as exact rupee text, e.g. ₹1,234.50 (or 1234.50 for input fields)"""
+    paise = int(paise or 0)
+    sign = "-" if paise < 0 else ""
+    rupees, paise = divmod(abs(paise), PAISE_PER_RUPEE)
+    rupees = f"{rupees:,}" if grouping else str(rupees)
+    return f"{sign}{symbol}{rupees}.{paise:02d}"
@@ -0,0 +1,42 @@
+"""Startup timing breakdown, printed when run with --startup-timing"""
+
+import time
+
+# Cold start budget from launch until the main window is on screen
+STARTUP_TARGET_MS = 1000
+
+
+class StartupTimer:
+    def __init__(self, started=None, enabled=False):
+        self.started = started if started is not None else time.perf_counter()
+        self.last = self.started
+        self.enabled = enabled
+        self.steps = []
+        self.visible_ms = None
+
+    def mark(self, label):
+        """Record the time spent since the previous mark"""
+        now = time.perf_counter()
+        self.steps.append((label, (now - self.last) * 1000))
+        self.last = now
+
+    def mark_visible(self):
+        """Record that the main window has been shown and painted"""
+        self.mark("Window visible")
+        self.visible_ms = (self.last - self.started) * 1000
+
+    def report(self):
+        """Print the breakdown if timing was requested"""
+        if not self.enabled:
+            return
+
+        print("Startup timing:")
+        for label, elapsed in self.steps:
+            print(f"  {label:<24}{elapsed:>9.1f} ms")
+        total = (self.last - self.started) * 1000
+        print(f"  {'Total':<24}{total:>9.1f} ms")
+
+        if self.visible_ms is not None:
+            status = "OK" if self.visible_ms <= STARTUP_TARGET_MS else "over target"
+            print(f"  Window visible after {self.visible_ms:.1f} ms "
+                  f"(target {STARTUP_TARGET_MS} ms, {status})")
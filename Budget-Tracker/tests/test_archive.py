@@ -0,0 +1,88 @@
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.db.archive import (ARCHIVE_VERSION, archive_path, archive_year, attach_archives,
+                            drop_archived_copies, upgrade_archive)
+from src.db.connections import configure_writer
+from src.db.migrations import migrate
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.conn = sqlite3.connect(self.work_dir / "budget.db")
+        self.addCleanup(self.conn.close)
+        configure_writer(self.conn)
+        migrate(self.conn)
+
+    def add_expense(self, expense_id, day, description):
+        self.conn.execute("""
+            INSERT INTO transactions (id, date, amount, description, type, created_at)
+            VALUES (?, ?, 1250, ?, 'expense', '2022-12-31 10:00:00')
+        """, (expense_id, day, description))
+        self.conn.commit()
+
+    def expenses(self):
+        attach_archives(self.conn, "2022-01-01", "2022-12-31")
+        rows = self.conn.execute(
+            "SELECT description FROM all_transactions ORDER BY description").fetchall()
+        self.conn.commit()
+        return [description for (description,) in rows]
+
+    def test_restored_copy_with_a_new_archive_id_is_dropped(self):
+        self.add_expense(5, "2022-03-01", "first")
+        archive_year(self.conn, 2022)
+        # id 5 is free in budget.db again, so the next 2022 row takes it
+        # and has to be given a new id in the archive
+        self.add_expense(5, "2022-04-01", "second")
+        archive_year(self.conn, 2022)
+        archive = sqlite3.connect(archive_path(self.conn, 2022))
+        self.addCleanup(archive.close)
+        self.assertEqual(archive.execute(
+            "SELECT id FROM transactions WHERE description = 'second'").fetchone()[0], 6)
+
+        # A backup from between the two moves brings the second row back
+        self.add_expense(5, "2022-04-01", "second")
+        self.assertEqual(self.expenses(), ["first", "second", "second"])
+        self.assertEqual(drop_archived_copies(self.conn), 1)
+        self.assertEqual(self.expenses(), ["first", "second"])
+
+    def test_row_that_differs_from_the_archive_is_kept(self):
+        self.add_expense(5, "2022-03-01", "first")
+        archive_year(self.conn, 2022)
+        self.add_expense(5, "2022-03-01", "edited")
+
+        self.assertEqual(drop_archived_copies(self.conn), 0)
+        self.assertEqual(self.expenses(), ["edited", "first"])
+
+    def test_upgrade_converts_rupee_amounts(self):
+        path = self.work_dir / "budget_2021.db"
+        archive = sqlite3.connect(path)
+        archive.execute("""
+            CREATE TABLE income (
+                id INTEGER PRIMARY KEY, date TEXT NOT NULL, amount REAL NOT NULL,
+                source TEXT NOT NULL, is_recurring BOOLEAN DEFAULT 0, frequency TEXT,
+                next_date TEXT, created_at TIMESTAMP,
+                month TEXT GENERATED ALWAYS AS (substr(date, 1, 7)) VIRTUAL
+            )
+        """)
+        archive.execute("INSERT INTO income (date, amount, source) VALUES ('2021-06-01', 12.5, 'Salary')")
+        archive.commit()
+        archive.close()
+
+        upgrade_archive(path)
+
+        archive = sqlite3.connect(path)
+        self.addCleanup(archive.close)
+        self.assertEqual(archive.execute("SELECT amount, source FROM income").fetchall(),
+                         [(1250, "Salary")])
+        self.assertEqual(archive.execute("SELECT COUNT(*) FROM transactions").fetchone()[0], 0)
+        self.assertEqual(archive.execute("PRAGMA user_version").fetchone()[0], ARCHIVE_VERSION)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.db.connections import configure_writer
+from src.db.migrations import migrate
+from src.history_model import ExpenseHistoryModel
+
+
+class SearchOrderTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.conn = sqlite3.connect(self.work_dir / "budget.db")
+        self.addCleanup(self.conn.close)
+        configure_writer(self.conn)
+        migrate(self.conn)
+        # How often "coffee" appears, and how long the text is, sets the rank
+        self.conn.executemany("""
+            INSERT INTO transactions (date, amount, description, type)
+            VALUES ('2025-01-01', 500, ?, 'expense')
+        """, ((" ".join(["coffee"] * (i % 4 + 1) + ["shop"] * (i % 7)),) for i in range(120)))
+        self.conn.commit()
+
+        self.model = ExpenseHistoryModel(self.conn)
+        self.model.page_size = 25
+
+    def loaded_ids(self):
+        while self.model.canFetchMore():
+            self.model.fetchMore()
+        return [self.model.row_id(row) for row in range(self.model.rowCount())]
+
+    def test_every_page_is_in_rank_order(self):
+        self.model.set_search("coffee")
+
+        self.assertTrue(self.model.ranked)
+        ranked = [row_id for (row_id,) in self.conn.execute("""
+            SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH '"coffee"*'
+            ORDER BY rank, rowid
+        """)]
+        self.assertEqual(self.loaded_ids(), ranked)
+
+    def test_broad_search_is_newest_first(self):
+        self.model.rank_limit = 50
+        self.model.set_search("coffee")
+
+        self.assertFalse(self.model.ranked)
+        self.assertEqual(self.loaded_ids(), list(range(120, 0, -1)))
+
+
+if __name__ == "__main__":
+    unittest.main()
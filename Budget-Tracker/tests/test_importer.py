@@ -0,0 +1,65 @@
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.db.connections import configure_writer
+from src.db.importer import KEPT_INDEXES, import_statement
+from src.db.indexes import indexes_suspended, rebuild_suspended_indexes
+from src.db.migrations import migrate
+
+
+class ImportTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.db_path = self.work_dir / "budget.db"
+        self.conn = self.connect()
+        migrate(self.conn)
+        self.statement = self.work_dir / "statement.csv"
+        lines = ["Date,Description,Amount"]
+        lines += [f"{day % 28 + 1:02d}/01/2025,Shop {day},-{day + 1}.50" for day in range(250)]
+        lines += ["31/01/2025,Salary,50000"]
+        self.statement.write_text("\n".join(lines) + "\n")
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path)
+        self.addCleanup(conn.close)
+        configure_writer(conn)
+        return conn
+
+    def indexes(self):
+        return {name for (name,) in self.conn.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = 'transactions' AND sql IS NOT NULL
+        """)}
+
+    def test_import_with_indexes_suspended(self):
+        indexes = self.indexes()
+        summary = import_statement(self.conn, self.statement, batch_size=100,
+                                   suspend_indexes=True)
+
+        self.assertEqual((summary.expenses, summary.income), (250, 1))
+        self.assertEqual(self.indexes(), indexes)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM suspended_indexes").fetchone()[0], 0)
+        self.assertEqual(self.conn.execute("PRAGMA integrity_check").fetchone()[0], "ok")
+
+        # The fingerprint index stays for the duplicate lookups
+        summary = import_statement(self.conn, self.statement, batch_size=100,
+                                   suspend_indexes=True)
+        self.assertEqual((summary.imported, summary.duplicates), (0, 251))
+
+    def test_indexes_cut_short_are_rebuilt(self):
+        indexes = self.indexes()
+        suspended = indexes_suspended(self.conn, "transactions", KEPT_INDEXES)
+        suspended.__enter__()  # and never leave, as if the import had crashed
+        self.assertEqual(self.indexes(), set(KEPT_INDEXES))
+
+        rebuilt = rebuild_suspended_indexes(self.connect())
+        self.assertEqual(set(rebuilt), indexes - set(KEPT_INDEXES))
+        self.assertEqual(self.indexes(), indexes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.db.archive import create_views
+from src.db.migrations import LATEST_VERSION, migrate, schema_version
+
+SHIPPED_BACKUPS = Path(__file__).resolve().parent.parent / "backups"
+
+
+class MigrationTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.work_dir)
+
+    def open_copy(self, backup_name):
+        """Connect to a copy of a shipped backup"""
+        path = self.work_dir / backup_name
+        shutil.copy(SHIPPED_BACKUPS / backup_name, path)
+        conn = sqlite3.connect(path)
+        self.addCleanup(conn.close)
+        return conn
+
+    def test_migrate_with_views_present(self):
+        conn = self.open_copy("budget_backup_20250131_154753.db")
+        expenses = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        create_views(conn, ())
+        conn.execute("CREATE VIEW expense_dates AS SELECT date FROM transactions")
+
+        migrate(conn)
+
+        self.assertEqual(schema_version(conn), LATEST_VERSION)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM all_transactions").fetchone()[0],
+                         expenses)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM expense_dates").fetchone()[0],
+                         expenses)
+        temp_views = {name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_temp_master WHERE type = 'view'")}
+        self.assertEqual(temp_views, {"all_transactions", "all_income", "all_daily_totals"})
+
+    def test_every_shipped_backup_migrates(self):
+        for path in sorted(SHIPPED_BACKUPS.glob("budget_backup_*.db")):
+            with self.subTest(backup=path.name):
+                conn = self.open_copy(path.name)
+                migrate(conn)
+                self.assertEqual(schema_version(conn), LATEST_VERSION)
+                self.assertEqual(conn.execute("PRAGMA foreign_key_check").fetchall(), [])
+
+    def test_need_and_want_types_become_expenses(self):
+        conn = self.open_copy("budget_backup_20250131_014946.db")
+        migrate(conn)
+
+        self.assertEqual(conn.execute("""
+            SELECT name, type, need_type FROM categories
+            WHERE name IN ('Housing', 'Dining Out') ORDER BY name
+        """).fetchall(), [("Dining Out", "expense", 0), ("Housing", "expense", 1)])
+        self.assertEqual(conn.execute("SELECT DISTINCT type FROM transactions").fetchall(),
+                         [("expense",)])
+        self.assertEqual(conn.execute("SELECT frequency FROM income").fetchall(),
+                         [("monthly",)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.db.backup import create_backup, new_backup_path
+from src.db.connections import configure_writer
+from src.db.migrations import LATEST_VERSION, schema_version
+from src.db.restore import prepare_restored, restore_backup
+
+SHIPPED_BACKUPS = Path(__file__).resolve().parent.parent / "backups"
+
+
+class RestoreTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.work_dir)
+        self.db_path = self.work_dir / "budget.db"
+        self.backup_dir = self.work_dir / "backups"
+        self.backup_dir.mkdir()
+        self.conn = sqlite3.connect(self.db_path)
+        self.addCleanup(self.conn.close)
+        configure_writer(self.conn)
+        prepare_restored(self.conn)
+
+    def restore(self, backup_path):
+        restore_backup(backup_path, self.db_path, backup_dir=self.backup_dir)
+        prepare_restored(self.conn)
+
+    def test_two_restores_in_a_row(self):
+        self.conn.execute("""
+            INSERT INTO transactions (date, amount, description, type)
+            VALUES ('2026-01-05', 1250, 'current', 'expense')
+        """)
+        self.conn.commit()
+        current = create_backup(self.db_path, new_backup_path(self.backup_dir))
+        legacy = self.backup_dir / "budget_backup_20250131_154753.db"
+        shutil.copy(SHIPPED_BACKUPS / legacy.name, legacy)
+
+        for backup_path in (legacy, current, legacy):
+            self.restore(backup_path)
+            self.assertEqual(schema_version(self.conn), LATEST_VERSION)
+            views = self.conn.execute(
+                "SELECT name FROM sqlite_temp_master WHERE type = 'view'").fetchall()
+            self.assertEqual(views, [])
+
+        descriptions = [row[0] for row in self.conn.execute("SELECT description FROM transactions")]
+        self.assertNotIn("current", descriptions)
+
+
+if __name__ == "__main__":
+    unittest.main()